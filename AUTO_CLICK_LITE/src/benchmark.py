@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+点击吞吐量基准 - 使用录制后端在无显示环境下测量点击开销、抖动和实际速率
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+
+from clicker import Clicker
+from input_backend import RecordingBackend
+
+MODES = ('single', 'multi', 'text')
+
+
+def _build_clicker(mode, clicks, interval, backend, positions=10):
+    """按模式构造点击器"""
+    if mode == 'single':
+        return Clicker(interval=interval, count=clicks, randomize=False, position_type='fixed',
+                       fixed_position={'x': 100, 'y': 100}, backend=backend)
+    if mode == 'multi':
+        position_list = [
+            {'x': 10 * i, 'y': 20 * i, 'note': f'位置{i + 1}', 'enabled': True, 'text': '', 'text_interval': 0}
+            for i in range(positions)
+        ]
+    elif mode == 'text':
+        position_list = [
+            {'x': 10 * i, 'y': 20 * i, 'note': f'位置{i + 1}', 'enabled': True, 'text': f'text{i}', 'text_interval': 0}
+            for i in range(positions)
+        ]
+    else:
+        raise ValueError(f"未知的基准模式: {mode}")
+    return Clicker(interval=interval, count=clicks, randomize=False, multi_position=True,
+                   positions=position_list, backend=backend)
+
+
+def run_mode(mode, clicks=200, interval=10, latency=0.0, positions=10):
+    """运行单个模式的基准
+    Args:
+        mode: 基准模式(single, multi, text)
+        clicks: 点击次数
+        interval: 目标点击间隔(毫秒)
+        latency: 录制后端模拟的每次调用耗时(秒)
+        positions: 多位置和文本模式下的位置数量
+    Returns:
+        基准结果字典
+    """
+    # 零间隔运行，测量每次点击的纯开销
+    backend = RecordingBackend(latency=latency)
+    clicker = _build_clicker(mode, clicks, 0, backend, positions)
+    started = time.perf_counter()
+    clicker.start_clicking()
+    elapsed = time.perf_counter() - started
+    overhead_us = elapsed / clicks * 1e6
+
+    # 按目标间隔运行，测量速率和抖动
+    backend = RecordingBackend(latency=latency)
+    clicker = _build_clicker(mode, clicks, interval, backend, positions)
+    clicker.start_clicking()
+    stats = clicker.get_stats()
+
+    result = {
+        'mode': mode,
+        'clicks': stats['clicks'],
+        'interval_ms': interval,
+        'overhead_us': overhead_us,
+        'target_cps': stats['target_cps'],
+        'achieved_cps': stats['achieved_cps'],
+        'rate_ratio': stats['rate_ratio'],
+        'max_late_ms': stats['max_late_ms'],
+        'text_entry_ms': stats['avg_text_entry_ms'],
+        'jitter_ms': None
+    }
+    # 文本模式下的点击间隔包含聚焦延迟，只在纯点击模式下计算间隔抖动
+    if mode != 'text':
+        times = backend.click_times()
+        gaps = [(b - a) * 1000.0 for a, b in zip(times, times[1:])]
+        if len(gaps) > 1:
+            result['jitter_ms'] = statistics.pstdev(gaps)
+    return result
+
+
+def run_locate(lookups=100, scale=4):
+    """模板定位基准：在合成的1080p屏幕上测量全屏搜索、区域搜索和缓存命中的耗时
+    Returns:
+        基准结果字典(毫秒)
+    """
+    import numpy as np
+    from screen import ArrayCapture, TemplateLocator
+
+    rng = np.random.default_rng(0)
+    # 4x4像素的色块加噪声，近似界面截图
+    blocks = rng.integers(0, 256, (270, 480)).astype(np.float32)
+    image = np.kron(blocks, np.ones((4, 4), dtype=np.float32)) + rng.normal(0, 4, (1080, 1920)).astype(np.float32)
+    template = image[500:560, 900:980].copy()
+    region = (700, 400, 480, 300)
+
+    def timed(locator, region):
+        started = time.perf_counter()
+        hit = locator.locate('template', region)
+        return (time.perf_counter() - started) * 1000.0, hit
+
+    result = {}
+    for name, search_region in (('full', None), ('region', region)):
+        locator = TemplateLocator(ArrayCapture(image), scale=scale)
+        locator.add_template('template', template)
+        # 第一次包含模板频谱计算，丢弃后重新测量一次冷搜索
+        timed(locator, search_region)
+        locator._last_hits.clear()
+        result[f'{name}_search_ms'], hit = timed(locator, search_region)
+        cached = [timed(locator, search_region)[0] for _ in range(lookups)]
+        result[f'{name}_cached_ms'] = statistics.mean(cached)
+        result[f'{name}_hit'] = hit
+        result[f'{name}_hit_rate'] = locator.stats()['hit_rate']
+    return result
+
+
+def run_all(clicks=200, interval=10, latency=0.0, modes=MODES):
+    """运行所有模式的基准"""
+    results = []
+    for mode in modes:
+        # 文本模式每个位置包含聚焦延迟，减少点击次数
+        mode_clicks = clicks if mode != 'text' else min(clicks, 50)
+        results.append(run_mode(mode, mode_clicks, interval, latency))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="点击吞吐量基准")
+    parser.add_argument('--clicks', type=int, default=200, help="每个模式的点击次数")
+    parser.add_argument('--interval', type=int, default=10, help="目标点击间隔(毫秒)")
+    parser.add_argument('--latency', type=float, default=0.0, help="模拟后端每次调用耗时(秒)")
+    parser.add_argument('--mode', choices=MODES, action='append', help="只运行指定模式")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出")
+    parser.add_argument('--locate', action='store_true', help="运行模板定位基准")
+    args = parser.parse_args(argv)
+
+    if args.locate:
+        result = run_locate()
+        if args.json:
+            print(json.dumps(result, indent=2))
+            return 0
+        for name in ('full', 'region'):
+            print(f"{name:<8}搜索: {result[name + '_search_ms']:.2f} ms  缓存命中: {result[name + '_cached_ms']:.2f} ms  "
+                  f"命中率: {result[name + '_hit_rate']:.0%}")
+        return 0
+
+    results = run_all(args.clicks, args.interval, args.latency, args.mode or MODES)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"{'模式':<8}{'点击':>6}{'开销(us)':>12}{'目标CPS':>10}{'实际CPS':>10}{'抖动(ms)':>10}"
+          f"{'最大落后(ms)':>14}{'文本输入(ms)':>14}")
+    for r in results:
+        jitter = f"{r['jitter_ms']:.3f}" if r['jitter_ms'] is not None else '-'
+        print(f"{r['mode']:<8}{r['clicks']:>6}{r['overhead_us']:>12.1f}{r['target_cps']:>10.1f}"
+              f"{r['achieved_cps']:>10.1f}{jitter:>10}{r['max_late_ms']:>14.3f}{r['text_entry_ms']:>14.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+点击计划模块 - 将多位置列表编译为紧凑的数组结构
+"""
+from array import array
+
+BUTTON_NAMES = ('left', 'middle', 'right')
+BUTTON_CODES = {name: code for code, name in enumerate(BUTTON_NAMES)}
+
+# 文本输入的聚焦方式
+FOCUS_MODES = ('click', 'tab', 'click_select_all')
+FOCUS_CODES = {name: code for code, name in enumerate(FOCUS_MODES)}
+FOCUS_CLICK, FOCUS_TAB, FOCUS_CLICK_SELECT_ALL = range(3)
+DEFAULT_FOCUS_MODE = 'click_select_all'
+DEFAULT_FOCUS_DELAY = 50
+
+DEFAULT_THRESHOLD = 0.8
+
+# 区域触发方式：区域变化、颜色匹配、哈希匹配
+TRIGGER_MODES = ('change', 'color', 'hash')
+DEFAULT_TOLERANCE = 10
+DEFAULT_CHANGE_RATIO = 0.02
+DEFAULT_POLL_INTERVAL = 5
+
+# 位置标志位
+FLAG_TEXT = 1
+FLAG_TEMPLATE = 2
+FLAG_TRIGGER = 4
+
+
+def compile_trigger(trigger):
+    """将位置中的trigger字典规范化为可哈希的元组
+    Args:
+        trigger: {'mode', 'region', 'color', 'hash', 'tolerance', 'ratio', 'poll_interval', 'timeout'}
+    Returns:
+        (mode, region, color, digest, tolerance, ratio, poll_interval秒, timeout秒)
+    """
+    mode = trigger.get('mode', 'change')
+    if mode not in TRIGGER_MODES:
+        raise ValueError(f"未知的触发方式: {mode}")
+    region = tuple(int(v) for v in trigger['region'])
+    if len(region) != 4:
+        raise ValueError("触发区域格式应为 [x, y, 宽, 高]")
+    color = tuple(int(v) for v in trigger['color']) if mode == 'color' else None
+    digest = trigger['hash'] if mode == 'hash' else None
+    return (mode, region, color, digest,
+            trigger.get('tolerance', DEFAULT_TOLERANCE),
+            trigger.get('ratio', DEFAULT_CHANGE_RATIO),
+            trigger.get('poll_interval', DEFAULT_POLL_INTERVAL) / 1000.0,
+            trigger.get('timeout', 0) / 1000.0)
+
+
+class ClickPlan:
+    """编译后的多位置点击计划
+
+    以结构数组的形式保存已启用位置的坐标、按钮、标志和文本索引，
+    点击循环只需按下标访问，不再逐个查字典和过滤禁用项。
+    """
+    __slots__ = ('xs', 'ys', 'buttons', 'flags', 'text_index', 'text_intervals', 'focus_modes',
+                 'focus_delays', 'texts', 'target_index', 'targets', 'trigger_index', 'triggers', 'source_index')
+
+    def __init__(self):
+        self.xs = array('i')
+        self.ys = array('i')
+        self.buttons = array('B')
+        self.flags = array('B')
+        self.text_index = array('i')
+        self.text_intervals = array('d')
+        self.focus_modes = array('B')
+        self.focus_delays = array('d')
+        self.texts = ()
+        self.target_index = array('i')
+        self.targets = ()
+        self.trigger_index = array('i')
+        self.triggers = ()
+        self.source_index = array('i')
+
+    @classmethod
+    def compile(cls, positions, button='left'):
+        """编译位置列表
+        Args:
+            positions: 位置字典列表
+            button: 位置未指定button时使用的默认按钮
+        Returns:
+            ClickPlan实例
+        """
+        plan = cls()
+        texts = []
+        text_ids = {}
+        targets = []
+        target_ids = {}
+        triggers = []
+        trigger_ids = {}
+        for i, pos in enumerate(positions):
+            if not pos.get('enabled', True):
+                continue
+            text = pos.get('text') or ''
+            flags = 0
+            text_id = -1
+            if text:
+                flags |= FLAG_TEXT
+                text_id = text_ids.get(text)
+                if text_id is None:
+                    text_id = text_ids[text] = len(texts)
+                    texts.append(text)
+            # 模板目标：(模板路径, 搜索区域, 匹配阈值)
+            template = pos.get('template') or ''
+            target_id = -1
+            if template:
+                flags |= FLAG_TEMPLATE
+                region = pos.get('region')
+                target = (template, tuple(region) if region else None, pos.get('threshold', DEFAULT_THRESHOLD))
+                target_id = target_ids.get(target)
+                if target_id is None:
+                    target_id = target_ids[target] = len(targets)
+                    targets.append(target)
+            # 区域触发：点击前等待区域变化或匹配
+            trigger_id = -1
+            if pos.get('trigger'):
+                flags |= FLAG_TRIGGER
+                trigger = compile_trigger(pos['trigger'])
+                trigger_id = trigger_ids.get(trigger)
+                if trigger_id is None:
+                    trigger_id = trigger_ids[trigger] = len(triggers)
+                    triggers.append(trigger)
+            plan.xs.append(int(pos['x']))
+            plan.ys.append(int(pos['y']))
+            plan.buttons.append(BUTTON_CODES[pos.get('button', button)])
+            plan.flags.append(flags)
+            plan.text_index.append(text_id)
+            plan.text_intervals.append(pos.get('text_interval', 0) / 1000.0)
+            plan.focus_modes.append(FOCUS_CODES[pos.get('focus_mode', DEFAULT_FOCUS_MODE)])
+            plan.focus_delays.append(pos.get('focus_delay', DEFAULT_FOCUS_DELAY) / 1000.0)
+            plan.target_index.append(target_id)
+            plan.trigger_index.append(trigger_id)
+            plan.source_index.append(i)
+        plan.texts = tuple(texts)
+        plan.targets = tuple(targets)
+        plan.triggers = tuple(triggers)
+        return plan
+
+    def __len__(self):
+        return len(self.xs)
+
+    def button(self, i):
+        """获取第i个位置的按钮名称"""
+        return BUTTON_NAMES[self.buttons[i]]
+
+    def text(self, i):
+        """获取第i个位置的文本，没有文本时返回空字符串"""
+        index = self.text_index[i]
+        return self.texts[index] if index >= 0 else ''
+
+    def target(self, i):
+        """获取第i个位置的模板目标，没有模板时返回None"""
+        index = self.target_index[i]
+        return self.targets[index] if index >= 0 else None
+
+    def trigger(self, i):
+        """获取第i个位置的触发条件，没有触发条件时返回None"""
+        index = self.trigger_index[i]
+        return self.triggers[index] if index >= 0 else None
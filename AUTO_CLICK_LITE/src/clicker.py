@@ -4,15 +4,99 @@
 连点器核心模块 - 处理鼠标点击模拟
 """
 import time
-import random
-import pyautogui
-from threading import Event
+import logging
+from threading import Event, Condition, Lock
+from timing import ClickTimer
+from input_backend import create_backend
+from click_plan import ClickPlan, FLAG_TEXT, FLAG_TEMPLATE, FLAG_TRIGGER, FOCUS_TAB, FOCUS_CLICK_SELECT_ALL
+from metrics import ClickMetrics
+from macro import MOVE, CLICK
+
+logger = logging.getLogger('auto_click.clicker')
+
+DEFAULT_POSITIONS = (
+    {
+        "x": 0,
+        "y": 0,
+        "note": "默认位置",
+        "enabled": True,
+        "text": "",
+        "text_interval": 1000
+    },
+)
+
+
+class ClickSettings:
+    """不可变的点击设置快照
+
+    点击线程每轮循环开始时读取一次当前快照，整轮只使用这一份设置；
+    修改设置时生成新的快照并整体替换引用，不会出现只更新了一半的设置。
+    """
+    __slots__ = ('interval', 'count', 'button', 'randomize', 'min_interval', 'max_interval',
+                 'position_type', 'point', 'multi_position', 'positions', 'plan', 'restart')
+
+
+    def __init__(self, interval, count, button, randomize, min_interval, max_interval,
+                 position_type, point, multi_position, positions, plan, restart=False):
+        """参数为已转换的值：间隔为秒，point为(x, y)，positions为元组"""
+        setattr_ = object.__setattr__
+        setattr_(self, 'interval', interval)
+        setattr_(self, 'count', count)
+        setattr_(self, 'button', button)
+        setattr_(self, 'randomize', randomize)
+        setattr_(self, 'min_interval', min_interval)
+        setattr_(self, 'max_interval', max_interval)
+        setattr_(self, 'position_type', position_type)
+        setattr_(self, 'point', point)
+        setattr_(self, 'multi_position', multi_position)
+        setattr_(self, 'positions', positions)
+        setattr_(self, 'plan', plan)
+        # 应用时是否从第一个位置和新的点击计数重新开始(切换配置)
+        setattr_(self, 'restart', restart)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ClickSettings是不可变的，请使用replace生成新的快照")
+
+    @property
+    def fixed_position(self):
+        return {'x': self.point[0], 'y': self.point[1]}
+
+    def replace(self, plan=None, restart=False, **settings):
+        """生成修改了部分设置的新快照
+        Args:
+            plan: 与positions对应的预编译计划，未提供且位置或按钮变化时重新编译
+            restart: 新快照应用时是否重新开始
+            settings: update_settings接受的设置项，值为None的项保持不变
+        Returns:
+            新的ClickSettings实例
+        """
+        values = {name: getattr(self, name) for name in self.__slots__}
+        for key, value in settings.items():
+            if value is None:
+                continue
+            if key in ('interval', 'min_interval', 'max_interval'):
+                value = value / 1000.0
+            elif key == 'fixed_position':
+                key, value = 'point', (value['x'], value['y'])
+            elif key == 'positions':
+                # 复制位置字典，调用方之后的修改不影响快照
+                value = tuple(dict(pos) for pos in value)
+            elif key not in values or key in ('point', 'plan', 'restart'):
+                raise TypeError(f"未知的设置项: {key}")
+            values[key] = value
+        if plan is not None:
+            values['plan'] = plan
+        elif settings.get('positions') is not None or settings.get('button') is not None:
+            values['plan'] = ClickPlan.compile(values['positions'], values['button'])
+        values['restart'] = restart
+        return ClickSettings(**values)
+
 
 class Clicker:
     def __init__(self, interval=100, count=-1, button='left', randomize=True,
                  min_interval=80, max_interval=120, position_type='current',
                  fixed_position={'x': 0, 'y': 0}, multi_position=False,
-                 positions=None):
+                 positions=None, backend='auto', capture='auto'):
         """初始化点击器
         Args:
             interval: 点击间隔(毫秒)
@@ -25,204 +109,467 @@ class Clicker:
             fixed_position: 固定点击位置
             multi_position: 是否启用多位置模式
             positions: 多位置列表
+            capture: 模板定位使用的截图后端名称或实例
+            backend: 输入后端名称(auto, pyautogui, xtest)或后端实例
         """
-        self.interval = interval / 1000.0  # 转换为秒
-        self.count = count
-        self.button = button
-        self.randomize = randomize
-        self.min_interval = min_interval / 1000.0
-        self.max_interval = max_interval / 1000.0
-        self.position_type = position_type
-        self.fixed_position = fixed_position
-        self.multi_position = multi_position
-        self.positions = positions if positions else [
-            {
-                "x": 0,
-                "y": 0,
-                "note": "默认位置",
-                "enabled": True,
-                "text": "",
-                "text_interval": 1000
-            }
-        ]
-        
-        # 控制标志
+        positions = tuple(dict(pos) for pos in positions) if positions else DEFAULT_POSITIONS
+        # 当前设置快照，只通过整体替换修改；间隔转换为秒，多位置计划已编译
+        self._settings = ClickSettings(
+            interval / 1000.0, count, button, randomize, min_interval / 1000.0, max_interval / 1000.0,
+            position_type, (fixed_position['x'], fixed_position['y']), multi_position, positions,
+            ClickPlan.compile(positions, button))
+        # 点击线程正在使用的快照
+        self._active = self._settings
+        # 只在修改设置的线程之间互斥，点击线程读取快照不加锁
+        self._settings_lock = Lock()
+
+        # 输入后端，首次使用时创建
+        self._backend = backend if not isinstance(backend, str) else None
+        self._backend_name = backend if isinstance(backend, str) else backend.name
+
+        # 基于截止时间的节拍器，等待通过条件变量进行，可被停止/暂停中断
+        self.timer = ClickTimer(interval, randomize, min_interval, max_interval, sleep=self._wait_interval)
+
+        # 剪贴板是否不可用，不可用时逐字输入
+        self._clipboard_failed = False
+
+        # 截图后端、模板定位器和区域触发监视器，只在计划中用到时创建
+        self._capture = capture
+        self._locator = None
+        self._trigger_monitor = None
+
+        # 点击延迟、间隔和错误统计
+        self.metrics = ClickMetrics()
+
+        # 控制标志，状态变化时通过条件变量唤醒点击线程
         self._stop_event = Event()
         self._pause_event = Event()
+        self._cond = Condition()
+        # 点击线程从等待中被唤醒的次数
+        self.wakeups = 0
+        self._running = False
+
+    @property
+    def settings(self):
+        """当前设置快照(ClickSettings)"""
+        return self._settings
+
+    # 兼容原有的按属性读取设置
+    interval = property(lambda self: self._settings.interval)
+    count = property(lambda self: self._settings.count)
+    button = property(lambda self: self._settings.button)
+    randomize = property(lambda self: self._settings.randomize)
+    min_interval = property(lambda self: self._settings.min_interval)
+    max_interval = property(lambda self: self._settings.max_interval)
+    position_type = property(lambda self: self._settings.position_type)
+    fixed_position = property(lambda self: self._settings.fixed_position)
+    multi_position = property(lambda self: self._settings.multi_position)
+    positions = property(lambda self: self._settings.positions)
+    plan = property(lambda self: self._settings.plan)
+
+    @property
+    def backend(self):
+        """当前输入后端"""
+        if self._backend is None:
+            self._backend = create_backend(self._backend_name)
+        return self._backend
+
+    @property
+    def locator(self):
+        """模板定位器"""
+        if self._locator is None:
+            from screen import TemplateLocator
+            self._locator = TemplateLocator(self.capture)
+        return self._locator
+
+    @property
+    def trigger_monitor(self):
+        """区域触发监视器"""
+        if self._trigger_monitor is None:
+            from trigger import TriggerMonitor
+            self._trigger_monitor = TriggerMonitor(self.capture)
+        return self._trigger_monitor
+
+    @property
+    def capture(self):
+        """截图后端，模板定位和区域触发共用"""
+        if isinstance(self._capture, str):
+            from screen import create_capture
+            self._capture = create_capture(self._capture)
+        return self._capture
+
+    def set_backend(self, backend):
+        """切换输入后端
+        Args:
+            backend: 后端名称或后端实例
+        """
+        if isinstance(backend, str):
+            if backend == self._backend_name and self._backend is not None:
+                return
+            self._backend, self._backend_name = None, backend
+        else:
+            self._backend, self._backend_name = backend, backend.name
 
     def update_settings(self, interval=None, count=None, button=None, randomize=None,
                        min_interval=None, max_interval=None, position_type=None,
-                       fixed_position=None, multi_position=None, positions=None):
-        """更新设置"""
-        if interval is not None:
-            self.interval = interval / 1000.0
-        if count is not None:
-            self.count = count
-        if button is not None:
-            self.button = button
-        if randomize is not None:
-            self.randomize = randomize
-        if min_interval is not None:
-            self.min_interval = min_interval / 1000.0
-        if max_interval is not None:
-            self.max_interval = max_interval / 1000.0
-        if position_type is not None:
-            self.position_type = position_type
-        if fixed_position is not None:
-            self.fixed_position = fixed_position
-        if multi_position is not None:
-            self.multi_position = multi_position
-        if positions is not None:
-            self.positions = positions
+                       fixed_position=None, multi_position=None, positions=None, plan=None):
+        """更新设置
+        所有修改合成一个新的设置快照后整体替换，运行中的点击线程在下一轮循环开始时采用。
+        Args:
+            plan: 与positions对应的预编译计划，提供时不再重新编译
+        """
+        self._publish(dict(interval=interval, count=count, button=button, randomize=randomize,
+                           min_interval=min_interval, max_interval=max_interval,
+                           position_type=position_type, fixed_position=fixed_position,
+                           multi_position=multi_position, positions=positions), plan)
+
+    def switch_profile(self, settings, plan=None):
+        """切换到另一组点击设置
+        运行中时由点击线程在两次点击之间应用，从新配置的第一个位置和新的点击计数开始，
+        点击线程不停止；未运行时立即应用。
+        Args:
+            settings: update_settings接受的设置字典
+            plan: 预编译的点击计划
+        """
+        self._publish(settings, plan, restart=True)
+        logger.info("已切换点击配置")
+
+    def _publish(self, settings, plan=None, restart=False):
+        """基于当前快照生成新快照并替换
+        Args:
+            settings: 设置字典，值为None的项保持不变
+            plan: 预编译的点击计划
+            restart: 是否为配置切换
+        """
+        with self._settings_lock:
+            current = self._settings
+            # 尚未被点击线程采用的配置切换不能因随后的设置修改而丢失
+            restart = restart or (current.restart and current is not self._active)
+            snapshot = current.replace(plan=plan, restart=restart, **settings)
+            self._settings = snapshot
+            if not self._running:
+                self._activate(snapshot)
+        if restart and self._running:
+            # 唤醒正在等待间隔的点击线程，使新配置在下一次点击前生效
+            with self._cond:
+                self._cond.notify_all()
+
+    def _activate(self, settings):
+        """采用设置快照，只由点击线程(或未运行时由修改设置的线程)调用"""
+        self._active = settings
+        self.timer.configure(settings.interval * 1000.0, settings.randomize,
+                             settings.min_interval * 1000.0, settings.max_interval * 1000.0)
+
+    def _switch_pending(self):
+        """是否有尚未采用的配置切换"""
+        settings = self._settings
+        return settings.restart and settings is not self._active
 
     def start_clicking(self):
         """开始点击"""
+        self._running = True
+        try:
+            self._click_loop()
+        finally:
+            self._running = False
+
+    def _click_loop(self):
+        """点击线程主循环"""
         self._stop_event.clear()
         self._pause_event.clear()
 
         click_count = 0
+        index = 0
+        self._clipboard_failed = False
+        self.timer.start()
+        self.metrics.reset()
+        if self._locator is not None:
+            self._locator.reset_stats()
+        if self._trigger_monitor is not None:
+            self._trigger_monitor.reset_stats()
+        metrics = self.metrics
+        perf_counter = time.perf_counter
+        # 启动前修改的设置可能尚未同步到节拍器
+        self._activate(self._settings)
         while not self._stop_event.is_set():
-            # 检查是否暂停
+            # 检查是否暂停，暂停期间阻塞等待恢复
             if self._pause_event.is_set():
-                time.sleep(0.1)
+                self._wait_resume()
+                # 暂停期间的时间不计入落后量
+                self.timer.resync()
                 continue
 
-            # 确定点击位置和执行点击
+            # 每轮只读取一次设置快照，本轮内不受并发修改影响
+            settings = self._settings
+            if settings is not self._active:
+                self._activate(settings)
+                if settings.restart:
+                    # 切换配置：从新配置的第一个位置和新的点击计数开始，立即点击
+                    index = 0
+                    click_count = 0
+                    self.timer.resync()
+
+            # 确定点击位置和执行点击，每轮循环点击一次
             try:
-                if self.multi_position:
-                    # 多位置模式
-                    for pos in self.positions:
-                        if not pos['enabled']:
+                if settings.multi_position:
+                    # 多位置模式，按编译后的计划逐个下标执行
+                    plan = settings.plan
+                    if not plan:
+                        # 没有启用的位置，避免空转
+                        self.timer.wait_next()
+                        continue
+                    if index >= len(plan):
+                        index = 0
+                    i = index
+                    index += 1
+                    x, y = plan.xs[i], plan.ys[i]
+
+                    # 触发位置先等待区域条件满足，中断后重新等待该位置，超时则跳过
+                    if plan.flags[i] & FLAG_TRIGGER:
+                        if not self.trigger_monitor.wait(plan.trigger(i), self._wait):
+                            if self._interrupted():
+                                index = i
+                            continue
+                        # 触发后立即点击，间隔从触发时刻重新计时
+                        self.timer.resync()
+
+                    # 模板位置先定位目标，未找到时跳过本次点击
+                    if plan.flags[i] & FLAG_TEMPLATE:
+                        hit = self.locator.locate(*plan.target(i))
+                        if hit is None:
+                            self.timer.wait_next()
                             continue
+                        x, y = hit
 
-                        # 移动到指定位置
-                        x, y = pos['x'], pos['y']
-                        pyautogui.moveTo(x, y)
+                    has_text = plan.flags[i] & FLAG_TEXT
 
-                        # 执行点击
-                        pyautogui.click(button=self.button)
-                        click_count += 1
-
-                        # 如果有文本需要输入
-                        print("===== 文本输入逻辑开始 ====")
-                        print(f"检测到文本输入需求: '{pos['text']}'")
-                        if pos['text']:
-                            try:
-                                # 获取当前鼠标位置
-                                current_pos = pyautogui.position()
-                                print(f"当前鼠标位置: {current_pos}")
-                                  
-                                # 方法1: 尝试直接点击文本框位置确保焦点
-                                pyautogui.click(button=self.button)
-                                print("已点击文本框位置")
-                                time.sleep(0.3)  # 给足够时间让文本框获得焦点
-                                
-                                # 方法2: 使用键盘快捷键激活文本框
-                                # 假设当前已经在正确的窗口，按Tab键切换到文本框
-                                pyautogui.press('tab')
-                                time.sleep(0.2)
-                                print("已按下Tab键切换焦点")
-                                
-                                # 方法3: 使用鼠标移动到文本框并点击
-                                pyautogui.moveTo(current_pos)
-                                pyautogui.click(button=self.button)
-                                time.sleep(0.2)
-                                print("已再次点击文本框位置")
-                                
-                                # 确认当前活动窗口
-                                try:
-                                    active_window = pyautogui.getActiveWindowTitle()
-                                    print(f"活动窗口: {active_window}")
-                                except Exception as e:
-                                    print(f"无法获取活动窗口: {e}")
-                                  
-                                # 清除文本框现有内容
-                                pyautogui.hotkey('ctrl', 'a')
-                                time.sleep(0.1)
-                                pyautogui.press('delete')
-                                time.sleep(0.1)
-                                print("已清除文本框内容")
-                                
-                                # 使用剪贴板粘贴文本 (推荐方法)
-                                print(f"准备粘贴文本: '{pos['text']}'")
-                                try:
-                                    import pyperclip
-                                    # 复制文本到剪贴板
-                                    pyperclip.copy(pos['text'])
-                                    print(f"已复制文本到剪贴板: '{pos['text']}'")
-                                    # 粘贴文本
-                                    pyautogui.hotkey('ctrl', 'v')
-                                    print(f"已粘贴文本: '{pos['text']}'")
-                                except Exception as e:
-                                    print(f"粘贴失败: {e}")
-                                    # 如果粘贴失败，使用更可靠的输入方法
-                                    # 使用pyautogui的write函数
-                                    pyautogui.write(pos['text'], interval=0.05)
-                                    print(f"已使用write函数输入文本: {pos['text']}")
-                                    # 如果write函数失败，使用最后的回退方案
-                                    try:
-                                        pass
-                                    except Exception as e:
-                                        pyautogui.typewrite(pos['text'], interval=0.05)
-                                        print(f"已使用typewrite输入文本: {pos['text']}")
-                                
-                                # 文本输入后的间隔
-                                time.sleep(pos['text_interval'] / 1000.0)
-                                print("===== 文本输入逻辑结束 ====")
-                                 
-                                # 文本输入后的间隔
-                                time.sleep(pos['text_interval'] / 1000.0)
-                            except Exception as e:
-                                print(f"文本输入出错: {e}")
-
-                        # 检查是否达到点击次数
-                        if self.count > 0 and click_count >= self.count:
-                            self._stop_event.set()
-                            break
-
-                        # 等待下一次点击
-                        if self.randomize:
-                            wait_time = random.uniform(self.min_interval, self.max_interval)
-                        else:
-                            wait_time = self.interval
-
-                        time.sleep(wait_time)
+                    # 移动到指定位置并点击，两个事件一次刷新
+                    started = perf_counter()
+                    with self.backend.batch():
+                        self.backend.move_to(x, y)
+                        self.backend.click(plan.button(i))
+                    now = self.timer.tick()
+                    metrics.record_click(now, now - started)
+                    if plan.flags[i] & FLAG_TRIGGER:
+                        self._trigger_monitor.record_click(now)
+                    click_count += 1
+
+                    # 如果有文本需要输入
+                    if has_text:
+                        self._enter_text(plan, i)
                 else:
                     # 单位置模式
-                    if self.position_type == 'fixed':
-                        x, y = self.fixed_position['x'], self.fixed_position['y']
-                        pyautogui.moveTo(x, y)
-                    # 如果是current，则不需要移动，使用当前位置
+                    started = perf_counter()
+                    with self.backend.batch():
+                        if settings.position_type == 'fixed':
+                            x, y = settings.point
+                            self.backend.move_to(x, y)
+                        # 如果是current，则不需要移动，使用当前位置
 
-                    # 执行点击
-                    pyautogui.click(button=self.button)
+                        # 执行点击
+                        self.backend.click(settings.button)
+                    now = self.timer.tick()
+                    metrics.record_click(now, now - started)
                     click_count += 1
 
-                    # 检查是否达到点击次数
-                    if self.count > 0 and click_count >= self.count:
+                # 检查是否达到点击次数
+                if settings.count > 0 and click_count >= settings.count:
+                    break
+
+                # 等待下一个截止时间，停止或暂停时立即中断
+                self.timer.wait_next()
+            except Exception as e:
+                metrics.record_error(e)
+                logger.warning("点击出错: %s", e)
+                self._wait(0.1)
+
+    def play_macro(self, events, speed=1.0, loops=1):
+        """回放录制的宏
+
+        每个事件的截止时间按 起点 + 录制时间/速度 计算，不在事件之间累加等待，
+        因此任意速度下都不会漂移；每轮循环的起点按宏时长顺延。
+        支持与点击相同的停止、暂停和恢复。
+        Args:
+            events: 宏事件列表
+            speed: 回放速度倍数
+            loops: 循环次数(-1表示无限循环)
+        Returns:
+            回放统计字典
+        """
+        self._stop_event.clear()
+        self._pause_event.clear()
+        self._activate(self._settings)
+        self.timer.start()
+        self.metrics.reset()
+        backend = self.backend
+        perf_counter = time.perf_counter
+        duration = events[-1].t / speed if events else 0.0
+        late_total = 0.0
+        max_late = 0.0
+        played = 0
+        loop = 0
+        origin = perf_counter()
+        while events and (loops <= 0 or loop < loops) and not self._stop_event.is_set():
+            for event in events:
+                deadline = origin + event.t / speed
+                while not self.timer.wait_until(deadline):
+                    if self._stop_event.is_set():
                         break
+                    if not self._pause_event.is_set():
+                        # 被配置切换唤醒，回放中只更新设置
+                        self._activate(self._settings)
+                        continue
+                    # 暂停期间的时间整体顺延
+                    paused_at = perf_counter()
+                    self._wait_resume()
+                    origin += perf_counter() - paused_at
+                    deadline = origin + event.t / speed
+                if self._stop_event.is_set():
+                    break
 
-                    # 等待下一次点击
-                    if self.randomize:
-                        wait_time = random.uniform(self.min_interval, self.max_interval)
+                started = perf_counter()
+                late = started - deadline
+                late_total += late
+                max_late = max(max_late, late)
+                try:
+                    if event.kind == MOVE:
+                        backend.move_to(event.x, event.y)
+                    elif event.kind == CLICK:
+                        with backend.batch():
+                            backend.move_to(event.x, event.y)
+                            backend.click(event.button)
+                        now = self.timer.tick()
+                        self.metrics.record_click(now, now - started)
+                    elif event.mods:
+                        backend.hotkey(*event.mods, event.key)
                     else:
-                        wait_time = self.interval
+                        backend.press(event.key)
+                except Exception as e:
+                    self.metrics.record_error(e)
+                    logger.warning("宏回放出错: %s", e)
+                played += 1
+            origin += duration
+            loop += 1
+        return {
+            'events': played,
+            'loops': loop,
+            'avg_late_ms': late_total / played * 1000.0 if played else 0.0,
+            'max_late_ms': max_late * 1000.0
+        }
 
-                    time.sleep(wait_time)
-            except Exception as e:
-                print(f"点击出错: {e}")
-                time.sleep(0.1)
+    def _interrupted(self):
+        return self._stop_event.is_set() or self._pause_event.is_set()
+
+    def _wait(self, timeout, switch=False):
+        """可中断的等待，停止或暂停时立即返回
+        Args:
+            timeout: 最长等待时间(秒)
+            switch: 有等待切换的配置时是否也中断
+        Returns:
+            是否被停止或暂停(或配置切换)中断
+        """
+        with self._cond:
+            if self._interrupted() or (switch and self._switch_pending()):
+                return True
+            self._cond.wait(timeout)
+            self.wakeups += 1
+            return self._interrupted() or (switch and self._switch_pending())
+
+    def _wait_interval(self, timeout):
+        """节拍器的等待，配置切换也会中断，使新配置在下一次点击前生效"""
+        return self._wait(timeout, True)
+
+    def _wait_resume(self):
+        """暂停期间阻塞等待恢复或停止，不做任何轮询"""
+        with self._cond:
+            while self._pause_event.is_set() and not self._stop_event.is_set():
+                self._cond.wait()
+                self.wakeups += 1
+
+    def _prepare_clipboard(self, text):
+        """粘贴前将文本放入剪贴板，每次都重新设置，用户或其他程序可能已修改剪贴板
+        Returns:
+            剪贴板是否可用于粘贴
+        """
+        if self._clipboard_failed:
+            return False
+        try:
+            self.backend.set_clipboard(text)
+            return True
+        except Exception as e:
+            logger.warning("剪贴板不可用，改为逐字输入: %s", e)
+            self._clipboard_failed = True
+            return False
+
+    def _enter_text(self, plan, i):
+        """在计划中第i个位置输入文本
+
+        位置已在点击时获得焦点，按聚焦方式做必要的补充操作，只等待设置的聚焦延迟，
+        然后设置剪贴板并粘贴。文本间隔计入下一个截止时间，不再单独休眠。
+        """
+        started = time.perf_counter()
+        text = plan.text(i)
+        focus_mode = plan.focus_modes[i]
+        try:
+            if focus_mode == FOCUS_TAB:
+                self.backend.press('tab')
+            if plan.focus_delays[i]:
+                self._wait(plan.focus_delays[i])
+            if focus_mode == FOCUS_CLICK_SELECT_ALL:
+                # 全选后粘贴会直接替换原有内容
+                self.backend.hotkey('ctrl', 'a')
+            if self._prepare_clipboard(text):
+                self.backend.hotkey('ctrl', 'v')
+            else:
+                self.backend.write(text, interval=0.05)
+        except Exception as e:
+            self.metrics.record_error(e)
+            logger.warning("文本输入出错: %s", e)
+
+        elapsed = time.perf_counter() - started
+        self.metrics.record_text_entry(elapsed)
+        logger.debug("位置%d文本输入耗时 %.1f ms", plan.source_index[i] + 1, elapsed * 1000.0)
+
+        # 文本输入后的间隔
+        self.timer.defer(plan.text_intervals[i])
+
+    def get_stats(self):
+        """获取点击节拍统计(目标与实际每秒点击数、文本输入耗时等)"""
+        stats = self.timer.stats()
+        text_entry = self.metrics.text_entry
+        stats['text_entries'] = text_entry.total
+        stats['avg_text_entry_ms'] = text_entry.sum / text_entry.total if text_entry.total else 0.0
+        stats['max_text_entry_ms'] = text_entry.max
+        stats['wakeups'] = self.wakeups
+        return stats
+
+    def get_metrics(self):
+        """获取完整统计：节拍统计加上间隔直方图、后端耗时和错误计数"""
+        metrics = self.metrics.snapshot()
+        metrics['timing'] = self.get_stats()
+        metrics['backend'] = self._backend_name
+        if self._locator is not None:
+            metrics['locate'] = self._locator.stats()
+        if self._trigger_monitor is not None:
+            metrics['trigger'] = self._trigger_monitor.stats()
+        return metrics
 
     def stop_clicking(self):
         """停止点击"""
-        self._stop_event.set()
+        with self._cond:
+            self._stop_event.set()
+            self._cond.notify_all()
 
     def pause_clicking(self):
         """暂停点击"""
-        self._pause_event.set()
+        with self._cond:
+            self._pause_event.set()
+            self._cond.notify_all()
 
     def resume_clicking(self):
         """
         恢复点击
         """
-        self._pause_event.clear()
\ No newline at end of file
+        with self._cond:
+            self._pause_event.clear()
+            self._cond.notify_all()
@@ -3,136 +3,491 @@
 """
 配置模块 - 处理配置文件的加载和保存
 """
-import json
 import os
+import copy
+import json
+import time
+import logging
+import tempfile
+import threading
+
+from click_plan import BUTTON_NAMES, FOCUS_MODES, compile_trigger
+
+logger = logging.getLogger('auto_click.config')
+
+
+class PartialValueError(ValueError):
+    """配置项中部分条目不合法：value为去掉或修正这些条目后的值，problems为各条目的错误"""
+
+    def __init__(self, value, problems):
+        super().__init__('; '.join(problems))
+        self.value = value
+        self.problems = problems
+
+
+class Field:
+    """配置项：默认值和校验规则"""
+    __slots__ = ('default', 'types', 'choices', 'minimum', 'check')
+
+    def __init__(self, default, types=None, choices=None, minimum=None, check=None):
+        """
+        Args:
+            default: 默认值
+            types: 允许的类型，默认取默认值的类型
+            choices: 允许的取值
+            minimum: 最小值
+            check: 附加校验函数，返回规范化后的值，不合法时抛出ValueError
+        """
+        self.default = default
+        self.types = types or type(default)
+        self.choices = choices
+        self.minimum = minimum
+        self.check = check
+
+    def validate(self, value):
+        """校验并返回规范化后的值，不合法时抛出ValueError"""
+        # bool是int的子类，数值项不接受布尔值
+        if not isinstance(value, self.types) or (isinstance(value, bool) and self.types is not bool):
+            raise ValueError(f"类型应为{getattr(self.types, '__name__', self.types)}")
+        if self.choices is not None and value not in self.choices:
+            raise ValueError(f"取值应为{'/'.join(map(str, self.choices))}之一")
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError(f"不能小于{self.minimum}")
+        return self.check(value) if self.check else value
+
+
+def _check_point(value):
+    if not all(isinstance(value.get(axis), int) for axis in ('x', 'y')):
+        raise ValueError("需要整数x和y")
+    return value
+
+
+def _check_hotkeys(value):
+    hotkeys = dict(DEFAULT_HOTKEYS)
+    for action, hotkey in value.items():
+        if not isinstance(hotkey, str) or not hotkey.strip():
+            raise ValueError(f"热键{action}不能为空")
+        hotkeys[action] = hotkey
+    return hotkeys
+
+
+def _repair_point(pos):
+    """修正可以无损转换为整数的坐标(如 "100"、100.0)
+    Returns:
+        (修正后的坐标字典, 是否修正过)
+    """
+    point = {}
+    repaired = False
+    for axis in ('x', 'y'):
+        value = pos.get(axis)
+        if isinstance(value, int) and not isinstance(value, bool):
+            point[axis] = value
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            number = None
+        if number is None or not number.is_integer():
+            raise ValueError("需要整数x和y")
+        point[axis] = int(number)
+        repaired = True
+    return point, repaired
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _valid_region(value):
+    return value is None or (isinstance(value, (list, tuple)) and len(value) == 4
+                             and all(isinstance(v, int) and not isinstance(v, bool) for v in value))
+
+
+def _valid_trigger(value):
+    """检查trigger能否由compile_trigger编译，且各数值项为数字"""
+    if not value:
+        return True
+    if not isinstance(value, dict):
+        return False
+    try:
+        compiled = compile_trigger(value)
+    except (KeyError, TypeError, ValueError):
+        return False
+    return (isinstance(compiled[3], (str, type(None))) and all(_is_number(v) for v in compiled[4:])
+            and (compiled[2] is None or len(compiled[2]) == 3))
+
+
+# 位置可选字段的校验，不合法的字段去掉(有缺省值的恢复缺省值)，其余字段保留
+POSITION_FIELDS = {
+    "button": lambda value: value in BUTTON_NAMES,
+    "focus_mode": lambda value: value in FOCUS_MODES,
+    "focus_delay": lambda value: _is_number(value) and value >= 0,
+    "text": lambda value: isinstance(value, str),
+    "text_interval": lambda value: _is_number(value) and value >= 0,
+    "template": lambda value: isinstance(value, str),
+    "region": _valid_region,
+    "threshold": lambda value: _is_number(value) and 0 <= value <= 1,
+    "trigger": _valid_trigger,
+}
+
+
+def _check_positions(value):
+    """逐个校验位置，只去掉或修正不合法的位置和字段，其余保留"""
+    positions = []
+    problems = []
+    for i, pos in enumerate(value):
+        if not isinstance(pos, dict):
+            problems.append(f"第{i + 1}个位置应为字典，已忽略")
+            continue
+        try:
+            point, repaired = _repair_point(pos)
+        except ValueError as e:
+            problems.append(f"第{i + 1}个位置{e}，已忽略")
+            continue
+        if repaired:
+            problems.append(f"第{i + 1}个位置的坐标已转换为整数")
+        pos = {**POSITION_DEFAULTS, **pos, **point}
+        for key, valid in POSITION_FIELDS.items():
+            if key in pos and not valid(pos[key]):
+                problems.append(f"第{i + 1}个位置的{key}不合法: {pos[key]!r}，已使用缺省值")
+                del pos[key]
+                if key in POSITION_DEFAULTS:
+                    pos[key] = POSITION_DEFAULTS[key]
+        positions.append(pos)
+    if problems:
+        raise PartialValueError(positions, problems)
+    return positions
+
+
+def _check_log_level(value):
+    value = value.upper()
+    if value not in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
+        raise ValueError("未知的日志级别")
+    return value
+
+
+# 写入失败后重试的等待时间(秒)，每次失败加倍
+WRITE_RETRY_MIN = 0.1
+WRITE_RETRY_MAX = 5.0
+
+DEFAULT_HOTKEYS = {"start": "f6", "stop": "f7", "pause": "f8"}
+
+# 位置字典缺省的字段
+POSITION_DEFAULTS = {"note": "", "enabled": True, "text": "", "text_interval": 1000}
+
+# 唯一的配置模式，默认配置也由此生成
+SCHEMA = {
+    "default_settings": {
+        "interval": Field(100, int, minimum=0),
+        "min_interval": Field(80, int, minimum=0),
+        "max_interval": Field(120, int, minimum=0),
+        "count": Field(-1, int),
+        "button": Field("left", choices=("left", "right", "middle")),
+        "click_type": Field("single"),
+        "position_type": Field("current", choices=("current", "fixed")),
+        "fixed_position": Field({"x": 0, "y": 0}, check=_check_point),
+        "hotkeys": Field(DEFAULT_HOTKEYS, check=_check_hotkeys),
+        "randomize": Field(True),
+        "sound_effects": Field(False),
+        "dark_mode": Field(False),
+        "multi_position": Field(False),
+        "input_backend": Field("auto", choices=("auto", "xtest", "pyautogui", "recording")),
+        "positions": Field([{"x": 0, "y": 0, "note": "默认位置", "enabled": True, "text": "", "text_interval": 1000}],
+                           check=_check_positions),
+    },
+    "app_settings": {
+        "language": Field("zh"),
+        "check_for_updates": Field(True),
+        "logging_enabled": Field(False),
+        "log_level": Field("INFO", check=_check_log_level),
+        "active_profile": Field(""),
+        # 任务结果数据库，相对于配置文件目录，空字符串表示不保存
+        "task_store": Field("tasks.db"),
+        "task_retention_days": Field(7, (int, float), minimum=0),
+        # 任务调度器的线程池大小，和数据处理任务的进程池大小(0为CPU核数，负数为不使用进程池)
+        "task_threads": Field(5, int, minimum=1),
+        "task_processes": Field(0, int),
+    },
+}
+
+# 命名点击配置中可覆盖的设置项，未设置的项取default_settings
+PROFILE_KEYS = ("interval", "count", "button", "randomize", "min_interval", "max_interval",
+                "position_type", "fixed_position", "multi_position", "positions")
+
+
+def default_config():
+    """由配置模式生成默认配置"""
+    config = {section: {key: copy.deepcopy(field.default) for key, field in fields.items()}
+              for section, fields in SCHEMA.items()}
+    config["profiles"] = {}
+    return config
+
+
+def validate_config(config):
+    """按配置模式校验配置，缺失或不合法的项使用默认值，未知的项原样保留
+    Args:
+        config: 配置字典
+    Returns:
+        (规范化后的配置, 错误信息列表)
+    """
+    errors = []
+    result = dict(config) if isinstance(config, dict) else {}
+    for section, fields in SCHEMA.items():
+        values = result.get(section)
+        if not isinstance(values, dict):
+            if values is not None:
+                errors.append(f"{section}: 应为字典")
+            values = {}
+        values = dict(values)
+        for key, field in fields.items():
+            if key not in values:
+                values[key] = copy.deepcopy(field.default)
+                continue
+            try:
+                values[key] = field.validate(values[key])
+            except PartialValueError as e:
+                errors.extend(f"{section}.{key}: {problem}" for problem in e.problems)
+                values[key] = e.value
+            except ValueError as e:
+                errors.append(f"{section}.{key}: {e}")
+                values[key] = copy.deepcopy(field.default)
+        result[section] = values
+    # 命名配置只检查结构，各配置在首次使用时才校验
+    profiles = result.get("profiles")
+    if profiles is None:
+        result["profiles"] = {}
+    elif not isinstance(profiles, dict) or not all(isinstance(p, dict) for p in profiles.values()):
+        errors.append("profiles: 应为 名称->配置 的字典")
+        result["profiles"] = {}
+    return result, errors
+
+
+def validate_profile(profile, base):
+    """校验命名配置并与基础设置合并
+    Args:
+        profile: 配置中的命名配置字典
+        base: 基础设置(default_settings)
+    Returns:
+        (只包含PROFILE_KEYS的设置字典, 错误信息列表)
+    """
+    errors = []
+    fields = SCHEMA["default_settings"]
+    settings = {}
+    for key in PROFILE_KEYS:
+        if key not in profile:
+            settings[key] = base[key]
+            continue
+        try:
+            settings[key] = fields[key].validate(profile[key])
+        except PartialValueError as e:
+            errors.extend(f"{key}: {problem}" for problem in e.problems)
+            settings[key] = e.value
+        except ValueError as e:
+            errors.append(f"{key}: {e}")
+            settings[key] = base[key]
+    return settings, errors
+
+
+def setup_logging(app_settings):
+    """按应用设置配置日志，默认关闭"""
+    logger = logging.getLogger('auto_click')
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.propagate = False
+    if app_settings.get('logging_enabled'):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(getattr(logging, str(app_settings.get('log_level', 'INFO')).upper(), logging.INFO))
+    else:
+        logger.addHandler(logging.NullHandler())
+        logger.setLevel(logging.CRITICAL + 1)
 
 class Config:
-    def __init__(self, config_path):
+    """配置存储
+
+    解析后的配置按文件的修改时间和大小缓存，文件被外部修改后自动重新加载。
+    保存时先写临时文件再原子替换，连续的保存在后台线程中合并为一次写入。
+    写入失败时保留待保存的数据，按逐次加倍的间隔重试。
+    """
+
+    def __init__(self, config_path, debounce=0.5):
         """初始化配置管理器
         Args:
             config_path: 配置文件路径
+            debounce: 保存的合并等待时间(秒)，期间的多次保存只写入最后一次
         """
         self.config_path = config_path
+        self.debounce = debounce
+        self._cache = None
+        self._stamp = None
+        self._lock = threading.Condition()
+        self._pending = None
+        self._pending_at = 0.0
+        # 最近一次写入失败的数据、连续失败次数和下一次重试的时间
+        self._failed = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._writer = None
+        self._closed = False
+        # 读取和写入次数，用于确认缓存和合并写入生效
+        self.reads = 0
+        self.writes = 0
         # 确保配置文件存在
         if not os.path.exists(self.config_path):
             self._create_default_config()
 
     def _create_default_config(self):
         """创建默认配置文件"""
-        default_config = {
-            "default_settings": {
-                "interval": 100,
-                "min_interval": 80,
-                "max_interval": 120,
-                "count": -1,
-                "button": "left",
-                "click_type": "single",
-                "position_type": "current",
-                "fixed_position": {"x": 0, "y": 0},
-                "hotkeys": {
-                    "start": "f6",
-                    "stop": "f7",
-                    "pause": "f8"
-                },
-                "randomize": True,
-                "sound_effects": False,
-                "dark_mode": False,
-                "multi_position": False,
-                "positions": [
-                    {
-                        "x": 0,
-                        "y": 0,
-                        "note": "默认位置",
-                        "enabled": True,
-                        "text": "",
-                        "text_interval": 1000
-                    }
-                ]
-            },
-            "app_settings": {
-                "language": "zh",
-                "check_for_updates": True,
-                "logging_enabled": False,
-                "log_level": "INFO"
-            }
-        }
-        with open(self.config_path, 'w', encoding='utf-8') as f:
-            json.dump(default_config, f, indent=4, ensure_ascii=False)
+        self._write(json.dumps(default_config(), indent=4, ensure_ascii=False))
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
 
     def load_config(self):
-        """加载配置文件
+        """加载配置文件，文件未变化时直接返回缓存
         Returns:
-            配置字典
+            配置字典，即缓存对象本身，修改后通过save_config保存
         """
-        try:
-            # 首先加载默认配置
-            default_config = {
-                "default_settings": {
-                    "interval": 100,
-                    "min_interval": 80,
-                    "max_interval": 120,
-                    "count": -1,
-                    "button": "left",
-                    "click_type": "single",
-                    "position_type": "current",
-                    "fixed_position": {"x": 0, "y": 0},
-                    "hotkeys": {
-                        "start": "f6",
-                        "stop": "f7",
-                        "pause": "f8"
-                    },
-                    "randomize": True,
-                    "sound_effects": False,
-                    "dark_mode": False,
-                    "multi_position": False,
-                    "positions": [
-                        {
-                            "x": 0,
-                            "y": 0,
-                            "note": "默认位置",
-                            "enabled": True,
-                            "text": "",
-                            "text_interval": 1000
-                        }
-                    ]
-                },
-                "app_settings": {
-                    "language": "zh",
-                    "check_for_updates": True,
-                    "logging_enabled": False,
-                    "log_level": "INFO"
-                }
-            }
-
-            # 如果配置文件存在，则加载并合并配置
-            if os.path.exists(self.config_path):
+        with self._lock:
+            stamp = self._file_stamp()
+            if self._cache is not None and (stamp == self._stamp or self._pending is not None):
+                return self._cache
+            try:
                 with open(self.config_path, 'r', encoding='utf-8') as f:
                     user_config = json.load(f)
-                    
-                # 合并default_settings
-                if "default_settings" in user_config:
-                    default_config["default_settings"].update(user_config["default_settings"])
-                
-                # 合并app_settings
-                if "app_settings" in user_config:
-                    default_config["app_settings"].update(user_config["app_settings"])
-                
-            return default_config
-        except Exception as e:
-            print(f"加载配置出错: {e}")
-            # 如果加载失败，创建并返回默认配置
-            self._create_default_config()
-            return self.load_config()
+                self.reads += 1
+            except FileNotFoundError:
+                user_config = {}
+            except (OSError, ValueError) as e:
+                # 损坏的配置文件备份后以默认配置替换，不丢失用户的原文件
+                logger.warning("加载配置出错，已备份并使用默认配置: %s", e)
+                try:
+                    os.replace(self.config_path, self.config_path + '.bak')
+                except OSError:
+                    pass
+                user_config = {}
+            config, errors = validate_config(user_config)
+            for error in errors:
+                logger.warning("配置项无效，已使用默认值: %s", error)
+            if not os.path.exists(self.config_path):
+                self._write(json.dumps(config, indent=4, ensure_ascii=False))
+            self._cache = config
+            self._stamp = self._file_stamp()
+            return config
 
-    def save_config(self, config):
-        """保存配置文件
+    def save_config(self, config, wait=False):
+        """保存配置文件，写入在后台线程中进行
         Args:
             config: 配置字典
+            wait: 是否等待写入完成
+        Returns:
+            是否成功(后台写入时表示已校验并排队，等待时表示已写入文件)
+        """
+        validated, errors = validate_config(config)
+        for error in errors:
+            logger.warning("配置项无效，已使用默认值: %s", error)
+        # 规范化后的各部分写回调用方的字典，调用方持有的对象即缓存对象
+        config.update(validated)
+        # 在调用线程中序列化，得到不受后续修改影响的快照
+        data = json.dumps(config, indent=4, ensure_ascii=False)
+        with self._lock:
+            self._cache = config
+            self._pending = data
+            self._pending_at = time.monotonic()
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='config-writer', daemon=True)
+                self._writer.start()
+            self._lock.notify_all()
+        if wait:
+            return self.flush()
+        return True
+
+    def flush(self, timeout=5.0):
+        """立即写入待保存的配置并等待完成
+        Returns:
+            是否已全部写入，写入失败时为False，数据保留并在后台继续重试
         """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            # 取消合并等待和重试等待，失败过的数据重新写入一次
+            self._pending_at = float('-inf')
+            self._retry_at = 0.0
+            self._failed = None
+            self._lock.notify_all()
+            while self._pending is not None:
+                if self._pending is self._failed:
+                    return False
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._writer is None:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def close(self):
+        """写入待保存的配置并停止后台线程"""
+        if not self.flush():
+            logger.warning("关闭时配置未能保存")
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        if self._writer:
+            self._writer.join(timeout=1.0)
+            self._writer = None
+
+    def _write_loop(self):
+        """后台写入线程：等待合并时间内没有新的保存后写入最后一次，失败时等待后重试"""
+        with self._lock:
+            while not self._closed:
+                if self._pending is None:
+                    self._lock.wait()
+                    continue
+                remaining = max(self._pending_at + self.debounce, self._retry_at) - time.monotonic()
+                if remaining > 0:
+                    self._lock.wait(remaining)
+                    continue
+                data = self._pending
+                self._lock.release()
+                written = False
+                try:
+                    written = self._write(data)
+                finally:
+                    self._lock.acquire()
+                if written:
+                    self._failures = 0
+                    self._retry_at = 0.0
+                    # 写入期间有新的保存时继续写入新的数据
+                    if self._pending is data:
+                        self._pending = None
+                else:
+                    # 数据保留在_pending中重试；写入期间有新的保存时重试写入新的数据
+                    self._failed = data
+                    self._failures += 1
+                    self._retry_at = time.monotonic() + min(WRITE_RETRY_MIN * 2 ** (self._failures - 1),
+                                                            WRITE_RETRY_MAX)
+                self._stamp = self._file_stamp()
+                self._lock.notify_all()
+
+    def _write(self, data):
+        """先写入同目录下的临时文件再原子替换，不会留下写了一半的配置文件"""
+        directory = os.path.dirname(os.path.abspath(self.config_path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.config.', suffix='.tmp', dir=directory)
         try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=4, ensure_ascii=False)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_path)
+            self.writes += 1
             return True
         except Exception as e:
-            print(f"保存配置出错: {e}")
-            return False
\ No newline at end of file
+            logger.warning("保存配置出错: %s", e)
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return False
@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+守护进程模块 - 无界面运行点击器，通过本地Unix套接字上的JSON-RPC控制
+"""
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import argparse
+import threading
+import socketserver
+
+from clicker import Clicker
+from config import Config, setup_logging
+from profiles import ProfileStore
+from hotkey import HotkeyListener
+
+logger = logging.getLogger('auto_click.daemon')
+
+# JSON-RPC 2.0 错误码
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+APP_ERROR = -32000
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+
+
+def default_socket_path():
+    """默认的套接字路径，可用环境变量AUTO_CLICK_SOCKET覆盖"""
+    path = os.environ.get('AUTO_CLICK_SOCKET')
+    if path:
+        return path
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'auto_click.sock')
+    return f'/tmp/auto_click-{os.getuid()}.sock'
+
+
+class RPCError(Exception):
+    """JSON-RPC错误，携带错误码"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class ClickDaemon:
+    """无界面的点击服务
+
+    持有点击器、热键监听器和任务调度器，通过Unix套接字接收按行分隔的JSON-RPC 2.0请求。
+    每个连接由独立线程处理；订阅统计的连接按设定的间隔持续收到通知，直到断开。
+    """
+
+    def __init__(self, config_path=DEFAULT_CONFIG, socket_path=None, hotkeys=True, backend=None):
+        """初始化守护进程
+        Args:
+            config_path: 配置文件路径
+            socket_path: 套接字路径，None表示默认路径
+            hotkeys: 是否监听热键
+            backend: 输入后端名称或实例，None表示使用配置中的后端
+        """
+        self.config = Config(config_path)
+        self.settings = self.config.load_config()
+        self.profiles = ProfileStore(self.config)
+        self.socket_path = socket_path or default_socket_path()
+        setup_logging(self.settings['app_settings'])
+
+        default_settings = self.settings['default_settings']
+        self.clicker = Clicker(
+            interval=default_settings['interval'],
+            count=default_settings['count'],
+            button=default_settings['button'],
+            randomize=default_settings['randomize'],
+            min_interval=default_settings['min_interval'],
+            max_interval=default_settings['max_interval'],
+            position_type=default_settings['position_type'],
+            fixed_position=default_settings['fixed_position'],
+            multi_position=default_settings['multi_position'],
+            positions=default_settings['positions'],
+            backend=backend or default_settings['input_backend']
+        )
+        active = self.settings['app_settings'].get('active_profile')
+        if active and active in self.profiles.names():
+            profile = self.profiles.get(active)
+            self.clicker.switch_profile(profile.settings, profile.plan)
+
+        self.hotkey_listener = None
+        if hotkeys:
+            self.hotkey_listener = HotkeyListener(
+                start_hotkey=default_settings['hotkeys']['start'],
+                stop_hotkey=default_settings['hotkeys']['stop'],
+                pause_hotkey=default_settings['hotkeys']['pause'],
+                on_start=self.start,
+                on_stop=self.stop,
+                on_pause=self.toggle_pause
+            )
+            for name, hotkey in self.profiles.hotkeys().items():
+                try:
+                    self.hotkey_listener.bind(f'profile:{name}', hotkey, lambda name=name: self.load_profile(name))
+                except ValueError as e:
+                    logger.warning("配置%s的热键无效: %s", name, e)
+
+        # 任务调度器在首次提交任务时创建
+        self._scheduler = None
+        self._lock = threading.Lock()
+        self.running = False
+        self.paused = False
+        self.click_thread = None
+        self.server = None
+        self.started_at = time.time()
+
+        self.methods = {
+            'start': self.start,
+            'stop': self.stop,
+            'pause': self.pause,
+            'resume': self.resume,
+            'status': self.status,
+            'profiles': self.profiles.names,
+            'load_profile': self.load_profile,
+            'update_settings': self.update_settings,
+            'submit_task': self.submit_task,
+            'task_status': self.task_status,
+            'cancel_task': self.cancel_task,
+            'metrics': self.metrics,
+            'shutdown': self.shutdown,
+        }
+
+    @property
+    def scheduler(self):
+        """任务调度器"""
+        if self._scheduler is None:
+            from task_scheduler import TaskScheduler
+            from task_store import TaskStore
+            app_settings = self.settings['app_settings']
+            path = app_settings['task_store']
+            if path and not os.path.isabs(path):
+                # 相对路径相对于配置文件所在目录
+                path = os.path.join(os.path.dirname(os.path.abspath(self.config.config_path)), path)
+            store = TaskStore(path or None, max_age=app_settings['task_retention_days'] * 86400)
+            self._scheduler = TaskScheduler(max_workers=app_settings['task_threads'], store=store,
+                                            process_workers=app_settings['task_processes'])
+            self._scheduler.start_scheduler()
+        return self._scheduler
+
+    def start(self):
+        """开始点击，暂停中时恢复"""
+        with self._lock:
+            if self.running and self.paused:
+                self.paused = False
+                self.clicker.resume_clicking()
+            elif not self.running:
+                self.running = True
+                self.paused = False
+                self.click_thread = threading.Thread(target=self._click, name='click', daemon=True)
+                self.click_thread.start()
+        return self.status()
+
+    def _click(self):
+        try:
+            self.clicker.start_clicking()
+        finally:
+            # 达到点击次数后自行结束
+            self.running = False
+            self.paused = False
+
+    def stop(self):
+        """停止点击"""
+        with self._lock:
+            if self.running:
+                self.clicker.stop_clicking()
+                if self.click_thread and self.click_thread is not threading.current_thread():
+                    self.click_thread.join(timeout=1.0)
+                self.running = False
+                self.paused = False
+        return self.status()
+
+    def pause(self):
+        """暂停点击"""
+        with self._lock:
+            if self.running and not self.paused:
+                self.paused = True
+                self.clicker.pause_clicking()
+        return self.status()
+
+    def resume(self):
+        """恢复点击"""
+        with self._lock:
+            if self.running and self.paused:
+                self.paused = False
+                self.clicker.resume_clicking()
+        return self.status()
+
+    def toggle_pause(self):
+        """暂停/恢复点击，供热键使用"""
+        return self.resume() if self.paused else self.pause()
+
+    def status(self):
+        """运行状态"""
+        return {
+            'running': self.running,
+            'paused': self.paused,
+            'active_profile': self.settings['app_settings'].get('active_profile', ''),
+            'pid': os.getpid(),
+            'uptime': time.time() - self.started_at
+        }
+
+    def load_profile(self, name):
+        """切换到命名配置，运行中时在下一次点击前生效"""
+        try:
+            profile = self.profiles.get(name)
+        except KeyError:
+            raise RPCError(APP_ERROR, f"配置不存在: {name}")
+        self.clicker.switch_profile(profile.settings, profile.plan)
+        self.settings['app_settings']['active_profile'] = name
+        self.config.save_config(self.settings)
+        return self.status()
+
+    def update_settings(self, **settings):
+        """修改点击设置(不保存到配置文件)，参数同Clicker.update_settings"""
+        try:
+            self.clicker.update_settings(**settings)
+        except TypeError as e:
+            raise RPCError(INVALID_PARAMS, str(e))
+        return self.status()
+
+    def submit_task(self, task):
+        """提交任务到任务调度器
+        Args:
+            task: 任务配置，带schedule_type(或once带at)时按定时任务注册，否则立即在后台执行；
+                任务配置列表作为批量任务并行执行
+        Returns:
+            任务ID或批量ID
+        """
+        if isinstance(task, list):
+            if not all(isinstance(item, dict) and 'type' in item for item in task):
+                raise RPCError(INVALID_PARAMS, "批量任务应为带type的字典列表")
+            return self.scheduler.add_batch_task(task).batch_id
+        if not isinstance(task, dict) or 'type' not in task and 'schedule_type' not in task:
+            raise RPCError(INVALID_PARAMS, "任务应为带type的字典")
+        if task.get('schedule_type', 'once') != 'once' or task.get('at') is not None:
+            return self.scheduler.add_scheduled_task(task)
+        return self.scheduler.submit_task(task)
+
+    def task_status(self, task_id):
+        """查询任务状态"""
+        if self._scheduler is None:
+            return {'status': 'not_found'}
+        return self._scheduler.get_task_status(task_id)
+
+    def cancel_task(self, task_id):
+        """取消任务或批量任务中未开始的任务"""
+        if self._scheduler is None:
+            return False
+        return self._scheduler.cancel_task(task_id)
+
+    def metrics(self):
+        """完整统计：点击器统计加上运行状态和热键统计"""
+        metrics = self.clicker.get_metrics()
+        metrics.update(self.status())
+        if self.hotkey_listener:
+            metrics['hotkeys'] = self.hotkey_listener.stats()
+        return metrics
+
+    def shutdown(self):
+        """停止服务，响应发送后退出"""
+        if self.server:
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        return True
+
+    def handle(self, request):
+        """处理一个JSON-RPC请求
+        Returns:
+            响应字典，通知(没有id)返回None
+        """
+        request_id = request.get('id') if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+                raise RPCError(INVALID_REQUEST, "无效的请求")
+            method = self.methods.get(request['method'])
+            if method is None:
+                raise RPCError(METHOD_NOT_FOUND, f"未知的方法: {request['method']}")
+            params = request.get('params') or {}
+            try:
+                result = method(*params) if isinstance(params, list) else method(**params)
+            except TypeError as e:
+                raise RPCError(INVALID_PARAMS, str(e))
+            response = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        except RPCError as e:
+            response = {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': e.code, 'message': str(e)}}
+        except Exception as e:
+            logger.warning("处理请求出错: %s", e)
+            response = {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': APP_ERROR, 'message': str(e)}}
+        if isinstance(request, dict) and 'id' not in request:
+            return None
+        return response
+
+    def stream_metrics(self, write, interval=1.0, count=0):
+        """按间隔推送统计通知，直到连接断开或达到次数
+        Args:
+            write: 发送一条消息的函数，连接断开时抛出OSError
+            interval: 推送间隔(秒)
+            count: 推送次数，0表示不限
+        """
+        sent = 0
+        while count <= 0 or sent < count:
+            write({'jsonrpc': '2.0', 'method': 'metrics', 'params': self.metrics()})
+            sent += 1
+            if count > 0 and sent >= count:
+                break
+            time.sleep(interval)
+
+    def serve_forever(self):
+        """绑定套接字并处理请求，直到shutdown"""
+        self._remove_stale_socket()
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def write(self, message):
+                self.wfile.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+                self.wfile.flush()
+
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                    except ValueError as e:
+                        self.write({'jsonrpc': '2.0', 'id': None,
+                                    'error': {'code': PARSE_ERROR, 'message': str(e)}})
+                        continue
+                    try:
+                        if isinstance(request, dict) and request.get('method') == 'subscribe_metrics':
+                            # 订阅后该连接只用于推送统计
+                            params = request.get('params') or {}
+                            daemon.stream_metrics(self.write, params.get('interval', 1.0), params.get('count', 0))
+                            return
+                        response = daemon.handle(request)
+                        if response is not None:
+                            self.write(response)
+                    except OSError:
+                        # 客户端已断开
+                        return
+
+        # 在限制的umask下绑定，套接字文件创建时就只有所有者可以连接，不存在可被他人连接的间隙
+        umask = os.umask(0o177)
+        try:
+            self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(umask)
+        self.server.daemon_threads = True
+        if self.hotkey_listener:
+            self.hotkey_listener.start_listening()
+        logger.info("守护进程已启动: %s", self.socket_path)
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+
+    def _remove_stale_socket(self):
+        """删除上次异常退出留下的套接字文件，已有实例在运行时报错"""
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+        else:
+            raise RuntimeError(f"已有守护进程在使用 {self.socket_path}")
+        finally:
+            probe.close()
+
+    def close(self):
+        """停止点击、热键监听和任务调度器，删除套接字文件"""
+        self.stop()
+        if self.hotkey_listener:
+            self.hotkey_listener.stop_listening()
+        if self._scheduler is not None:
+            self._scheduler.stop_scheduler()
+        if self.server:
+            self.server.server_close()
+            self.server = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        self.config.close()
+
+
+class DaemonClient:
+    """守护进程的JSON-RPC客户端"""
+
+    def __init__(self, socket_path=None, timeout=10.0):
+        """
+        Args:
+            socket_path: 套接字路径，None表示默认路径
+            timeout: 等待响应的超时时间(秒)
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self._ids = 0
+        self._sock = None
+        self._file = None
+
+    def _connect(self):
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(self.timeout)
+            self._sock.connect(self.socket_path)
+            self._file = self._sock.makefile('rb')
+        return self._sock
+
+    def _send(self, method, params):
+        self._ids += 1
+        request = {'jsonrpc': '2.0', 'id': self._ids, 'method': method, 'params': params}
+        self._connect().sendall(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+
+    def _receive(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("守护进程已断开连接")
+        return json.loads(line)
+
+    def call(self, method, **params):
+        """调用一个方法并返回结果
+        Raises:
+            RPCError: 守护进程返回错误
+        """
+        self._send(method, params)
+        response = self._receive()
+        if 'error' in response:
+            raise RPCError(response['error']['code'], response['error']['message'])
+        return response['result']
+
+    def stream_metrics(self, interval=1.0, count=0):
+        """订阅统计，逐条返回统计字典；该连接之后不能再用于调用"""
+        self._send('subscribe_metrics', {'interval': interval, 'count': count})
+        self._sock.settimeout(None)
+        received = 0
+        while count <= 0 or received < count:
+            yield self._receive()['params']
+            received += 1
+        self.close()
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = self._file = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="连点器守护进程和命令行客户端")
+    parser.add_argument('--socket', help="套接字路径，默认 $AUTO_CLICK_SOCKET 或运行时目录下的 auto_click.sock")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help="启动守护进程")
+    serve.add_argument('--config', default=DEFAULT_CONFIG, help="配置文件路径")
+    serve.add_argument('--no-hotkeys', action='store_true', help="不监听热键")
+    serve.add_argument('--backend', help="输入后端，默认使用配置中的设置")
+    for name, description in (('start', "开始点击"), ('stop', "停止点击"), ('pause', "暂停点击"),
+                              ('resume', "恢复点击"), ('status', "查看状态"), ('profiles', "列出命名配置"),
+                              ('shutdown', "停止守护进程")):
+        commands.add_parser(name, help=description)
+    profile = commands.add_parser('profile', help="切换命名配置")
+    profile.add_argument('name')
+    submit = commands.add_parser('submit', help="提交任务，参数为任务配置JSON文件，-表示标准输入")
+    submit.add_argument('file')
+    task = commands.add_parser('task', help="查询任务状态")
+    task.add_argument('task_id')
+    cancel = commands.add_parser('cancel', help="取消任务或批量任务")
+    cancel.add_argument('task_id')
+    metrics = commands.add_parser('metrics', help="查看统计")
+    metrics.add_argument('--interval', type=float, default=0, help="大于0时按间隔(秒)持续输出")
+    metrics.add_argument('--count', type=int, default=0, help="持续输出的次数，0表示不限")
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        ClickDaemon(args.config, args.socket, hotkeys=not args.no_hotkeys, backend=args.backend).serve_forever()
+        return 0
+
+    client = DaemonClient(args.socket)
+    try:
+        if args.command == 'metrics' and args.interval > 0:
+            for snapshot in client.stream_metrics(args.interval, args.count):
+                print(json.dumps(snapshot, ensure_ascii=False), flush=True)
+            return 0
+        if args.command == 'profile':
+            result = client.call('load_profile', name=args.name)
+        elif args.command == 'submit':
+            if args.file == '-':
+                task_config = json.load(sys.stdin)
+            else:
+                with open(args.file, 'r', encoding='utf-8') as f:
+                    task_config = json.load(f)
+            result = client.call('submit_task', task=task_config)
+        elif args.command == 'task':
+            result = client.call('task_status', task_id=args.task_id)
+        elif args.command == 'cancel':
+            result = client.call('cancel_task', task_id=args.task_id)
+        else:
+            result = client.call(args.command)
+    except RPCError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"无法连接守护进程 {client.socket_path}: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        client.close()
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据处理模块 - data_processing任务的CSV和JSON处理
+
+函数都在模块顶层且只接收可序列化的参数，可以提交到进程池执行。
+"""
+import io
+import os
+import csv
+import json
+import time
+import logging
+
+from expression import compile_expression
+
+logger = logging.getLogger('auto_click.data_processing')
+
+# CSV分块处理时每块的行数
+DEFAULT_CHUNKSIZE = 100000
+
+# 可以分区计算后合并的聚合函数 -> 合并部分结果的函数
+MERGEABLE_AGGREGATIONS = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max', 'mean': None}
+
+# 聚合时每个分区至少的字节数，小文件在本进程中计算
+MIN_PARTITION_BYTES = 32 << 20
+
+
+def process_data(data_config):
+    """数据处理任务
+    Args:
+        data_config: 任务配置中的data_config，action为csv_processing或json_processing
+    Returns:
+        结果摘要列表
+    """
+    results = []
+
+    if data_config['action'] == 'csv_processing':
+        results.append(process_csv(data_config))
+
+    elif data_config['action'] == 'json_processing':
+        with open(data_config['input_file'], 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        # 处理JSON数据
+        processed_data = process_json_data(data, data_config['operations'])
+
+        with open(data_config['output_file'], 'w', encoding='utf-8') as f:
+            json.dump(processed_data, f, indent=2, ensure_ascii=False)
+
+        results.append({'status': 'success', 'items_processed': len(processed_data)})
+
+    return results
+
+
+def process_csv(data_config):
+    """CSV处理
+
+    只有逐行的操作(filter/transform)时按chunksize分块读取，每块依次经过编译好的操作链后
+    立即追加到输出文件，内存占用与文件大小无关。aggregate只用sum/count/min/max/mean时
+    由aggregate_csv分区并行计算，其他聚合函数读入整个文件处理；分组的列作为输出的前几列。
+    Args:
+        data_config: input_file、output_file、operations，可选chunksize(每块行数)、
+            usecols(只读取的列)和dtype(列类型)，后两者直接交给CSV读取器，
+            以及workers(聚合的并行分区数，默认CPU核数)
+    Returns:
+        结果摘要，包含读取和输出的行数、块数、耗时和每秒处理行数
+    """
+    import pandas as pd
+    operations = data_config['operations']
+    options = {key: data_config[key] for key in ('usecols', 'dtype') if data_config.get(key) is not None}
+    started = time.perf_counter()
+    rows_read = rows_written = chunks = 0
+    partitions = 1
+
+    if any(operation['type'] == 'aggregate' for operation in operations):
+        index = next(i for i, operation in enumerate(operations) if operation['type'] == 'aggregate')
+        before, aggregate, after = operations[:index], operations[index], operations[index + 1:]
+        if aggregation_plan(aggregate['aggregations']) is not None:
+            # 分区并行计算部分聚合后合并，逐块读取
+            df, rows_read, chunks, partitions = aggregate_csv(data_config, before, aggregate)
+        else:
+            df = pd.read_csv(data_config['input_file'], **options)
+            rows_read = len(df)
+            chunks = partitions = 1
+            df = compile_row_operations(before)(df)
+            df = df.groupby(aggregate['group_by']).agg(aggregate['aggregations']).reset_index()
+        for operation in after:
+            if operation['type'] == 'aggregate':
+                df = df.groupby(operation['group_by']).agg(operation['aggregations']).reset_index()
+            else:
+                df = compile_row_operations([operation])(df)
+        df.to_csv(data_config['output_file'], index=False)
+        rows_written = len(df)
+    else:
+        pipeline = compile_row_operations(operations)
+        reader = pd.read_csv(data_config['input_file'], chunksize=data_config.get('chunksize') or DEFAULT_CHUNKSIZE,
+                             **options)
+        with open(data_config['output_file'], 'w', encoding='utf-8', newline='') as f:
+            for chunk in reader:
+                rows_read += len(chunk)
+                chunk = pipeline(chunk)
+                # 只有第一块写列名，之后追加
+                chunk.to_csv(f, header=chunks == 0, index=False)
+                rows_written += len(chunk)
+                chunks += 1
+            if chunks == 0:
+                # 只有列名的输入可能不产生任何块，仍按操作后的列写入列名
+                pipeline(pd.read_csv(data_config['input_file'], nrows=0, **options)).to_csv(f, index=False)
+
+    elapsed = time.perf_counter() - started
+    rate = rows_read / elapsed if elapsed > 0 else 0.0
+    logger.info("CSV处理完成: 读取%d行，输出%d行，%d块，%.0f行/秒", rows_read, rows_written, chunks, rate)
+    return {'status': 'success', 'rows_processed': rows_written, 'rows_read': rows_read, 'chunks': chunks,
+            'partitions': partitions, 'elapsed': elapsed, 'rows_per_sec': rate}
+
+
+def aggregation_plan(aggregations):
+    """把aggregations({列: 函数或函数列表})拆成可合并的部分聚合
+    Returns:
+        (输出列, 源列, 函数) 列表；有不能分区合并的函数时为None
+    """
+    if not isinstance(aggregations, dict):
+        return None
+    plan = []
+    multi = any(isinstance(functions, (list, tuple)) for functions in aggregations.values())
+    for column, functions in aggregations.items():
+        for function in (functions if isinstance(functions, (list, tuple)) else [functions]):
+            if function not in MERGEABLE_AGGREGATIONS:
+                return None
+            # 与pandas相同：有函数列表时列名为(列, 函数)
+            plan.append(((column, function) if multi else column, column, function))
+    return plan
+
+
+def _partial_columns(plan):
+    """部分聚合的列：mean由sum和count合并后相除"""
+    partials = []
+    for _, column, function in plan:
+        for part in (('sum', 'count') if function == 'mean' else (function,)):
+            if (column, part) not in partials:
+                partials.append((column, part))
+    return partials
+
+
+def _merge_partials(partials, keys, specs):
+    """合并部分聚合：sum和count相加，min和max再取最小/最大"""
+    import pandas as pd
+    df = pd.concat(partials)
+    if len(partials) == 1:
+        return df
+    return df.groupby(level=list(range(len(keys)))).agg(
+        {f'{column}\x00{part}': MERGEABLE_AGGREGATIONS[part] for column, part in specs})
+
+
+class _RangeFile(io.RawIOBase):
+    """只读取文件中[start, end)字节范围的文件对象"""
+
+    def __init__(self, path, start, end):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._remaining <= 0:
+            return 0
+        count = self._file.readinto(memoryview(buffer)[:self._remaining])
+        self._remaining -= count
+        return count
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _aggregate_partition(path, start, end, columns, options, operations, keys, specs, chunksize):
+    """聚合一个分区：逐块读取、执行聚合之前的逐行操作，计算并合并部分聚合
+    Returns:
+        (读取行数, 块数, 部分聚合的DataFrame)
+    """
+    import pandas as pd
+    pipeline = compile_row_operations(operations)
+    named = {f'{column}\x00{part}': (column, part) for column, part in specs}
+    rows = chunks = 0
+    partial = None
+    with io.BufferedReader(_RangeFile(path, start, end), 1 << 20) as f:
+        for chunk in pd.read_csv(f, names=columns, header=None, chunksize=chunksize, encoding='utf-8', **options):
+            rows += len(chunk)
+            chunks += 1
+            chunk = pipeline(chunk)
+            if not len(chunk):
+                continue
+            current = chunk.groupby(keys).agg(**named)
+            # 每块之后立即合并，内存只与分组数有关
+            partial = current if partial is None else _merge_partials([partial, current], keys, specs)
+    return rows, chunks, partial
+
+
+def _partition_bounds(path, count):
+    """按字节把数据行切分为count个分区，边界对齐到行首
+    Returns:
+        (列名, 边界列表)
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        start = f.tell()
+        bounds = [start]
+        for i in range(1, count):
+            f.seek(start + (size - start) * i // count)
+            # 跳到下一行的行首，跨过切分点的行属于前一个分区
+            f.readline()
+            position = f.tell()
+            if bounds[-1] < position < size:
+                bounds.append(position)
+        bounds.append(size)
+    columns = next(csv.reader([header.decode('utf-8-sig')]))
+    return columns, bounds
+
+
+def aggregate_csv(data_config, operations, aggregate):
+    """分区并行的分组聚合(map-reduce)
+
+    数据行按字节范围切分为多个分区，每个分区在独立的进程中逐块读取，
+    执行聚合之前的逐行操作并计算部分聚合(sum、count、min、max，mean拆为sum和count)，
+    各分区只返回按分组合并后的结果，最后在本进程中合并。按字节切分要求字段中没有换行，
+    有多行字段的文件应设置workers为1。
+    Args:
+        data_config: CSV处理的配置
+        operations: 聚合之前的逐行操作
+        aggregate: aggregate操作，group_by为列名或列名列表
+    Returns:
+        (聚合结果DataFrame, 读取行数, 块数, 分区数)
+    """
+    import pandas as pd
+    path = data_config['input_file']
+    keys = aggregate['group_by'] if isinstance(aggregate['group_by'], list) else [aggregate['group_by']]
+    plan = aggregation_plan(aggregate['aggregations'])
+    specs = _partial_columns(plan)
+    options = {key: data_config[key] for key in ('usecols', 'dtype') if data_config.get(key) is not None}
+    chunksize = data_config.get('chunksize') or DEFAULT_CHUNKSIZE
+    workers = data_config.get('workers') or os.cpu_count() or 1
+    # 小文件不值得启动进程
+    count = max(1, min(workers, os.path.getsize(path) // MIN_PARTITION_BYTES))
+    columns, bounds = _partition_bounds(path, count)
+    jobs = [(path, start, end, columns, options, operations, keys, specs, chunksize)
+            for start, end in zip(bounds, bounds[1:])]
+
+    if len(jobs) == 1:
+        outputs = [_aggregate_partition(*jobs[0])]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=len(jobs), mp_context=process_context()) as pool:
+            outputs = list(pool.map(_aggregate_partition, *zip(*jobs)))
+
+    partials = [partial for _, _, partial in outputs if partial is not None]
+    if partials:
+        merged = _merge_partials(partials, keys, specs).sort_index()
+        result = pd.DataFrame(index=merged.index)
+    else:
+        merged = None
+        result = pd.DataFrame(index=pd.MultiIndex.from_arrays([[]] * len(keys), names=keys)
+                              if len(keys) > 1 else pd.Index([], name=keys[0]))
+    for name, column, function in plan:
+        if merged is None:
+            result[name] = []
+        elif function == 'mean':
+            result[name] = merged[f'{column}\x00sum'] / merged[f'{column}\x00count']
+        else:
+            result[name] = merged[f'{column}\x00{function}']
+    if any(isinstance(name, tuple) for name, _, _ in plan):
+        result.columns = pd.MultiIndex.from_tuples(result.columns)
+    rows = sum(output[0] for output in outputs)
+    chunks = sum(output[1] for output in outputs)
+    return result.reset_index(), rows, chunks, len(jobs)
+
+
+def process_context():
+    """进程池的启动方式：调用方可能有多个线程，fork出的子进程会继承被持有的锁，使用forkserver或spawn"""
+    import multiprocessing
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def compile_row_operations(operations):
+    """把逐行的filter/transform操作编译为一个对DataFrame执行的函数
+
+    transform的表达式只编译一次并按列向量化执行；相邻的filter合并为一个布尔掩码，只做一次行选择。
+    Returns:
+        函数(DataFrame) -> DataFrame
+    """
+    steps = []
+    filters = []
+    for operation in operations:
+        if operation['type'] == 'filter':
+            filters.append((operation['column'], operation['value']))
+            continue
+        if filters:
+            steps.append(_filter_step(filters))
+            filters = []
+        if operation['type'] == 'transform':
+            steps.append(_transform_step(operation['column'], transform_expression(operation)))
+        else:
+            raise ValueError(f"不支持的CSV操作: {operation['type']}")
+    if filters:
+        steps.append(_filter_step(filters))
+
+    def run(df):
+        for step in steps:
+            df = step(df)
+        return df
+    return run
+
+
+def _filter_step(filters):
+    def step(df):
+        mask = None
+        for column, value in filters:
+            series = df[column]
+            if series.dtype != object and not str(series.dtype).startswith('str'):
+                series = series.astype(str)
+            matched = series.str.contains(value, na=False)
+            mask = matched if mask is None else mask & matched
+        return df[mask]
+    return step
+
+
+def transform_expression(operation):
+    """编译transform操作的表达式，expression或function(兼容 lambda x: ... 的写法)"""
+    text = operation.get('expression', operation.get('function'))
+    if not isinstance(text, str):
+        raise ValueError("transform操作缺少expression")
+    return compile_expression(text)
+
+
+def _transform_step(column, expression):
+    def step(df):
+        # assign返回新的DataFrame，不修改过滤得到的切片
+        return df.assign(**{column: expression.evaluate_frame(df, column)})
+    return step
+
+
+def process_json_data(data, operations):
+    """处理JSON数据"""
+    for operation in operations:
+        if operation['type'] == 'filter':
+            if isinstance(data, list):
+                data = [item for item in data if evaluate_condition(item, operation['condition'])]
+        elif operation['type'] == 'transform':
+            if isinstance(data, list):
+                field = operation['field']
+                expression = transform_expression(operation)
+                for item in data:
+                    if field in item:
+                        item[field] = expression(item[field], item)
+        elif operation['type'] == 'extract':
+            if isinstance(data, list):
+                data = [item.get(operation['field']) for item in data if operation['field'] in item]
+
+    return data
+
+
+def evaluate_condition(item, condition):
+    """评估条件"""
+    field = condition['field']
+    operator = condition['operator']
+    value = condition['value']
+
+    if field not in item:
+        return False
+
+    item_value = item[field]
+
+    if operator == 'equals':
+        return item_value == value
+    elif operator == 'contains':
+        return value in str(item_value)
+    elif operator == 'greater_than':
+        return float(item_value) > float(value)
+    elif operator == 'less_than':
+        return float(item_value) < float(value)
+
+    return False
+
+
+def timed_process_data(data_config):
+    """在进程池中执行的入口，同时返回开始时间用于统计启动延迟
+    Returns:
+        (开始时间戳, 结果摘要列表)
+    """
+    return time.time(), process_data(data_config)
@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表达式模块 - 数据处理transform使用的安全表达式语言，编译一次后逐项或按列向量化执行
+"""
+import ast
+import copy
+import math
+from functools import lru_cache
+
+# 表达式中当前字段值的默认名称
+VALUE_NAMES = ('x', 'value')
+
+# 字符串重复、替换和乘方结果的上限，避免表达式耗尽内存或CPU
+MAX_REPEAT = 1 << 20
+MAX_EXPONENT = 1024
+MAX_POWER_BITS = 1 << 16
+
+_BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+_UNARY_OPERATORS = (ast.UAdd, ast.USub, ast.Not)
+_COMPARE_OPERATORS = (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn)
+
+
+class ExpressionError(ValueError):
+    """表达式不合法或执行出错"""
+
+
+def _is_series(value):
+    return hasattr(value, 'iloc')
+
+
+def _is_numeric_series(value):
+    return value.dtype.kind in 'iufcbmM'
+
+
+def _sequence_length(value):
+    """可以重复的值的长度：字符串、列表，或字符串列中最长的值，其他为None"""
+    if isinstance(value, (str, list, tuple)):
+        return len(value)
+    if _is_series(value) and not _is_numeric_series(value):
+        try:
+            longest = value.str.len().max()
+        except (AttributeError, TypeError):
+            return None
+        return None if longest != longest else int(longest)
+    return None
+
+
+def _repeat_count(value):
+    """重复次数：整数，或整数列中的最大值，其他为None"""
+    if isinstance(value, int):
+        return value
+    if _is_series(value) and value.dtype.kind in 'iub':
+        return int(value.max()) if len(value) else 0
+    return None
+
+
+def _mul(a, b):
+    for sequence, count in ((a, b), (b, a)):
+        length = _sequence_length(sequence)
+        if length:
+            times = _repeat_count(count)
+            if times is not None and length * times > MAX_REPEAT:
+                raise ExpressionError("重复的结果过长")
+    return a * b
+
+
+def _pow(a, b):
+    if isinstance(b, (int, float)) and abs(b) > MAX_EXPONENT:
+        raise ExpressionError("指数过大")
+    if isinstance(a, int) and isinstance(b, int) and b > 0 and a.bit_length() * b > MAX_POWER_BITS:
+        raise ExpressionError("乘方的结果过大")
+    return a ** b
+
+
+def _replace(s, old, new):
+    if len(new) > len(old) and len(s) + s.count(old) * (len(new) - len(old)) > MAX_REPEAT:
+        raise ExpressionError("替换的结果过长")
+    return s.replace(old, new)
+
+
+def _substr(s, start, end=None):
+    return s[start:end]
+
+
+def _coalesce(*values):
+    for value in values:
+        if value is not None and not (isinstance(value, float) and math.isnan(value)):
+            return value
+    return None
+
+
+def _isnull(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _vector_pow(a, b):
+    # 整数列的乘方在int64中会溢出回绕，只对浮点列向量化，整数逐行计算得到精确结果
+    for value in (a, b):
+        if _is_series(value) and value.dtype.kind != 'f':
+            raise _NotVectorizable()
+    return _pow(a, b)
+
+
+def _vector_round(s, digits=None):
+    # 与round()相同：不指定位数时返回整数
+    if digits is not None:
+        return s.round(digits)
+    if s.dtype.kind in 'iub':
+        return s
+    rounded = s.round()
+    if rounded.isna().any():
+        raise _NotVectorizable()
+    return rounded.astype('int64')
+
+
+def _vector_replace(s, old, new):
+    if len(new) > len(old):
+        import re
+        longest = (s.str.len() + s.str.count(re.escape(old)) * (len(new) - len(old))).max()
+        if longest > MAX_REPEAT:
+            raise ExpressionError("替换的结果过长")
+    return s.str.replace(old, new, regex=False)
+
+
+def _vector_or(a, b):
+    """与Python的or相同：返回第一个为真的操作数，不转换为布尔值"""
+    if not _is_series(a):
+        return a or b
+    return a.where(a.astype(bool), b)
+
+
+def _vector_and(a, b):
+    """与Python的and相同：a为假时返回a，否则返回b"""
+    if not _is_series(a):
+        return a and b
+    if not _is_series(b):
+        import pandas as pd
+        b = pd.Series([b] * len(a), index=a.index)
+    return b.where(a.astype(bool), a)
+
+
+def _vector_coalesce(*values):
+    result = values[0]
+    for value in values[1:]:
+        result = result.fillna(value) if _is_series(result) else result
+    return result
+
+
+def _vector_minmax(reduce):
+    def function(*values):
+        import numpy as np
+        result = values[0]
+        for value in values[1:]:
+            result = reduce(np, result, value)
+        return result
+    return function
+
+
+# 函数名 -> (逐项实现, 向量化实现(参数中至少有一个Series)，None表示逐项执行)
+FUNCTIONS = {
+    'abs': (abs, lambda s: s.abs()),
+    'round': (round, _vector_round),
+    'min': (min, _vector_minmax(lambda np, a, b: np.minimum(a, b))),
+    'max': (max, _vector_minmax(lambda np, a, b: np.maximum(a, b))),
+    'len': (len, lambda s: s.str.len()),
+    'str': (str, lambda s: s.astype(str)),
+    'int': (int, lambda s: s.astype('int64')),
+    'float': (float, lambda s: s.astype('float64')),
+    'lower': (str.lower, lambda s: s.str.lower()),
+    'upper': (str.upper, lambda s: s.str.upper()),
+    'strip': (str.strip, lambda s: s.str.strip()),
+    'title': (str.title, lambda s: s.str.title()),
+    'replace': (_replace, _vector_replace),
+    'contains': (lambda s, sub: sub in s, lambda s, sub: s.str.contains(sub, regex=False)),
+    'startswith': (str.startswith, lambda s, prefix: s.str.startswith(prefix)),
+    'endswith': (str.endswith, lambda s, suffix: s.str.endswith(suffix)),
+    'substr': (_substr, lambda s, start, end=None: s.str.slice(start, end)),
+    'coalesce': (_coalesce, _vector_coalesce),
+    'isnull': (_isnull, lambda s: s.isna()),
+    'sqrt': (math.sqrt, None),
+    'log': (math.log, None),
+    'exp': (math.exp, None),
+    'floor': (math.floor, None),
+    'ceil': (math.ceil, None),
+}
+
+# 可以写成方法调用的函数，如 x.upper() 等同于 upper(x)
+METHODS = ('lower', 'upper', 'strip', 'title', 'replace', 'startswith', 'endswith')
+
+# 使用NumPy的通用函数向量化
+_NUMPY_FUNCTIONS = ('sqrt', 'log', 'exp', 'floor', 'ceil')
+
+
+def _parse(text):
+    """解析并校验表达式
+    Returns:
+        (表达式的AST, 当前值的名称列表)
+    """
+    try:
+        tree = ast.parse(text.strip(), mode='eval').body
+    except SyntaxError as e:
+        raise ExpressionError(f"表达式语法错误: {text!r}: {e.msg}")
+    names = VALUE_NAMES
+    if isinstance(tree, ast.Lambda):
+        # 兼容 lambda x: ... 的写法，只取函数体，不创建Python函数
+        args = tree.args
+        if (len(args.args) != 1 or args.posonlyargs or args.kwonlyargs or args.vararg or args.kwarg
+                or args.defaults):
+            raise ExpressionError("lambda只能有一个参数")
+        names = (args.args[0].arg,)
+        tree = tree.body
+    methods = {id(node.func) for node in ast.walk(tree)
+               if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)}
+    for node in ast.walk(tree):
+        _check(node, methods)
+    return tree, names
+
+
+def _check(node, methods):
+    """只允许白名单中的语法，不允许属性访问、下标、推导式和任意函数调用"""
+    if isinstance(node, (ast.Constant, ast.Load, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+                         ast.List, ast.Tuple, ast.And, ast.Or) + _BINARY_OPERATORS + _UNARY_OPERATORS
+                  + _COMPARE_OPERATORS):
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, str, bool, type(None))):
+            raise ExpressionError(f"不支持的常量: {node.value!r}")
+        return
+    if isinstance(node, ast.Name):
+        if node.id.startswith('_'):
+            raise ExpressionError(f"名称不能以下划线开头: {node.id}")
+        return
+    if isinstance(node, ast.Call):
+        if node.keywords:
+            raise ExpressionError("函数调用不支持关键字参数")
+        if any(isinstance(arg, ast.Starred) for arg in node.args):
+            raise ExpressionError("函数调用不支持*参数")
+        func = node.func
+        if isinstance(func, ast.Name) and func.id in FUNCTIONS:
+            return
+        if isinstance(func, ast.Attribute) and func.attr in METHODS:
+            return
+        raise ExpressionError(f"不支持的函数: {ast.unparse(func)}")
+    if isinstance(node, ast.Attribute):
+        # 只能作为方法调用的一部分出现
+        if node.attr in METHODS and id(node) in methods:
+            return
+    raise ExpressionError(f"不支持的语法: {ast.unparse(node) if hasattr(node, 'lineno') else type(node).__name__}")
+
+
+class _Rewriter(ast.NodeTransformer):
+    """把校验后的表达式改写为只调用内部函数的形式
+
+    当前值 -> _v，其他名称 -> _get('名称')，函数和方法 -> _f_函数名(...)，
+    乘法和乘方 -> 带上限检查的 _mul/_pow。改写后的代码不访问任何属性和内置函数。
+    """
+
+    def __init__(self, value_names):
+        self.value_names = value_names
+
+    def visit_Name(self, node):
+        if node.id in self.value_names:
+            return ast.copy_location(ast.Name('_v', ast.Load()), node)
+        return ast.copy_location(ast.Call(ast.Name('_get', ast.Load()), [ast.Constant(node.id)], []), node)
+
+    def visit_Call(self, node):
+        args = [self.visit(arg) for arg in node.args]
+        if isinstance(node.func, ast.Attribute):
+            args.insert(0, self.visit(node.func.value))
+            name = node.func.attr
+        else:
+            name = node.func.id
+        return ast.copy_location(ast.Call(ast.Name(f'_f_{name}', ast.Load()), args, []), node)
+
+    def visit_BinOp(self, node):
+        node = self.generic_visit(node)
+        if isinstance(node.op, (ast.Mult, ast.Pow)):
+            helper = '_mul' if isinstance(node.op, ast.Mult) else '_pow'
+            return ast.copy_location(ast.Call(ast.Name(helper, ast.Load()), [node.left, node.right], []), node)
+        return node
+
+
+def _scalar_namespace():
+    namespace = {'__builtins__': {}, '_mul': _mul, '_pow': _pow}
+    for name, (function, _) in FUNCTIONS.items():
+        namespace[f'_f_{name}'] = function
+    return namespace
+
+
+class Expression:
+    """编译后的表达式
+
+    表达式中 x 或 value(lambda写法时为参数名)表示当前字段的值，其他名称表示同一行/同一项的其他字段。
+    支持算术、比较、and/or/not、a if 条件 else b、in，以及FUNCTIONS中的函数和字符串方法。
+    按列执行时遵循pandas的语义，如除以0得到inf、缺失值参与运算得到缺失值。
+    """
+
+    def __init__(self, text):
+        """
+        Args:
+            text: 表达式，如 "x * 2"、"upper(x)"、"x if x > 0 else 0"，也兼容 "lambda x: x * 2"
+        Raises:
+            ExpressionError: 表达式不合法
+        """
+        self.text = text
+        self.tree, self.value_names = _parse(text)
+        # 表达式引用的其他字段
+        self.fields = sorted({node.id for node in ast.walk(self.tree) if isinstance(node, ast.Name)
+                              and node.id not in self.value_names
+                              and not self._is_function_name(node)})
+        body = _Rewriter(self.value_names).visit(copy.deepcopy(self.tree))
+        function = ast.Expression(ast.Lambda(
+            ast.arguments(posonlyargs=[], args=[ast.arg('_v'), ast.arg('_get')], kwonlyargs=[], kw_defaults=[],
+                          defaults=[]), body))
+        ast.fix_missing_locations(function)
+        # 编译的是校验并改写后的AST，命名空间中没有内置函数
+        self._function = eval(compile(function, '<expression>', 'eval'), _scalar_namespace())
+        self._vectorized = None
+
+    def _is_function_name(self, name):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Call) and node.func is name:
+                return True
+        return False
+
+    def __call__(self, value, row=None):
+        """对一个值求值
+        Args:
+            value: 当前字段的值
+            row: 所在的行/项(字典)，表达式引用其他字段时需要
+        """
+        get = row.get if row is not None else _no_fields
+        try:
+            return self._function(value, get)
+        except ExpressionError:
+            raise
+        except Exception as e:
+            raise ExpressionError(f"表达式 {self.text!r} 执行出错: {e}")
+
+    def evaluate_frame(self, df, column):
+        """对DataFrame的一列求值，能向量化时使用pandas/NumPy的列运算，否则逐行执行
+        Returns:
+            Series或标量
+        """
+        missing = [field for field in self.fields if field not in df.columns]
+        if missing:
+            raise ExpressionError(f"表达式 {self.text!r} 引用了不存在的列: {', '.join(missing)}")
+        if self._vectorized is None:
+            try:
+                self._vectorized = _Vectorizer(self.value_names).compile(self.tree)
+            except _NotVectorizable:
+                self._vectorized = False
+        if self._vectorized:
+            try:
+                return self._vectorized(df, df[column])
+            except ExpressionError:
+                raise
+            except Exception:
+                # 类型不适合列运算(如对象列中混有不同类型)时逐行执行
+                pass
+        return self.evaluate_rows(df, column)
+
+    def evaluate_rows(self, df, column):
+        """逐行求值"""
+        import pandas as pd
+        values = df[column].tolist()
+        if not self.fields:
+            return pd.Series([self(value) for value in values], index=df.index, dtype=object).infer_objects()
+        rows = df[self.fields].to_dict('records')
+        return pd.Series([self(value, row) for value, row in zip(values, rows)], index=df.index,
+                         dtype=object).infer_objects()
+
+
+def _no_fields(name):
+    raise ExpressionError(f"未知的名称: {name}")
+
+
+class _NotVectorizable(Exception):
+    pass
+
+
+class _Vectorizer:
+    """把表达式的AST编译为对整列执行的函数树，每个节点是一次pandas/NumPy运算"""
+
+    BINARY = {
+        ast.Add: lambda a, b: a + b,
+        ast.Sub: lambda a, b: a - b,
+        ast.Mult: _mul,
+        ast.Div: lambda a, b: a / b,
+        ast.FloorDiv: lambda a, b: a // b,
+        ast.Mod: lambda a, b: a % b,
+        ast.Pow: _vector_pow,
+    }
+    COMPARE = {
+        ast.Eq: lambda a, b: a == b,
+        ast.NotEq: lambda a, b: a != b,
+        ast.Lt: lambda a, b: a < b,
+        ast.LtE: lambda a, b: a <= b,
+        ast.Gt: lambda a, b: a > b,
+        ast.GtE: lambda a, b: a >= b,
+    }
+
+    def __init__(self, value_names):
+        self.value_names = value_names
+
+    def compile(self, node):
+        """
+        Returns:
+            函数(df, 当前列) -> Series或标量
+        """
+        method = getattr(self, f'_{type(node).__name__}', None)
+        if method is None:
+            raise _NotVectorizable()
+        return method(node)
+
+    def _Constant(self, node):
+        value = node.value
+        return lambda df, v: value
+
+    def _Name(self, node):
+        if node.id in self.value_names:
+            return lambda df, v: v
+        name = node.id
+        return lambda df, v: df[name]
+
+    def _List(self, node):
+        if not all(isinstance(item, ast.Constant) for item in node.elts):
+            raise _NotVectorizable()
+        values = [item.value for item in node.elts]
+        return lambda df, v: values
+
+    _Tuple = _List
+
+    def _BinOp(self, node):
+        left, right = self.compile(node.left), self.compile(node.right)
+        operator = self.BINARY[type(node.op)]
+        return lambda df, v: operator(left(df, v), right(df, v))
+
+    def _UnaryOp(self, node):
+        operand = self.compile(node.operand)
+        if isinstance(node.op, ast.USub):
+            return lambda df, v: -operand(df, v)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+
+        def negate(df, v):
+            value = operand(df, v)
+            return ~value.astype(bool) if _is_series(value) else not value
+        return negate
+
+    def _BoolOp(self, node):
+        values = [self.compile(value) for value in node.values]
+        operator = _vector_and if isinstance(node.op, ast.And) else _vector_or
+
+        def combine(df, v):
+            result = values[0](df, v)
+            for value in values[1:]:
+                result = operator(result, value(df, v))
+            return result
+        return combine
+
+    def _Compare(self, node):
+        operands = [self.compile(node.left)] + [self.compile(item) for item in node.comparators]
+        operators = []
+        for op in node.ops:
+            if isinstance(op, (ast.In, ast.NotIn)):
+                operators.append(_vector_in if isinstance(op, ast.In) else _vector_not_in)
+            else:
+                operators.append(self.COMPARE[type(op)])
+
+        def compare(df, v):
+            values = [operand(df, v) for operand in operands]
+            result = None
+            for operator, left, right in zip(operators, values, values[1:]):
+                current = operator(left, right)
+                result = current if result is None else result & current
+            return result
+        return compare
+
+    def _IfExp(self, node):
+        test, body, orelse = self.compile(node.test), self.compile(node.body), self.compile(node.orelse)
+
+        def choose(df, v):
+            condition = test(df, v)
+            if not _is_series(condition):
+                return body(df, v) if condition else orelse(df, v)
+            import numpy as np
+            import pandas as pd
+            a, b = body(df, v), orelse(df, v)
+            return pd.Series(np.where(condition.astype(bool), a, b), index=condition.index).infer_objects()
+        return choose
+
+    def _Call(self, node):
+        name = node.func.attr if isinstance(node.func, ast.Attribute) else node.func.id
+        scalar, vector = FUNCTIONS[name]
+        if name in _NUMPY_FUNCTIONS:
+            vector = _numpy_function(name)
+        if vector is None:
+            raise _NotVectorizable()
+        args = [self.compile(arg) for arg in node.args]
+        if isinstance(node.func, ast.Attribute):
+            args.insert(0, self.compile(node.func.value))
+
+        def call(df, v):
+            values = [arg(df, v) for arg in args]
+            if not _is_series(values[0]):
+                if any(_is_series(value) for value in values):
+                    raise _NotVectorizable()
+                return scalar(*values)
+            return vector(*values)
+        return call
+
+
+def _numpy_function(name):
+    def function(s):
+        import numpy as np
+        return getattr(np, name)(s)
+    return function
+
+
+def _vector_in(left, right):
+    if _is_series(left):
+        if isinstance(right, list):
+            return left.isin(right)
+        raise _NotVectorizable()
+    if _is_series(right):
+        # 'abc' in x 为子串判断
+        return right.str.contains(left, regex=False)
+    return left in right
+
+
+def _vector_not_in(left, right):
+    result = _vector_in(left, right)
+    return ~result if _is_series(result) else not result
+
+
+@lru_cache(maxsize=256)
+def compile_expression(text):
+    """编译表达式，相同的文本只编译一次
+    Returns:
+        Expression
+    """
+    return Expression(text)
@@ -4,13 +4,23 @@
 GUI模块 - 提供图形用户界面
 """
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
 import threading
 import time
-import pyautogui
+
+from macro import events_to_positions
+from click_plan import compile_trigger
+from position_list import (COLUMNS, PositionListModel, PositionListView, read_positions_csv,
+                           write_positions_csv)
 
 class GUI:
-    def __init__(self, settings, on_start=None, on_stop=None, on_pause=None, on_settings_change=None):
+    # 统计面板刷新间隔(毫秒)
+    METRICS_REFRESH_MS = 500
+
+    def __init__(self, settings, on_start=None, on_stop=None, on_pause=None, on_settings_change=None,
+                 get_metrics=None, on_export_metrics=None, on_start_recording=None,
+                 on_stop_recording=None, on_play_macro=None, get_profiles=None, on_switch_profile=None,
+                 on_save_profile=None, get_position=None):
         """初始化GUI
         Args:
             settings: 设置字典
@@ -18,12 +28,31 @@ class GUI:
             on_stop: 停止回调函数
             on_pause: 暂停/恢复回调函数
             on_settings_change: 设置更改回调函数
+            get_metrics: 获取统计的回调函数
+            on_export_metrics: 导出统计的回调函数，参数为文件路径
+            on_start_recording: 开始录制宏的回调函数
+            on_stop_recording: 停止录制宏的回调函数，参数为保存路径，返回事件列表
+            on_play_macro: 回放宏的回调函数，参数为文件路径、速度和循环次数
+            get_profiles: 获取命名配置名称列表的回调函数
+            on_switch_profile: 切换命名配置的回调函数，参数为配置名称
+            on_save_profile: 将当前设置保存为命名配置的回调函数，参数为配置名称
+            get_position: 获取鼠标位置的回调函数，返回(x, y)
         """
         self.settings = settings
         self.on_start = on_start
         self.on_stop = on_stop
         self.on_pause = on_pause
         self.on_settings_change = on_settings_change
+        self.get_metrics = get_metrics
+        self.on_export_metrics = on_export_metrics
+        self.on_start_recording = on_start_recording
+        self.on_stop_recording = on_stop_recording
+        self.on_play_macro = on_play_macro
+        self.get_profiles = get_profiles
+        self.on_switch_profile = on_switch_profile
+        self.on_save_profile = on_save_profile
+        self.get_position = get_position
+        self.recording = False
         
         # 创建主窗口
         self.root = tk.Tk()
@@ -118,12 +147,21 @@ class GUI:
         self.positions_frame = ttk.LabelFrame(self.main_frame, text="位置列表", padding="10")
         self.positions_frame.pack(fill=tk.BOTH, expand=True, pady=5)
         
-        # 位置列表
-        columns = ('index', 'note', 'x', 'y', 'enabled', 'text', 'text_interval')
-        self.positions_tree = ttk.Treeview(self.positions_frame, columns=columns, show='headings', height=8)
+        # 位置列表，只渲染可见的行，数据修改增量更新
+        self.positions_tree = ttk.Treeview(self.positions_frame, columns=COLUMNS, show='headings', height=8,
+                                           selectmode='browse')
         # 绑定事件
         self.positions_tree.bind('<Button-1>', self._on_tree_click)
         self.positions_tree.bind('<Double-1>', self._on_tree_double_click)
+        self.positions_tree.bind('<<TreeviewSelect>>', lambda event: self.position_view.on_select())
+        self.positions_tree.bind('<MouseWheel>', self._on_tree_wheel)
+        self.positions_tree.bind('<Button-4>', self._on_tree_wheel)
+        self.positions_tree.bind('<Button-5>', self._on_tree_wheel)
+        self.positions_tree.bind('<Up>', lambda event: self._move_selection(-1))
+        self.positions_tree.bind('<Down>', lambda event: self._move_selection(1))
+        self.positions_tree.bind('<Prior>', lambda event: self._move_selection(-self.position_view.rows))
+        self.positions_tree.bind('<Next>', lambda event: self._move_selection(self.position_view.rows))
+        self.positions_tree.bind('<Configure>', self._on_tree_resize)
         
         # 设置列标题
         self.positions_tree.heading('index', text='序号')
@@ -145,10 +183,12 @@ class GUI:
         
         self.positions_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=5)
         
-        # 滚动条
-        scrollbar = ttk.Scrollbar(self.positions_frame, orient=tk.VERTICAL, command=self.positions_tree.yview)
+        # 滚动条按位置总数换算，由窗口化显示控制
+        scrollbar = ttk.Scrollbar(self.positions_frame, orient=tk.VERTICAL)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.positions_tree.configure(yscroll=scrollbar.set)
+        self.position_model = PositionListModel(self.positions)
+        self.position_view = PositionListView(self.positions_tree, self.position_model, scrollbar, rows=8)
+        scrollbar.configure(command=self.position_view.yview)
         
         # 位置操作按钮框架
         self.pos_buttons_frame = ttk.Frame(self.main_frame, padding="10")
@@ -170,6 +210,30 @@ class GUI:
         get_current_pos_button = ttk.Button(self.pos_buttons_frame, text="获取当前位置", command=self._get_current_position_for_list, width=12)
         get_current_pos_button.pack(side=tk.LEFT, padx=5)
         
+        # CSV导入导出按钮
+        ttk.Button(self.pos_buttons_frame, text="导入CSV", command=self._import_positions_csv,
+                   width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.pos_buttons_frame, text="导出CSV", command=self._export_positions_csv,
+                   width=10).pack(side=tk.LEFT, padx=5)
+        
+        # 命名配置
+        profile_frame = ttk.Frame(self.main_frame, padding="5")
+        profile_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(profile_frame, text="配置:", font=self.font).pack(side=tk.LEFT)
+        self.profile_var = tk.StringVar(value=self.settings['app_settings'].get('active_profile', ''))
+        self.profile_combobox = ttk.Combobox(profile_frame, textvariable=self.profile_var, state='readonly', width=20,
+                                             values=self.get_profiles() if self.get_profiles else [])
+        self.profile_combobox.pack(side=tk.LEFT, padx=5)
+        self.profile_combobox.bind('<<ComboboxSelected>>', self._on_profile_selected)
+        ttk.Button(profile_frame, text="保存为配置", command=self._save_profile, width=12).pack(side=tk.LEFT, padx=5)
+        
+        # 运行统计面板
+        metrics_frame = ttk.LabelFrame(self.main_frame, text="运行统计", padding="5")
+        metrics_frame.pack(fill=tk.X, pady=5)
+        self.metrics_var = tk.StringVar(value="-")
+        ttk.Label(metrics_frame, textvariable=self.metrics_var, font=self.font).pack(side=tk.LEFT)
+        self._last_metrics_text = None
+        
         # 控制按钮框架
         control_frame = ttk.Frame(self.main_frame, padding="10")
         control_frame.pack(fill=tk.X, pady=5)
@@ -190,8 +254,15 @@ class GUI:
         apply_button = ttk.Button(control_frame, text="应用设置", command=self._apply_settings, width=10)
         apply_button.pack(side=tk.RIGHT, padx=5)
         
-        # 加载位置列表
-        self._load_positions()
+        # 导出统计按钮
+        export_button = ttk.Button(control_frame, text="导出统计", command=self._export_metrics, width=10)
+        export_button.pack(side=tk.RIGHT, padx=5)
+        
+        # 宏录制/回放按钮
+        self.record_button = ttk.Button(control_frame, text="录制宏", command=self._toggle_recording, width=10)
+        self.record_button.pack(side=tk.RIGHT, padx=5)
+        play_button = ttk.Button(control_frame, text="回放宏", command=self._play_macro, width=10)
+        play_button.pack(side=tk.RIGHT, padx=5)
         
         # 根据当前设置启用/禁用多位置相关控件
         self._toggle_multi_position()
@@ -247,7 +318,7 @@ class GUI:
         # 延迟获取位置，以便用户有时间移动鼠标
         def get_pos_delay():
             time.sleep(1)
-            x, y = pyautogui.position()
+            x, y = self._mouse_position()
             
             # 创建新位置
             new_pos = {
@@ -259,23 +330,44 @@ class GUI:
                 'text_interval': 1000
             }
             
-            self.positions.append(new_pos)
-            self.root.after(0, self._load_positions)
+            # 在界面线程中修改列表
+            self.root.after(0, self.position_model.append, new_pos)
             
         threading.Thread(target=get_pos_delay, daemon=True).start()
         self.status_var.set("请移动鼠标到目标位置...")
 
     def _load_positions(self):
-        """加载位置列表"""
-        # 清空现有项
-        for item in self.positions_tree.get_children():
-            self.positions_tree.delete(item)
-        
-        # 添加位置项
-        for i, pos in enumerate(self.positions):
-            self.positions_tree.insert('', tk.END, values=(i+1, pos['note'], pos['x'], pos['y'],
-                                                          '是' if pos['enabled'] else '否',
-                                                          pos['text'], pos['text_interval']))
+        """整体重新加载位置列表(位置列表被替换后)"""
+        self.position_model.reset(self.positions)
+
+    def _on_tree_wheel(self, event):
+        """鼠标滚轮滚动位置列表"""
+        if event.num == 4 or event.delta > 0:
+            self.position_view.yview('scroll', -3, 'units')
+        else:
+            self.position_view.yview('scroll', 3, 'units')
+        return 'break'
+
+    def _move_selection(self, step):
+        """键盘移动选中项，越过可见窗口时滚动"""
+        if self.positions_tree_disabled:
+            return 'break'
+        current = self.position_view.selected
+        self.position_view.select(0 if current is None else current + step)
+        return 'break'
+
+    def _on_tree_resize(self, event):
+        """列表高度变化时调整可见行数"""
+        row_height = int(self.style.lookup('Treeview', 'rowheight') or 20)
+        # 减去表头的高度
+        self.position_view.resize((event.height - row_height) // row_height)
+
+    def _selected_index(self):
+        """选中位置的下标，未选中时提示并返回None"""
+        index = self.position_view.selected
+        if index is None:
+            messagebox.showinfo("提示", "请先选择一个位置")
+        return index
 
     def _add_position(self):
         """添加新位置"""
@@ -291,45 +383,59 @@ class GUI:
         
         # 打开编辑对话框
         if self._show_position_dialog(new_pos):
-            self.positions.append(new_pos)
-            self._load_positions()
+            self.position_model.append(new_pos)
+            self.position_view.select(len(self.position_model) - 1)
 
     def _edit_position(self):
         """编辑选中的位置"""
-        selected_items = self.positions_tree.selection()
-        if not selected_items:
-            messagebox.showinfo("提示", "请先选择一个位置")
+        index = self._selected_index()
+        if index is None:
             return
-        
-        item = selected_items[0]
-        index = int(self.positions_tree.item(item, 'values')[0]) - 1
         pos = self.positions[index]
         
         # 打开编辑对话框
         if self._show_position_dialog(pos):
-            self.positions[index] = pos
-            self._load_positions()
+            self.position_model.update(index)
 
     def _delete_position(self):
         """删除选中的位置"""
-        selected_items = self.positions_tree.selection()
-        if not selected_items:
-            messagebox.showinfo("提示", "请先选择一个位置")
+        index = self._selected_index()
+        if index is None:
             return
         
-        item = selected_items[0]
-        index = int(self.positions_tree.item(item, 'values')[0]) - 1
-        
         if messagebox.askyesno("确认", f"确定要删除'{self.positions[index]['note']}'吗?"):
-            del self.positions[index]
-            self._load_positions()
+            self.position_model.delete(index)
+
+    def _import_positions_csv(self):
+        """从CSV文件导入位置，追加到列表末尾"""
+        path = filedialog.askopenfilename(filetypes=[('CSV文件', '*.csv'), ('所有文件', '*.*')])
+        if not path:
+            return
+        try:
+            positions = read_positions_csv(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("错误", f"导入位置失败: {e}")
+            return
+        self.position_model.extend(positions)
+        self.update_status(f"已导入{len(positions)}个位置")
+
+    def _export_positions_csv(self):
+        """将位置列表导出为CSV文件"""
+        path = filedialog.asksaveasfilename(defaultextension='.csv', filetypes=[('CSV文件', '*.csv')])
+        if not path:
+            return
+        try:
+            write_positions_csv(path, self.positions)
+            self.update_status(f"已导出{len(self.positions)}个位置")
+        except OSError as e:
+            messagebox.showerror("错误", f"导出位置失败: {e}")
 
     def _get_current_position_for_list(self):
         """获取当前鼠标位置并添加到列表"""
         # 延迟获取位置，以便用户有时间移动鼠标
         def get_pos_delay():
             time.sleep(2)
-            x, y = pyautogui.position()
+            x, y = self._mouse_position()
             
             # 创建新位置
             new_pos = {
@@ -341,8 +447,8 @@ class GUI:
                 'text_interval': 1000
             }
             
-            self.positions.append(new_pos)
-            self.root.after(0, self._load_positions)
+            # 在界面线程中修改列表
+            self.root.after(0, self.position_model.append, new_pos)
             messagebox.showinfo("提示", f"已添加当前位置: X={x}, Y={y}")
 
         threading.Thread(target=get_pos_delay, daemon=True).start()
@@ -352,7 +458,7 @@ class GUI:
         """显示位置编辑对话框"""
         dialog = tk.Toplevel(self.root)
         dialog.title("编辑位置")
-        dialog.geometry("400x300")
+        dialog.geometry("420x600")
         dialog.resizable(False, False)
         dialog.transient(self.root)
         dialog.grab_set()
@@ -386,18 +492,109 @@ class GUI:
         text_interval_var = tk.IntVar(value=pos['text_interval'])
         ttk.Entry(dialog, textvariable=text_interval_var, width=10).grid(row=5, column=1, pady=5, sticky=tk.W)
         
+        # 聚焦方式
+        ttk.Label(dialog, text="聚焦方式:", font=self.font).grid(row=6, column=0, sticky=tk.W, pady=5, padx=10)
+        focus_mode_var = tk.StringVar(value=pos.get('focus_mode', 'click_select_all'))
+        ttk.Combobox(dialog, textvariable=focus_mode_var, values=['click', 'tab', 'click_select_all'],
+                     state='readonly', width=16).grid(row=6, column=1, pady=5, sticky=tk.W)
+        
+        # 聚焦延迟
+        ttk.Label(dialog, text="聚焦延迟(毫秒):", font=self.font).grid(row=7, column=0, sticky=tk.W, pady=5, padx=10)
+        focus_delay_var = tk.IntVar(value=pos.get('focus_delay', 50))
+        ttk.Entry(dialog, textvariable=focus_delay_var, width=10).grid(row=7, column=1, pady=5, sticky=tk.W)
+        
+        # 模板图片，设置后点击位置由模板匹配决定
+        ttk.Label(dialog, text="模板图片:", font=self.font).grid(row=8, column=0, sticky=tk.W, pady=5, padx=10)
+        template_var = tk.StringVar(value=pos.get('template', ''))
+        template_frame = ttk.Frame(dialog)
+        template_frame.grid(row=8, column=1, pady=5, sticky=tk.W)
+        ttk.Entry(template_frame, textvariable=template_var, width=22).pack(side=tk.LEFT)
+
+        def browse_template():
+            path = filedialog.askopenfilename(parent=dialog, filetypes=[('图片', '*.png *.bmp *.jpg')])
+            if path:
+                template_var.set(path)
+
+        ttk.Button(template_frame, text="浏览", command=browse_template, width=6).pack(side=tk.LEFT, padx=5)
+        
+        # 匹配区域
+        ttk.Label(dialog, text="匹配区域(x,y,宽,高):", font=self.font).grid(row=9, column=0, sticky=tk.W, pady=5, padx=10)
+        region = pos.get('region')
+        region_var = tk.StringVar(value=','.join(str(v) for v in region) if region else '')
+        ttk.Entry(dialog, textvariable=region_var, width=20).grid(row=9, column=1, pady=5, sticky=tk.W)
+        
+        # 匹配阈值
+        ttk.Label(dialog, text="匹配阈值:", font=self.font).grid(row=10, column=0, sticky=tk.W, pady=5, padx=10)
+        threshold_var = tk.DoubleVar(value=pos.get('threshold', 0.8))
+        ttk.Entry(dialog, textvariable=threshold_var, width=10).grid(row=10, column=1, pady=5, sticky=tk.W)
+        
+        # 区域触发，条件满足后才点击
+        trigger = pos.get('trigger') or {}
+        ttk.Label(dialog, text="触发方式:", font=self.font).grid(row=11, column=0, sticky=tk.W, pady=5, padx=10)
+        trigger_mode_var = tk.StringVar(value=trigger.get('mode', '无'))
+        ttk.Combobox(dialog, textvariable=trigger_mode_var, values=['无', 'change', 'color', 'hash'],
+                     state='readonly', width=16).grid(row=11, column=1, pady=5, sticky=tk.W)
+        
+        ttk.Label(dialog, text="触发区域(x,y,宽,高):", font=self.font).grid(row=12, column=0, sticky=tk.W, pady=5, padx=10)
+        trigger_region_var = tk.StringVar(value=','.join(str(v) for v in trigger.get('region', [])))
+        ttk.Entry(dialog, textvariable=trigger_region_var, width=20).grid(row=12, column=1, pady=5, sticky=tk.W)
+        
+        # 颜色模式填写r,g,b，哈希模式填写区域哈希
+        ttk.Label(dialog, text="颜色(r,g,b)/哈希:", font=self.font).grid(row=13, column=0, sticky=tk.W, pady=5, padx=10)
+        trigger_value = trigger.get('color') or trigger.get('hash') or ''
+        trigger_value_var = tk.StringVar(
+            value=','.join(str(v) for v in trigger_value) if isinstance(trigger_value, list) else trigger_value)
+        ttk.Entry(dialog, textvariable=trigger_value_var, width=20).grid(row=13, column=1, pady=5, sticky=tk.W)
+        
         # 按钮框架
         button_frame = ttk.Frame(dialog)
-        button_frame.grid(row=6, column=0, columnspan=2, pady=20)
+        button_frame.grid(row=14, column=0, columnspan=2, pady=20)
         
         # 确定按钮
         def on_ok():
-            pos['note'] = note_var.get()
-            pos['x'] = x_var.get()
-            pos['y'] = y_var.get()
-            pos['enabled'] = enabled_var.get()
-            pos['text'] = text_var.get()
-            pos['text_interval'] = text_interval_var.get()
+            # 全部校验通过后才写入位置，任何一项不合法都不会留下改了一半的位置
+            try:
+                values = {
+                    'note': note_var.get(),
+                    'x': x_var.get(),
+                    'y': y_var.get(),
+                    'enabled': enabled_var.get(),
+                    'text': text_var.get(),
+                    'text_interval': text_interval_var.get(),
+                    'focus_mode': focus_mode_var.get(),
+                    'focus_delay': focus_delay_var.get(),
+                    'template': template_var.get().strip(),
+                    'threshold': threshold_var.get(),
+                }
+            except tk.TclError:
+                messagebox.showerror("错误", "坐标、间隔或阈值格式不正确", parent=dialog)
+                return False
+            try:
+                region_text = region_var.get().strip()
+                region = [int(v) for v in region_text.split(',')] if region_text else None
+                if region is not None and len(region) != 4:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("错误", "匹配区域格式应为 x,y,宽,高", parent=dialog)
+                return False
+            trigger_mode = trigger_mode_var.get()
+            if trigger_mode == '无':
+                new_trigger = None
+            else:
+                try:
+                    new_trigger = dict(trigger, mode=trigger_mode,
+                                       region=[int(v) for v in trigger_region_var.get().split(',')])
+                    new_trigger.pop('color', None)
+                    new_trigger.pop('hash', None)
+                    if trigger_mode == 'color':
+                        new_trigger['color'] = [int(v) for v in trigger_value_var.get().split(',')]
+                    elif trigger_mode == 'hash':
+                        new_trigger['hash'] = trigger_value_var.get().strip()
+                    compile_trigger(new_trigger)
+                except (ValueError, IndexError):
+                    messagebox.showerror("错误", "触发区域或颜色格式不正确", parent=dialog)
+                    return False
+            pos.update(values, trigger=new_trigger, region=region)
             dialog.destroy()
             return True
         
@@ -414,7 +611,7 @@ class GUI:
         # 延迟获取位置，以便用户有时间移动鼠标
         def get_pos_delay():
             time.sleep(2)
-            x, y = pyautogui.position()
+            x, y = self._mouse_position()
             self.fixed_x_var.set(x)
             self.fixed_y_var.set(y)
             messagebox.showinfo("提示", f"已获取当前位置: X={x}, Y={y}")
@@ -437,8 +634,11 @@ class GUI:
         if self.on_pause:
             self.on_pause()
 
-    def _apply_settings(self):
-        """应用设置"""
+    def _apply_settings(self, quiet=False):
+        """应用设置
+        Args:
+            quiet: 是否不显示结果提示
+        """
         try:
             # 更新设置
             self.settings['default_settings']['interval'] = self.interval_var.get()
@@ -454,14 +654,146 @@ class GUI:
             if self.on_settings_change:
                 self.on_settings_change(self.settings)
                 
-            messagebox.showinfo("成功", "设置已应用")
+            if not quiet:
+                messagebox.showinfo("成功", "设置已应用")
         except Exception as e:
+            if quiet:
+                raise
             messagebox.showerror("错误", f"应用设置失败: {e}")
 
+    def _refresh_metrics(self):
+        """定时刷新统计面板，显示的内容(点击数、错误数等)都没有变化时不重绘"""
+        try:
+            if self.get_metrics:
+                metrics = self.get_metrics()
+                timing = metrics['timing']
+                interval = metrics['interval_ms']
+                latency = metrics['backend_latency_ms']
+                text = (
+                    f"点击: {metrics['clicks']}  速率: {timing['achieved_cps']:.1f}/{timing['target_cps']:.1f} CPS  "
+                    f"间隔p50/p99: {interval['p50']}/{interval['p99']} ms  "
+                    f"后端耗时p99: {latency['p99']} ms  错误: {metrics['errors']}"
+                    + (f"  模板命中率: {metrics['locate']['hit_rate']:.0%} "
+                       f"匹配p99: {metrics['locate']['match_ms']['p99']} ms" if 'locate' in metrics else '')
+                    + (f"  触发: {metrics['trigger']['fires']}次 采样p99: {metrics['trigger']['poll_ms']['p99']} ms "
+                       f"触发延迟p99: {metrics['trigger']['trigger_to_click_ms']['p99']} ms"
+                       if 'trigger' in metrics else ''))
+                if text != self._last_metrics_text:
+                    self._last_metrics_text = text
+                    self.metrics_var.set(text)
+        except Exception as e:
+            self.metrics_var.set(f"统计不可用: {e}")
+        self.root.after(self.METRICS_REFRESH_MS, self._refresh_metrics)
+
+    def _export_metrics(self):
+        """导出统计为JSON文件"""
+        if not self.on_export_metrics:
+            return
+        path = filedialog.asksaveasfilename(defaultextension='.json', filetypes=[('JSON', '*.json')])
+        if not path:
+            return
+        try:
+            self.on_export_metrics(path)
+            messagebox.showinfo("成功", f"统计已导出到 {path}")
+        except Exception as e:
+            messagebox.showerror("错误", f"导出统计失败: {e}")
+
+    def _toggle_recording(self):
+        """开始或停止录制宏，停止时保存并可导入为多位置列表"""
+        if not self.on_start_recording or not self.on_stop_recording:
+            return
+        try:
+            if not self.recording:
+                self.on_start_recording()
+                self.recording = True
+                self.record_button.config(text="停止录制")
+                self.update_status("录制中")
+                return
+            self.recording = False
+            self.record_button.config(text="录制宏")
+            self.update_status("就绪")
+            path = filedialog.asksaveasfilename(defaultextension='.acm', filetypes=[('宏文件', '*.acm')])
+            events = self.on_stop_recording(path or None)
+            positions = events_to_positions(events)
+            if positions and messagebox.askyesno("录制完成", f"录制了{len(positions)}次点击，是否导入为多位置列表？"):
+                self.position_model.extend(positions)
+        except Exception as e:
+            messagebox.showerror("错误", f"录制宏失败: {e}")
+
+    def _play_macro(self):
+        """选择宏文件并回放"""
+        if not self.on_play_macro:
+            return
+        path = filedialog.askopenfilename(filetypes=[('宏文件', '*.acm')])
+        if not path:
+            return
+        speed = simpledialog.askfloat("回放速度", "速度倍数:", initialvalue=1.0, minvalue=0.1, maxvalue=100.0)
+        if speed is None:
+            return
+        loops = simpledialog.askinteger("循环次数", "循环次数(-1表示无限循环):", initialvalue=1)
+        if loops is None:
+            return
+        try:
+            self.on_play_macro(path, speed, loops)
+        except Exception as e:
+            messagebox.showerror("错误", f"回放宏失败: {e}")
+
+    def _on_profile_selected(self, event=None):
+        """切换到选中的命名配置"""
+        if self.on_switch_profile and self.profile_var.get():
+            try:
+                self.on_switch_profile(self.profile_var.get())
+            except Exception as e:
+                messagebox.showerror("错误", f"切换配置失败: {e}")
+
+    def _save_profile(self):
+        """将界面上的设置保存为命名配置"""
+        if not self.on_save_profile:
+            return
+        name = simpledialog.askstring("保存为配置", "配置名称:", initialvalue=self.profile_var.get())
+        if not name:
+            return
+        try:
+            self._apply_settings(quiet=True)
+            self.on_save_profile(name)
+            self.profile_combobox.config(values=self.get_profiles() if self.get_profiles else [name])
+            self.profile_var.set(name)
+        except Exception as e:
+            messagebox.showerror("错误", f"保存配置失败: {e}")
+
+    def show_profile(self, name, settings):
+        """在界面上显示切换后的配置，可从任意线程调用"""
+        def update():
+            self.profile_var.set(name)
+            self.interval_var.set(settings['interval'])
+            self.randomize_var.set(settings['randomize'])
+            self.min_interval_var.set(settings['min_interval'])
+            self.max_interval_var.set(settings['max_interval'])
+            self.count_var.set(settings['count'])
+            self.button_var.set(settings['button'])
+            self.multi_position_var.set(settings['multi_position'])
+            self.positions = [dict(pos) for pos in settings['positions']]
+            self._load_positions()
+            self._toggle_multi_position()
+        self.root.after(0, update)
+
     def update_status(self, status):
         """更新状态标签"""
         self.status_var.set(status)
 
-    def run(self):
-        """运行GUI主循环"""
+    def _mouse_position(self):
+        """获取鼠标位置，未提供回调时使用pyautogui"""
+        if self.get_position:
+            return self.get_position()
+        import pyautogui
+        return pyautogui.position()
+
+    def run(self, on_ready=None):
+        """运行GUI主循环
+        Args:
+            on_ready: 窗口显示后在界面线程中调用一次的回调函数
+        """
+        if on_ready:
+            self.root.after(0, on_ready)
+        self.root.after(self.METRICS_REFRESH_MS, self._refresh_metrics)
         self.root.mainloop()
\ No newline at end of file
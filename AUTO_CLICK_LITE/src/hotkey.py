@@ -3,84 +3,276 @@
 """
 热键模块 - 处理键盘热键监听
 """
-from pynput import keyboard
+import time
+import queue
+import logging
 import threading
 
+from metrics import Histogram, LATENCY_BUCKETS_MS
+
+logger = logging.getLogger('auto_click.hotkey')
+
+MODIFIERS = ('ctrl', 'shift', 'alt', 'win')
+
+# 热键字符串中的别名
+KEY_ALIASES = {
+    'control': 'ctrl',
+    'option': 'alt',
+    'alt_gr': 'alt',
+    'cmd': 'win',
+    'super': 'win',
+    'meta': 'win',
+    'return': 'enter',
+    'escape': 'esc',
+    'del': 'delete',
+    'spacebar': 'space',
+}
+
+# pynput给出的控制字符 -> 按键名，其余控制字符是按住ctrl时的字母
+CONTROL_CHARS = {'\t': 'tab', '\n': 'enter', '\r': 'enter'}
+
+# 监听器异常退出后重新启动前的等待时间(秒)
+RESTART_DELAYS = (0.1, 0.5, 1.0, 5.0)
+# 监听器运行超过该时间(秒)后退出视为偶发故障，重新从最短的等待时间开始
+STABLE_RUN = 10.0
+
+
+def normalize_key_name(name):
+    """规范化按键名：小写、去掉左右区分(ctrl_l→ctrl)、替换别名"""
+    name = name.strip().lower()
+    name = KEY_ALIASES.get(name, name)
+    base = name.split('_')[0]
+    base = KEY_ALIASES.get(base, base)
+    return base if base in MODIFIERS else name
+
+
+def parse_hotkey(hotkey):
+    """解析热键字符串，如 'f6'、'ctrl+shift+f6'
+    Returns:
+        (修饰键集合, 主键名)
+    """
+    parts = [normalize_key_name(part) for part in hotkey.split('+') if part.strip()]
+    if not parts:
+        raise ValueError(f"无效的热键: {hotkey!r}")
+    key = parts[-1]
+    mods = frozenset(parts[:-1])
+    unknown = mods.difference(MODIFIERS)
+    if unknown:
+        raise ValueError(f"无效的修饰键: {', '.join(sorted(unknown))}")
+    return mods, key
+
+
+def key_name(key):
+    """将pynput按键对象规范化为按键名"""
+    char = getattr(key, 'char', None)
+    if char:
+        if char in CONTROL_CHARS:
+            return CONTROL_CHARS[char]
+        # 按住ctrl时部分平台给出控制字符，还原为字母
+        if len(char) == 1 and ord(char) < 27:
+            char = chr(ord(char) + 96)
+        return char.lower()
+    name = getattr(key, 'name', None)
+    if name:
+        return normalize_key_name(name)
+    return str(key).lower()
+
+
 class HotkeyListener:
+    """热键监听器
+
+    按下的按键经规范化后在预先构建的热键表中查找，命中的动作放入命令队列，
+    由独立的分发线程执行回调，pynput的输入钩子线程从不阻塞。
+    监听器线程退出(join返回)即视为故障，监督线程随即重新创建监听器，不做轮询。
+    """
+
     def __init__(self, start_hotkey='f6', stop_hotkey='f7', pause_hotkey='f8',
                  on_start=None, on_stop=None, on_pause=None):
         """初始化热键监听器
         Args:
-            start_hotkey: 启动热键
+            start_hotkey: 启动热键，支持组合键如 ctrl+shift+f6
             stop_hotkey: 停止热键
             pause_hotkey: 暂停/恢复热键
             on_start: 启动回调函数
             on_stop: 停止回调函数
             on_pause: 暂停/恢复回调函数
         """
-        self.start_hotkey = start_hotkey.lower()
-        self.stop_hotkey = stop_hotkey.lower()
-        self.pause_hotkey = pause_hotkey.lower()
-        self.on_start = on_start
-        self.on_stop = on_stop
-        self.on_pause = on_pause
-        
+        # 动作名 -> (热键字符串, 回调函数)
+        self._bindings = {}
+        self._table = {}
+        self.bind('start', start_hotkey, on_start)
+        self.bind('stop', stop_hotkey, on_stop)
+        self.bind('pause', pause_hotkey, on_pause)
+
         self.listener = None
         self.running = False
+        self._held_mods = set()
+        self._down = set()
+        self._commands = queue.SimpleQueue()
+        self._stop_event = threading.Event()
+        self._supervisor = None
+        self._dispatcher = None
+
+        # 统计：按下到回调开始执行的延迟、回调耗时、监听器重启次数
+        self.latency = Histogram(LATENCY_BUCKETS_MS)
+        self.action_time = Histogram(LATENCY_BUCKETS_MS)
+        self.presses = 0
+        self.dispatched = 0
+        self.restarts = 0
+
+    @property
+    def start_hotkey(self):
+        return self._bindings['start'][0]
+
+    @property
+    def stop_hotkey(self):
+        return self._bindings['stop'][0]
+
+    @property
+    def pause_hotkey(self):
+        return self._bindings['pause'][0]
+
+    def bind(self, action, hotkey, callback):
+        """绑定或更新一个热键
+        Args:
+            action: 动作名称，同名绑定会被替换
+            hotkey: 热键字符串，为None时保留原热键
+            callback: 回调函数，为None时保留原回调
+        """
+        old_hotkey, old_callback = self._bindings.get(action, (None, None))
+        hotkey = hotkey.lower() if hotkey is not None else old_hotkey
+        callback = callback if callback is not None else old_callback
+        parse_hotkey(hotkey)
+        self._bindings[action] = (hotkey, callback)
+        self._rebuild_table()
+
+    def unbind(self, action):
+        """解除一个热键绑定"""
+        if self._bindings.pop(action, None):
+            self._rebuild_table()
+
+    def _rebuild_table(self):
+        """重建(修饰键集合, 主键) -> 动作名的查找表，整体替换以免与监听线程竞争"""
+        table = {}
+        for action, (hotkey, _) in self._bindings.items():
+            table[parse_hotkey(hotkey)] = action
+        self._table = table
 
     def update_hotkeys(self, start_hotkey=None, stop_hotkey=None, pause_hotkey=None):
         """更新热键设置"""
-        if start_hotkey is not None:
-            self.start_hotkey = start_hotkey.lower()
-        if stop_hotkey is not None:
-            self.stop_hotkey = stop_hotkey.lower()
-        if pause_hotkey is not None:
-            self.pause_hotkey = pause_hotkey.lower()
+        self.bind('start', start_hotkey, None)
+        self.bind('stop', stop_hotkey, None)
+        self.bind('pause', pause_hotkey, None)
 
     def _on_press(self, key):
-        """按键按下事件处理"""
+        """按键按下事件处理，只做查表和入队"""
+        pressed_at = time.perf_counter()
         try:
-            # 获取按键名称
-            key_name = key.char.lower() if hasattr(key, 'char') else key.name.lower()
-
-            # 检查是否是热键
-            if key_name == self.start_hotkey and self.on_start:
-                self.on_start()
-            elif key_name == self.stop_hotkey and self.on_stop:
-                self.on_stop()
-            elif key_name == self.pause_hotkey and self.on_pause:
-                self.on_pause()
+            name = key_name(key)
+            if name in MODIFIERS:
+                self._held_mods.add(name)
+                return
+            # 按住不放时的自动重复不重复触发
+            if name in self._down:
+                return
+            self._down.add(name)
+            self.presses += 1
+            action = self._table.get((frozenset(self._held_mods), name))
+            if action is not None:
+                self._commands.put((action, pressed_at))
         except Exception as e:
-            print(f"热键处理出错: {e}")
+            logger.warning("热键处理出错: %s", e)
+
+    def _on_release(self, key):
+        """按键释放事件处理"""
+        try:
+            name = key_name(key)
+            self._held_mods.discard(name)
+            self._down.discard(name)
+        except Exception as e:
+            logger.warning("热键处理出错: %s", e)
+
+    def _dispatch(self):
+        """分发线程：依次执行命令队列中的回调"""
+        while True:
+            command = self._commands.get()
+            if command is None:
+                return
+            action, pressed_at = command
+            binding = self._bindings.get(action)
+            if not binding or binding[1] is None:
+                continue
+            started = time.perf_counter()
+            self.latency.add((started - pressed_at) * 1000.0)
+            try:
+                binding[1]()
+            except Exception as e:
+                logger.warning("热键%s的回调出错: %s", action, e)
+            self.action_time.add((time.perf_counter() - started) * 1000.0)
+            self.dispatched += 1
+
+    def _create_listener(self):
+        from pynput import keyboard
+        return keyboard.Listener(on_press=self._on_press, on_release=self._on_release)
+
+    def _supervise(self):
+        """监督线程：阻塞在监听器的join上，监听器意外退出时重新创建"""
+        failures = 0
+        while self.running:
+            started = time.monotonic()
+            try:
+                self.listener = self._create_listener()
+                self.listener.start()
+                if not self.running:
+                    # 创建期间已请求停止
+                    self.listener.stop()
+                self.listener.join()
+            except Exception as e:
+                logger.warning("热键监听器出错: %s", e)
+            if not self.running:
+                return
+            # 监听器退出时按键状态已不可信
+            self._held_mods.clear()
+            self._down.clear()
+            self.restarts += 1
+            if time.monotonic() - started >= STABLE_RUN:
+                failures = 0
+            delay = RESTART_DELAYS[min(failures, len(RESTART_DELAYS) - 1)]
+            failures += 1
+            logger.warning("热键监听器已退出，%.1f秒后重新启动", delay)
+            if self._stop_event.wait(delay):
+                return
 
     def start_listening(self):
         """开始监听热键"""
         if not self.running:
             self.running = True
-            self.listener = keyboard.Listener(on_press=self._on_press)
-            self.listener.start()
-            # 启动守护线程以保持监听
-            self.listener_thread = threading.Thread(target=self._keep_listening, daemon=True)
-            self.listener_thread.start()
-
-    def _keep_listening(self):
-        """保持监听线程运行"""
-        while self.running:
-            try:
-                # 检查监听器是否还在运行
-                if not self.listener.is_alive():
-                    self.listener = keyboard.Listener(on_press=self._on_press)
-                    self.listener.start()
-                # 短暂休眠以减少CPU使用率
-                threading.Event().wait(0.5)
-            except Exception as e:
-                print(f"监听线程出错: {e}")
-                break
+            self._stop_event.clear()
+            self._dispatcher = threading.Thread(target=self._dispatch, name='hotkey-dispatch', daemon=True)
+            self._dispatcher.start()
+            self._supervisor = threading.Thread(target=self._supervise, name='hotkey-listener', daemon=True)
+            self._supervisor.start()
 
     def stop_listening(self):
         """停止监听热键"""
         if self.running:
             self.running = False
-            if self.listener and self.listener.is_alive():
+            self._stop_event.set()
+            if self.listener:
                 self.listener.stop()
-                self.listener.join(timeout=1.0)
\ No newline at end of file
+            if self._supervisor:
+                self._supervisor.join(timeout=1.0)
+            self._commands.put(None)
+            if self._dispatcher and self._dispatcher is not threading.current_thread():
+                self._dispatcher.join(timeout=1.0)
+
+    def stats(self):
+        """获取热键统计"""
+        return {
+            'presses': self.presses,
+            'dispatched': self.dispatched,
+            'pending': self._commands.qsize(),
+            'restarts': self.restarts,
+            'press_to_action_ms': self.latency.snapshot(),
+            'action_ms': self.action_time.snapshot()
+        }
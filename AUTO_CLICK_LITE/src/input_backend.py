@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输入后端模块 - 封装鼠标/键盘事件注入方式
+"""
+import os
+import sys
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger('auto_click.input_backend')
+
+
+class InputBackend:
+    """输入后端接口，Clicker的所有鼠标/键盘操作都经过此接口"""
+    name = 'base'
+
+    def move_to(self, x, y):
+        """移动鼠标到指定位置"""
+        raise NotImplementedError
+
+    def click(self, button='left'):
+        """在当前位置点击"""
+        raise NotImplementedError
+
+    def press(self, key):
+        """按下并释放单个按键"""
+        raise NotImplementedError
+
+    def hotkey(self, *keys):
+        """按组合键"""
+        raise NotImplementedError
+
+    def write(self, text, interval=0.0):
+        """逐字输入文本"""
+        raise NotImplementedError
+
+    def position(self):
+        """获取当前鼠标位置"""
+        raise NotImplementedError
+
+    def active_window_title(self):
+        """获取活动窗口标题，不支持时返回None"""
+        return None
+
+    def set_clipboard(self, text):
+        """设置剪贴板内容，供粘贴输入使用，不可用时抛出异常"""
+        import pyperclip
+        pyperclip.copy(text)
+
+    def flush(self):
+        """将已排队的事件发送出去"""
+
+    @contextmanager
+    def batch(self):
+        """批量注入上下文，默认不做任何合并"""
+        yield self
+
+    def close(self):
+        """释放资源"""
+
+
+class PyAutoGUIBackend(InputBackend):
+    """基于pyautogui的可移植后端，每次调用都会经过pyautogui的PAUSE延迟和失效保护检查"""
+    name = 'pyautogui'
+
+    def __init__(self):
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def move_to(self, x, y):
+        """移动鼠标到指定位置"""
+        self._pyautogui.moveTo(x, y)
+
+    def click(self, button='left'):
+        """在当前位置点击"""
+        self._pyautogui.click(button=button)
+
+    def press(self, key):
+        """按下并释放单个按键"""
+        self._pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        """按组合键"""
+        self._pyautogui.hotkey(*keys)
+
+    def write(self, text, interval=0.0):
+        """逐字输入文本"""
+        self._pyautogui.write(text, interval=interval)
+
+    def position(self):
+        """获取当前鼠标位置"""
+        x, y = self._pyautogui.position()
+        return x, y
+
+    def active_window_title(self):
+        """获取活动窗口标题，不支持时返回None"""
+        try:
+            return self._pyautogui.getActiveWindowTitle()
+        except Exception:
+            return None
+
+
+class XTestBackend(InputBackend):
+    """基于X11 XTest扩展的低延迟后端，直接向X服务器注入事件，不经过pyautogui的PAUSE延迟"""
+    name = 'xtest'
+
+    BUTTONS = {'left': 1, 'middle': 2, 'right': 3}
+
+    # pyautogui按键名到X keysym名称的映射
+    KEY_NAMES = {
+        'ctrl': 'Control_L', 'ctrlleft': 'Control_L', 'ctrlright': 'Control_R',
+        'shift': 'Shift_L', 'shiftleft': 'Shift_L', 'shiftright': 'Shift_R',
+        'alt': 'Alt_L', 'altleft': 'Alt_L', 'altright': 'Alt_R',
+        'win': 'Super_L', 'winleft': 'Super_L', 'winright': 'Super_R', 'super': 'Super_L',
+        'tab': 'Tab', 'enter': 'Return', 'return': 'Return', 'esc': 'Escape', 'escape': 'Escape',
+        'delete': 'Delete', 'del': 'Delete', 'backspace': 'BackSpace', 'space': 'space',
+        'up': 'Up', 'down': 'Down', 'left': 'Left', 'right': 'Right',
+        'home': 'Home', 'end': 'End', 'pageup': 'Prior', 'pagedown': 'Next', 'insert': 'Insert',
+        'capslock': 'Caps_Lock', 'numlock': 'Num_Lock', 'scrolllock': 'Scroll_Lock', 'printscreen': 'Print',
+        'pause': 'Pause', 'menu': 'Menu',
+        ' ': 'space', '\t': 'Tab', '\n': 'Return'
+    }
+
+    def __init__(self, display=None, autoflush=True):
+        """初始化XTest后端
+        Args:
+            display: X显示名称，None表示使用DISPLAY环境变量
+            autoflush: 每个动作后是否立即刷新，False时需调用flush()或使用batch()
+        """
+        from Xlib import X, XK, display as xdisplay
+        from Xlib.ext import xtest
+        self._X = X
+        self._XK = XK
+        self._xtest = xtest
+        self._display = xdisplay.Display(display)
+        if not self._display.has_extension('XTEST'):
+            self._display.close()
+            raise RuntimeError("X服务器不支持XTEST扩展")
+        self._root = self._display.screen().root
+        self.autoflush = autoflush
+        self._batch_depth = 0
+        self._keycodes = {}
+
+    def _fake(self, event_type, detail=0, x=0, y=0):
+        self._xtest.fake_input(self._display, event_type, detail, x=x, y=y)
+
+    def _done(self):
+        if self.autoflush and not self._batch_depth:
+            self._display.flush()
+
+    def _keycode(self, key):
+        """将按键名或字符解析为(keycode, 是否需要shift)"""
+        if key in self._keycodes:
+            return self._keycodes[key]
+        name = key if len(key) == 1 else key.lower()
+        name = self.KEY_NAMES.get(name, name)
+        if len(name) > 1 and name[0] == 'f' and name[1:].isdigit():
+            name = name.upper()
+        keysym = self._XK.string_to_keysym(name)
+        if not keysym and len(name) == 1:
+            keysym = ord(name)
+        keycode = self._display.keysym_to_keycode(keysym) if keysym else 0
+        if not keycode:
+            raise ValueError(f"无法映射按键: {key!r}")
+        shift = self._display.keycode_to_keysym(keycode, 0) != keysym
+        self._keycodes[key] = (keycode, shift)
+        return keycode, shift
+
+    def move_to(self, x, y):
+        """移动鼠标到指定位置"""
+        self._fake(self._X.MotionNotify, x=int(x), y=int(y))
+        self._done()
+
+    def click(self, button='left'):
+        """在当前位置点击"""
+        detail = self.BUTTONS[button]
+        self._fake(self._X.ButtonPress, detail)
+        self._fake(self._X.ButtonRelease, detail)
+        self._done()
+
+    def _tap(self, keycode, shift):
+        if shift:
+            shift_code = self._keycode('shift')[0]
+            self._fake(self._X.KeyPress, shift_code)
+        self._fake(self._X.KeyPress, keycode)
+        self._fake(self._X.KeyRelease, keycode)
+        if shift:
+            self._fake(self._X.KeyRelease, shift_code)
+
+    def press(self, key):
+        """按下并释放单个按键"""
+        self._tap(*self._keycode(key))
+        self._done()
+
+    def hotkey(self, *keys):
+        """按组合键：依次按下，逆序释放"""
+        codes = [self._keycode(key)[0] for key in keys]
+        for code in codes:
+            self._fake(self._X.KeyPress, code)
+        for code in reversed(codes):
+            self._fake(self._X.KeyRelease, code)
+        self._done()
+
+    def write(self, text, interval=0.0):
+        """逐字输入文本，只支持当前键盘布局中存在的字符，其他字符请使用剪贴板粘贴"""
+        codes = [self._keycode(char) for char in text]
+        if interval:
+            for code in codes:
+                self._tap(*code)
+                self._display.flush()
+                time.sleep(interval)
+        else:
+            for code in codes:
+                self._tap(*code)
+        self._done()
+
+    def position(self):
+        """获取当前鼠标位置"""
+        pointer = self._root.query_pointer()
+        return pointer.root_x, pointer.root_y
+
+    def active_window_title(self):
+        """通过_NET_ACTIVE_WINDOW获取活动窗口标题，不支持时返回None"""
+        try:
+            atom = self._display.intern_atom('_NET_ACTIVE_WINDOW')
+            prop = self._root.get_full_property(atom, self._X.AnyPropertyType)
+            if not prop or not prop.value:
+                return None
+            window = self._display.create_resource_object('window', prop.value[0])
+            return window.get_wm_name()
+        except Exception:
+            return None
+
+    def flush(self):
+        """将已排队的事件发送到X服务器"""
+        self._display.flush()
+
+    @contextmanager
+    def batch(self):
+        """批量注入上下文，块内的事件在退出时一次刷新"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._display.flush()
+
+    def close(self):
+        """关闭X连接"""
+        self._display.close()
+
+
+class RecordingBackend(InputBackend):
+    """内存录制后端，不注入任何真实事件，只给每个事件打上时间戳，用于无显示环境的测试和基准"""
+    name = 'recording'
+
+    def __init__(self, latency=0.0, clock=time.perf_counter):
+        """初始化录制后端
+        Args:
+            latency: 模拟每次调用的耗时(秒)，用于估算真实后端下的表现
+            clock: 时间戳使用的时钟，应与节拍器一致
+        """
+        self.latency = latency
+        self._clock = clock
+        self._position = (0, 0)
+        self.clipboard = None
+        self.events = []
+
+    def _record(self, kind, *args):
+        if self.latency:
+            deadline = self._clock() + self.latency
+            while self._clock() < deadline:
+                pass
+        self.events.append((self._clock(), kind, args))
+
+    def move_to(self, x, y):
+        """移动鼠标到指定位置"""
+        self._position = (x, y)
+        self._record('move', x, y)
+
+    def click(self, button='left'):
+        """在当前位置点击"""
+        self._record('click', button, self._position[0], self._position[1])
+
+    def press(self, key):
+        """按下并释放单个按键"""
+        self._record('press', key)
+
+    def hotkey(self, *keys):
+        """按组合键"""
+        self._record('hotkey', *keys)
+
+    def write(self, text, interval=0.0):
+        """逐字输入文本"""
+        self._record('write', text)
+
+    def position(self):
+        """获取当前鼠标位置"""
+        return self._position
+
+    def set_clipboard(self, text):
+        """记录剪贴板内容，不访问系统剪贴板"""
+        self.clipboard = text
+        self._record('clipboard', text)
+
+    def flush(self):
+        """记录刷新事件"""
+        self._record('flush')
+
+    def of_kind(self, kind):
+        """获取指定类型的事件列表"""
+        return [event for event in self.events if event[1] == kind]
+
+    def click_times(self):
+        """获取所有点击事件的时间戳"""
+        return [event[0] for event in self.events if event[1] == 'click']
+
+    def clear(self):
+        """清空已录制事件"""
+        self.events = []
+
+
+BACKENDS = {
+    'pyautogui': PyAutoGUIBackend,
+    'xtest': XTestBackend,
+    'recording': RecordingBackend
+}
+
+
+def create_backend(name='auto', **kwargs):
+    """创建输入后端
+    Args:
+        name: 后端名称(auto, pyautogui, xtest, recording)，auto在Linux上优先使用xtest，失败时回退到pyautogui
+        kwargs: 传给后端构造函数的参数
+    Returns:
+        输入后端实例
+    """
+    if name == 'auto':
+        if sys.platform.startswith('linux') and os.environ.get('DISPLAY'):
+            try:
+                return XTestBackend(**kwargs)
+            except Exception as e:
+                logger.warning("XTest后端不可用，回退到pyautogui: %s", e)
+        return PyAutoGUIBackend()
+    if name not in BACKENDS:
+        raise ValueError(f"未知的输入后端: {name}")
+    return BACKENDS[name](**kwargs)
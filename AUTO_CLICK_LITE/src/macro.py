@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+宏模块 - 录制鼠标/键盘操作并以紧凑的二进制格式保存
+"""
+import time
+import logging
+from collections import namedtuple
+
+from hotkey import key_name, normalize_key_name
+
+logger = logging.getLogger('auto_click.macro')
+
+# 事件类型
+MOVE, CLICK, KEY = 0, 1, 2
+
+BUTTON_NAMES = ('left', 'middle', 'right')
+MODIFIER_NAMES = ('ctrl', 'shift', 'alt', 'win')
+
+# 热键模块规范化后的按键名 -> 回放后端使用的按键名(与pyautogui相同)
+REPLAY_KEY_NAMES = {
+    'page_up': 'pageup', 'page_down': 'pagedown', 'caps_lock': 'capslock', 'num_lock': 'numlock',
+    'scroll_lock': 'scrolllock', 'print_screen': 'printscreen',
+}
+
+MAGIC = b'ACM1'
+
+# t: 相对录制开始的时间(秒)；key: 按键名；mods: 同时按住的修饰键元组
+MacroEvent = namedtuple('MacroEvent', 'kind t x y button key mods')
+
+
+def move_event(t, x, y):
+    """创建鼠标移动事件"""
+    return MacroEvent(MOVE, t, x, y, None, None, ())
+
+
+def click_event(t, x, y, button='left'):
+    """创建鼠标点击事件"""
+    return MacroEvent(CLICK, t, x, y, button, None, ())
+
+
+def key_event(t, key, mods=()):
+    """创建按键事件"""
+    return MacroEvent(KEY, t, 0, 0, None, key, tuple(mods))
+
+
+def _write_varint(out, value):
+    """写入无符号LEB128变长整数"""
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def encode(events):
+    """将事件列表编码为二进制宏
+
+    每个事件以一个类型字节开头(低2位为类型，高位为按钮或修饰键位图)，
+    时间以毫秒为单位相对上一事件做增量，坐标相对上一位置做zigzag增量，
+    均使用变长整数，常见的移动事件只占4~6个字节。
+    时间先取整到毫秒再求差，取整误差不会随事件数累积。
+    """
+    out = bytearray(MAGIC)
+    last_ms = 0
+    last_x = last_y = 0
+    for event in events:
+        ms = int(round(event.t * 1000))
+        if event.kind == KEY:
+            mods = 0
+            for mod in event.mods:
+                mods |= 1 << MODIFIER_NAMES.index(mod)
+            out.append(KEY | (mods << 2))
+        elif event.kind == CLICK:
+            out.append(CLICK | (BUTTON_NAMES.index(event.button) << 2))
+        else:
+            out.append(MOVE)
+        _write_varint(out, ms - last_ms)
+        last_ms = ms
+        if event.kind == KEY:
+            key = event.key.encode('utf-8')
+            _write_varint(out, len(key))
+            out += key
+        else:
+            _write_varint(out, _zigzag(event.x - last_x))
+            _write_varint(out, _zigzag(event.y - last_y))
+            last_x, last_y = event.x, event.y
+    return bytes(out)
+
+
+def decode(data):
+    """解码二进制宏
+    Returns:
+        事件列表
+    """
+    if data[:4] != MAGIC:
+        raise ValueError("不是有效的宏文件")
+    events = []
+    pos = 4
+    ms = 0
+    x = y = 0
+    while pos < len(data):
+        head = data[pos]
+        pos += 1
+        kind = head & 0x3
+        delta, pos = _read_varint(data, pos)
+        ms += delta
+        t = ms / 1000.0
+        if kind == KEY:
+            length, pos = _read_varint(data, pos)
+            key = data[pos:pos + length].decode('utf-8')
+            pos += length
+            mods = tuple(name for i, name in enumerate(MODIFIER_NAMES) if head >> 2 & (1 << i))
+            events.append(key_event(t, key, mods))
+            continue
+        dx, pos = _read_varint(data, pos)
+        dy, pos = _read_varint(data, pos)
+        x += _unzigzag(dx)
+        y += _unzigzag(dy)
+        if kind == CLICK:
+            events.append(click_event(t, x, y, BUTTON_NAMES[head >> 2]))
+        else:
+            events.append(move_event(t, x, y))
+    return events
+
+
+def save_macro(path, events):
+    """保存宏到文件"""
+    with open(path, 'wb') as f:
+        f.write(encode(events))
+
+
+def load_macro(path):
+    """从文件加载宏"""
+    with open(path, 'rb') as f:
+        return decode(f.read())
+
+
+def events_to_positions(events, text_interval=0):
+    """将录制的点击转换为多位置列表，点击后输入的字符作为该位置的文本"""
+    positions = []
+    for event in events:
+        if event.kind == CLICK:
+            positions.append({
+                'x': event.x,
+                'y': event.y,
+                'note': f'位置{len(positions) + 1}',
+                'enabled': True,
+                'text': '',
+                'text_interval': text_interval,
+                'button': event.button
+            })
+        elif event.kind == KEY and positions and len(event.key) == 1 and not event.mods:
+            positions[-1]['text'] += event.key
+    return positions
+
+
+class MacroRecorder:
+    def __init__(self, move_interval=0.02, move_distance=3, ignore_keys=()):
+        """初始化宏录制器
+        Args:
+            move_interval: 移动事件抽稀的最小时间间隔(秒)，0表示保留所有移动
+            move_distance: 移动事件抽稀的最小距离(像素)
+            ignore_keys: 不录制的按键(如启动/停止热键)
+        """
+        self.move_interval = move_interval
+        self.move_distance = move_distance
+        self.ignore_keys = {REPLAY_KEY_NAMES.get(name, name) for name in map(normalize_key_name, ignore_keys)}
+        self.events = []
+        self.recording = False
+        self._mods = set()
+        self._listeners = []
+        self._started_at = 0.0
+        self._last_move = None
+
+    def start(self):
+        """开始录制"""
+        from pynput import mouse, keyboard
+        self.events = []
+        self._mods = set()
+        self._last_move = None
+        self._started_at = time.perf_counter()
+        self.recording = True
+        self._listeners = [
+            mouse.Listener(on_move=self._on_move, on_click=self._on_click),
+            keyboard.Listener(on_press=self._on_press, on_release=self._on_release)
+        ]
+        for listener in self._listeners:
+            listener.start()
+
+    def stop(self):
+        """停止录制
+        Returns:
+            录制的事件列表
+        """
+        self.recording = False
+        for listener in self._listeners:
+            listener.stop()
+        self._listeners = []
+        return self.events
+
+    def _now(self):
+        return time.perf_counter() - self._started_at
+
+    def _on_move(self, x, y):
+        if not self.recording:
+            return
+        t = self._now()
+        last = self._last_move
+        if last and self.move_interval and t - last.t < self.move_interval \
+                and abs(x - last.x) + abs(y - last.y) < self.move_distance:
+            return
+        self._last_move = move_event(t, x, y)
+        self.events.append(self._last_move)
+
+    def _on_click(self, x, y, button, pressed):
+        if not self.recording or not pressed:
+            return
+        name = getattr(button, 'name', str(button))
+        if name in BUTTON_NAMES:
+            self.events.append(click_event(self._now(), x, y, name))
+
+    @staticmethod
+    def _key_name(key):
+        """将pynput按键对象规范化为回放使用的按键名，与热键使用相同的规范化"""
+        name = key_name(key)
+        return REPLAY_KEY_NAMES.get(name, name)
+
+    def _on_press(self, key):
+        if not self.recording:
+            return
+        name = self._key_name(key)
+        if name in MODIFIER_NAMES:
+            self._mods.add(name)
+            return
+        if name in self.ignore_keys:
+            return
+        mods = tuple(mod for mod in MODIFIER_NAMES if mod in self._mods)
+        self.events.append(key_event(self._now(), name, mods))
+
+    def _on_release(self, key):
+        self._mods.discard(self._key_name(key))
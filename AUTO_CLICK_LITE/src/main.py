@@ -8,25 +8,34 @@ import sys
 import json
 import threading
 import time
+import logging
 from pathlib import Path
 
-# 导入自定义模块
-import importlib
-import clicker
-importlib.reload(clicker)
-from clicker import Clicker
-from config import Config
-from hotkey import HotkeyListener
-from gui import GUI
+from startup import StartupProfiler
+
+# 带 --profile-startup 启动时打印各阶段和各模块导入的耗时
+profiler = StartupProfiler.from_argv(sys.argv)
+
+# 导入自定义模块，输入后端、热键监听和截图依赖的第三方库在首次使用时才导入
+with profiler.phase("导入模块"):
+    from clicker import Clicker
+    from config import Config, setup_logging
+    from profiles import ProfileStore
+    from hotkey import HotkeyListener, parse_hotkey
+    from macro import MacroRecorder, save_macro, load_macro
+    from gui import GUI
 
 class AutoClickerApp:
     def __init__(self):
         # 初始化配置
         config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
-        self.config = Config(config_path)
-        self.settings = self.config.load_config()
+        with profiler.phase("加载配置"):
+            self.config = Config(config_path)
+            self.settings = self.config.load_config()
+            self.profiles = ProfileStore(self.config)
+            setup_logging(self.settings['app_settings'])
         
-        # 初始化点击器
+        # 初始化点击器，输入后端在窗口显示后于后台创建
         self.clicker = Clicker(
             interval=self.settings['default_settings']['interval'],
             count=self.settings['default_settings']['count'],
@@ -37,7 +46,8 @@ class AutoClickerApp:
             position_type=self.settings['default_settings']['position_type'],
             fixed_position=self.settings['default_settings']['fixed_position'],
             multi_position=self.settings['default_settings']['multi_position'],
-            positions=self.settings['default_settings']['positions']
+            positions=self.settings['default_settings']['positions'],
+            backend=self.settings['default_settings']['input_backend']
         )
         
         # 初始化热键监听器
@@ -51,13 +61,30 @@ class AutoClickerApp:
         )
         
         # 初始化GUI
-        self.gui = GUI(
-            settings=self.settings,
-            on_start=self.start_clicking,
-            on_stop=self.stop_clicking,
-            on_pause=self.pause_clicking,
-            on_settings_change=self.update_settings
-        )
+        with profiler.phase("创建界面"):
+            self.gui = GUI(
+                settings=self.settings,
+                on_start=self.start_clicking,
+                on_stop=self.stop_clicking,
+                on_pause=self.pause_clicking,
+                on_settings_change=self.update_settings,
+                get_metrics=self.get_metrics,
+                on_export_metrics=self.export_metrics,
+                on_start_recording=self.start_recording,
+                on_stop_recording=self.stop_recording,
+                on_play_macro=self.play_macro,
+                get_profiles=self.profiles.names,
+                on_switch_profile=self.switch_profile,
+                on_save_profile=self.save_profile,
+                get_position=lambda: self.clicker.backend.position()
+            )
+        self.recorder = None
+        self._profile_actions = set()
+        self._bind_profile_hotkeys()
+        active = self.settings['app_settings'].get('active_profile')
+        if active and active in self.profiles.names():
+            profile = self.profiles.get(active)
+            self.clicker.switch_profile(profile.settings, profile.plan)
         
         # 运行状态标志
         self.running = False
@@ -99,12 +126,98 @@ class AutoClickerApp:
                 self.clicker.resume_clicking()
                 self.gui.update_status("运行中")
 
+    def get_metrics(self):
+        """获取点击器统计"""
+        metrics = self.clicker.get_metrics()
+        metrics['running'] = self.running
+        metrics['paused'] = self.paused
+        metrics['hotkeys'] = self.hotkey_listener.stats()
+        return metrics
+
+    def export_metrics(self, path):
+        """将点击器统计导出为JSON文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.get_metrics(), f, indent=2, ensure_ascii=False)
+
+    def switch_profile(self, name):
+        """切换到命名配置，运行中的点击在下一次点击前生效，不重启点击线程
+        Args:
+            name: 配置名称
+        """
+        profile = self.profiles.get(name)
+        self.clicker.switch_profile(profile.settings, profile.plan)
+        self.settings['app_settings']['active_profile'] = name
+        self.config.save_config(self.settings)
+        self.gui.show_profile(name, profile.settings)
+
+    def save_profile(self, name, hotkey=None):
+        """将当前设置保存为命名配置"""
+        self.settings['app_settings']['active_profile'] = name
+        self.profiles.save(name, self.settings['default_settings'], hotkey)
+        self._bind_profile_hotkeys()
+
+    def _bind_profile_hotkeys(self):
+        """为设置了热键的命名配置绑定切换热键"""
+        for action in self._profile_actions:
+            self.hotkey_listener.unbind(action)
+        self._profile_actions = set()
+        for name, hotkey in self.profiles.hotkeys().items():
+            action = f'profile:{name}'
+            try:
+                self.hotkey_listener.bind(action, hotkey, lambda name=name: self.switch_profile(name))
+                self._profile_actions.add(action)
+            except ValueError as e:
+                logging.getLogger('auto_click').warning("配置%s的热键无效: %s", name, e)
+
+    def start_recording(self):
+        """开始录制宏，启动/停止/暂停热键不录制"""
+        hotkeys = self.settings['default_settings']['hotkeys']
+        self.recorder = MacroRecorder(ignore_keys=[parse_hotkey(hotkey)[1] for hotkey in hotkeys.values()])
+        self.recorder.start()
+
+    def stop_recording(self, path=None):
+        """停止录制宏
+        Args:
+            path: 保存路径，为None时不保存
+        Returns:
+            录制的事件列表
+        """
+        if not self.recorder:
+            return []
+        events = self.recorder.stop()
+        self.recorder = None
+        if path:
+            save_macro(path, events)
+        return events
+
+    def play_macro(self, path, speed=1.0, loops=1):
+        """在点击线程中回放宏文件，可用停止/暂停热键控制"""
+        if self.running:
+            return
+        events = load_macro(path)
+        self.running = True
+        self.paused = False
+
+        def run():
+            try:
+                self.clicker.play_macro(events, speed, loops)
+            finally:
+                self.running = False
+                self.paused = False
+                self.gui.update_status("已停止")
+
+        self.click_thread = threading.Thread(target=run, daemon=True)
+        self.click_thread.start()
+        self.gui.update_status("回放中")
+
     def update_settings(self, new_settings):
         """更新设置"""
         self.settings = new_settings
+        # 校验后在后台线程中合并写入，不阻塞界面
         self.config.save_config(self.settings)
+        setup_logging(self.settings['app_settings'])
 
-        # 更新点击器设置
+        # 更新点击器设置，一次替换整个设置快照
         self.clicker.update_settings(
             interval=self.settings['default_settings']['interval'],
             count=self.settings['default_settings']['count'],
@@ -117,37 +230,45 @@ class AutoClickerApp:
             multi_position=self.settings['default_settings']['multi_position'],
             positions=self.settings['default_settings']['positions']
         )
-        self.clicker.update_settings(
-            interval=self.settings['default_settings']['interval'],
-            count=self.settings['default_settings']['count'],
-            button=self.settings['default_settings']['button'],
-            randomize=self.settings['default_settings']['randomize'],
-            min_interval=self.settings['default_settings']['min_interval'],
-            max_interval=self.settings['default_settings']['max_interval'],
-            position_type=self.settings['default_settings']['position_type'],
-            fixed_position=self.settings['default_settings']['fixed_position']
-        )
+        self.clicker.set_backend(self.settings['default_settings']['input_backend'])
         self.hotkey_listener.update_hotkeys(
             start_hotkey=self.settings['default_settings']['hotkeys']['start'],
             stop_hotkey=self.settings['default_settings']['hotkeys']['stop'],
             pause_hotkey=self.settings['default_settings']['hotkeys']['pause']
         )
 
+    def _on_window_shown(self):
+        """窗口显示后启动热键监听，并在后台加载输入后端，不推迟窗口出现"""
+        profiler.mark("窗口显示")
+        # 热键监听器在自己的线程中导入pynput
+        self.hotkey_listener.start_listening()
+        threading.Thread(target=self._warm_up, name='warm-up', daemon=True).start()
+
+    def _warm_up(self):
+        """预先创建输入后端，使第一次点击不承担导入和连接的开销"""
+        with profiler.phase("加载输入后端"):
+            try:
+                self.clicker.backend
+            except Exception as e:
+                logging.getLogger('auto_click').warning("输入后端加载失败: %s", e)
+        if profiler.enabled:
+            profiler.uninstall()
+            print(profiler.report(), file=sys.stderr)
+
     def run(self):
         """运行应用程序"""
-        # 启动热键监听
-        self.hotkey_listener.start_listening()
-        
-        # 启动GUI主循环
+        # 启动GUI主循环，窗口显示后再启动热键监听
         try:
-            self.gui.run()
+            self.gui.run(on_ready=self._on_window_shown)
         except Exception as e:
             print(f"GUI运行出错: {e}")
         finally:
             # 确保程序退出时停止所有线程
             self.stop_clicking()
             self.hotkey_listener.stop_listening()
+            self.config.close()
 
 if __name__ == "__main__":
-    app = AutoClickerApp()
+    with profiler.phase("初始化应用"):
+        app = AutoClickerApp()
     app.run()
\ No newline at end of file
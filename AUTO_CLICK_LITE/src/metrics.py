@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统计模块 - 点击延迟、间隔抖动和错误计数
+"""
+import json
+import time
+from bisect import bisect_left
+
+# 点击间隔直方图的桶上界(毫秒)
+INTERVAL_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+# 后端调用耗时直方图的桶上界(毫秒)
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+class Histogram:
+    """固定桶直方图，最后一个桶收纳超过所有上界的值"""
+    __slots__ = ('bounds', 'counts', 'total', 'sum', 'max')
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.reset()
+
+    def reset(self):
+        """清空计数"""
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        """记录一个值"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """按桶上界估算分位数
+        Args:
+            q: 分位(0~1)
+        """
+        if not self.total:
+            return 0.0
+        rank = q * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self):
+        """获取直方图快照"""
+        counts = list(self.counts)
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            'count': self.total,
+            'mean': self.sum / self.total if self.total else 0.0,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'buckets': dict(zip(labels, counts))
+        }
+
+
+class ClickMetrics:
+    """点击统计
+
+    计数器和直方图只由点击线程写入，其他线程只读取快照，因此不需要加锁。
+    """
+
+    def __init__(self):
+        self.intervals = Histogram(INTERVAL_BUCKETS_MS)
+        self.backend_latency = Histogram(LATENCY_BUCKETS_MS)
+        self.text_entry = Histogram(INTERVAL_BUCKETS_MS)
+        self.reset()
+
+    def reset(self):
+        """清空所有统计"""
+        self.clicks = 0
+        self.errors = 0
+        self.last_error = None
+        self.started_at = time.time()
+        self._last_click = None
+        self.intervals.reset()
+        self.backend_latency.reset()
+        self.text_entry.reset()
+
+    def record_click(self, now, latency):
+        """记录一次点击
+        Args:
+            now: 点击完成时刻(单调时钟，秒)
+            latency: 本次后端调用耗时(秒)
+        """
+        if self._last_click is not None:
+            self.intervals.add((now - self._last_click) * 1000.0)
+        self._last_click = now
+        self.backend_latency.add(latency * 1000.0)
+        self.clicks += 1
+
+    def record_text_entry(self, elapsed):
+        """记录一次文本输入耗时(秒)"""
+        self.text_entry.add(elapsed * 1000.0)
+
+    def record_error(self, error):
+        """记录一次错误"""
+        self.errors += 1
+        self.last_error = str(error)
+
+    def snapshot(self):
+        """获取统计快照"""
+        return {
+            'clicks': self.clicks,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'uptime': time.time() - self.started_at,
+            'interval_ms': self.intervals.snapshot(),
+            'backend_latency_ms': self.backend_latency.snapshot(),
+            'text_entry_ms': self.text_entry.snapshot()
+        }
+
+    def to_json(self, extra=None):
+        """导出为JSON字符串
+        Args:
+            extra: 合并到快照中的附加字段
+        """
+        data = self.snapshot()
+        if extra:
+            data.update(extra)
+        return json.dumps(data, indent=2, ensure_ascii=False)
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+编排器模块 - 在单个计时线程上并发运行多个点击配置
+"""
+import time
+import heapq
+import logging
+import itertools
+from threading import Thread, Condition, Event, Lock
+
+from timing import ClickTimer
+from click_plan import ClickPlan, FLAG_TEXT, FOCUS_TAB, FOCUS_CLICK_SELECT_ALL
+from input_backend import create_backend
+from metrics import ClickMetrics
+
+logger = logging.getLogger('auto_click.orchestrator')
+
+# 调度步骤：点击，或点击文本位置后的文本输入
+STEP_CLICK, STEP_TEXT = 0, 1
+
+
+class ClickProfile:
+    def __init__(self, name, interval=100, count=-1, button='left', randomize=True,
+                 min_interval=80, max_interval=120, position_type='current',
+                 fixed_position=None, multi_position=False, positions=None):
+        """初始化点击配置，参数含义与Clicker相同
+        Args:
+            name: 配置名称，在编排器内唯一
+        """
+        self.name = name
+        self.count = count
+        self.button = button
+        self.position_type = position_type
+        self.fixed_position = fixed_position or {'x': 0, 'y': 0}
+        self.multi_position = multi_position
+        self.plan = ClickPlan.compile(positions or [], button) if multi_position else None
+        # 只用节拍器抽取间隔和统计速率，等待由编排器统一进行
+        self.timer = ClickTimer(interval, randomize, min_interval, max_interval)
+        self.metrics = ClickMetrics()
+        self.clicks = 0
+        self.index = 0
+        # 最近一次点击步骤的截止时间，文本输入步骤完成后以此推算下一次点击
+        self.click_deadline = 0.0
+        self.paused = False
+        self.done = Event()
+        self._callbacks = []
+        self._callback_lock = Lock()
+        self._generation = 0
+
+    @classmethod
+    def from_config(cls, name, config):
+        """从Clicker风格的配置字典创建"""
+        keys = ('interval', 'count', 'button', 'randomize', 'min_interval', 'max_interval',
+                'position_type', 'fixed_position', 'multi_position', 'positions')
+        return cls(name, **{key: config[key] for key in keys if key in config})
+
+    def add_done_callback(self, fn):
+        """配置完成(点完、被移除或编排器停止)时调用fn(profile)，已完成时立即调用"""
+        with self._callback_lock:
+            if not self.done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _set_done(self):
+        """标记完成并调用完成回调，应在编排器的锁外调用"""
+        with self._callback_lock:
+            if self.done.is_set():
+                return
+            self.done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception as e:
+                logger.warning("配置%s的完成回调出错: %s", self.name, e)
+
+    def status(self):
+        """获取配置状态"""
+        stats = self.timer.stats()
+        return {
+            'name': self.name,
+            'clicks': self.clicks,
+            'count': self.count,
+            'paused': self.paused,
+            'done': self.done.is_set(),
+            'target_cps': stats['target_cps'],
+            'achieved_cps': stats['achieved_cps'],
+            'errors': self.metrics.errors
+        }
+
+
+class ClickOrchestrator:
+    """点击编排器
+
+    所有配置的下一次触发时间保存在一个最小堆中，唯一的计时线程在条件变量上
+    等待到最早的截止时间，执行到期的步骤后按各自的间隔重新入堆。
+    所有输入注入都在这个线程中串行经过同一个后端，空闲时线程完全阻塞。
+    """
+
+    def __init__(self, backend='auto', max_lag=None):
+        """初始化编排器
+        Args:
+            backend: 输入后端名称或实例
+            max_lag: 配置落后超过该时间(秒)时重新对齐，None表示两个间隔
+        """
+        self._backend = backend if not isinstance(backend, str) else None
+        self._backend_name = backend if isinstance(backend, str) else backend.name
+        self.max_lag = max_lag
+        self.profiles = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = Condition()
+        self._thread = None
+        self._running = False
+        self.wakeups = 0
+
+    @property
+    def backend(self):
+        """当前输入后端"""
+        if self._backend is None:
+            self._backend = create_backend(self._backend_name)
+        return self._backend
+
+    def _push(self, deadline, profile, step=STEP_CLICK):
+        heapq.heappush(self._heap, (deadline, next(self._seq), profile._generation, step, profile))
+
+    def add_profile(self, profile, config=None):
+        """添加点击配置并立即开始调度
+        Args:
+            profile: ClickProfile实例，或配置名称(此时需提供config)
+            config: Clicker风格的配置字典
+        Returns:
+            ClickProfile实例
+        """
+        if isinstance(profile, str):
+            profile = ClickProfile.from_config(profile, config or {})
+        with self._cond:
+            if profile.name in self.profiles:
+                raise ValueError(f"配置已存在: {profile.name}")
+            self.profiles[profile.name] = profile
+            profile.timer.start()
+            profile.metrics.reset()
+            self._push(time.perf_counter(), profile)
+            self._cond.notify()
+        return profile
+
+    def remove_profile(self, name):
+        """移除点击配置，堆中的过期条目在弹出时丢弃"""
+        with self._cond:
+            profile = self.profiles.pop(name, None)
+            if profile is None:
+                return False
+            profile._generation += 1
+            self._cond.notify()
+        profile._set_done()
+        return True
+
+    def pause_profile(self, name):
+        """暂停点击配置"""
+        with self._cond:
+            profile = self.profiles[name]
+            profile.paused = True
+            profile._generation += 1
+
+    def resume_profile(self, name):
+        """恢复点击配置"""
+        with self._cond:
+            profile = self.profiles[name]
+            if not profile.paused:
+                return
+            profile.paused = False
+            profile._generation += 1
+            profile.timer.resync()
+            self._push(time.perf_counter(), profile)
+            self._cond.notify()
+
+    def wait_profile(self, name, timeout=None):
+        """等待点击配置完成
+        Returns:
+            是否已完成
+        """
+        profile = self.profiles.get(name)
+        return profile.done.wait(timeout) if profile else True
+
+    def get_status(self):
+        """获取所有配置的状态"""
+        with self._cond:
+            profiles = list(self.profiles.values())
+        return {
+            'running': self._running,
+            'wakeups': self.wakeups,
+            'profiles': [profile.status() for profile in profiles]
+        }
+
+    def start(self):
+        """启动计时线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = Thread(target=self._run, name='click-orchestrator', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """停止计时线程，移除剩余的配置并唤醒等待它们完成的线程"""
+        with self._cond:
+            self._running = False
+            profiles = list(self.profiles.values())
+            for profile in profiles:
+                profile._generation += 1
+            self.profiles.clear()
+            self._heap.clear()
+            self._cond.notify()
+        for profile in profiles:
+            profile._set_done()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _next_due(self):
+        """在锁内等待并弹出所有到期的步骤"""
+        while self._running:
+            now = time.perf_counter()
+            if self._heap and self._heap[0][0] <= now:
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+                return due
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._cond.wait(timeout)
+            self.wakeups += 1
+        return []
+
+    def _run(self):
+        """计时线程主循环"""
+        while True:
+            with self._cond:
+                due = self._next_due()
+                if not self._running:
+                    # 未执行的步骤放回堆中，下次启动后继续
+                    for entry in due:
+                        heapq.heappush(self._heap, entry)
+                    return
+            for deadline, _, generation, step, profile in due:
+                if generation != profile._generation:
+                    continue
+                try:
+                    if step == STEP_CLICK:
+                        self._click(profile, deadline)
+                    else:
+                        self._enter_text(profile, deadline)
+                except Exception as e:
+                    profile.metrics.record_error(e)
+                    logger.warning("配置%s点击出错: %s", profile.name, e)
+                    if profile.multi_position:
+                        # 跳过出错的位置，避免反复重试同一个位置
+                        profile.index += 1
+                    if step == STEP_TEXT:
+                        deadline = profile.click_deadline
+                    self._schedule_next(profile, deadline)
+
+    def _click(self, profile, deadline):
+        """执行配置的一次点击"""
+        backend = self.backend
+        started = time.perf_counter()
+        text_step = False
+        with backend.batch():
+            if profile.multi_position:
+                plan = profile.plan
+                if not plan:
+                    self._schedule_next(profile, deadline)
+                    return
+                if profile.index >= len(plan):
+                    profile.index = 0
+                i = profile.index
+                backend.move_to(plan.xs[i], plan.ys[i])
+                backend.click(plan.button(i))
+                text_step = bool(plan.flags[i] & FLAG_TEXT)
+            else:
+                if profile.position_type == 'fixed':
+                    backend.move_to(profile.fixed_position['x'], profile.fixed_position['y'])
+                backend.click(profile.button)
+        now = profile.timer.tick()
+        profile.metrics.record_click(now, now - started)
+        profile.clicks += 1
+
+        if text_step:
+            # 文本输入作为独立步骤在聚焦延迟后执行，不阻塞其他配置
+            profile.click_deadline = deadline
+            with self._cond:
+                if profile.paused or self.profiles.get(profile.name) is not profile:
+                    return
+                self._push(now + profile.plan.focus_delays[profile.index], profile, STEP_TEXT)
+            return
+        if profile.multi_position:
+            profile.index += 1
+        self._finish_step(profile, deadline)
+
+    def _enter_text(self, profile, deadline):
+        """执行文本位置的输入步骤"""
+        plan = profile.plan
+        i = profile.index
+        started = time.perf_counter()
+        backend = self.backend
+        text = plan.text(i)
+        focus_mode = plan.focus_modes[i]
+        if focus_mode == FOCUS_TAB:
+            backend.press('tab')
+        if focus_mode == FOCUS_CLICK_SELECT_ALL:
+            backend.hotkey('ctrl', 'a')
+        try:
+            # 每次粘贴前都设置剪贴板，用户或其他程序可能已修改剪贴板
+            backend.set_clipboard(text)
+            backend.hotkey('ctrl', 'v')
+        except Exception:
+            backend.write(text)
+        profile.metrics.record_text_entry(time.perf_counter() - started)
+        profile.index += 1
+        # 点击步骤的截止时间加上文本间隔作为下一次点击的基准
+        self._finish_step(profile, profile.click_deadline + plan.text_intervals[i])
+
+    def _finish_step(self, profile, deadline):
+        """检查点击次数，未完成则调度下一次点击"""
+        if profile.count > 0 and profile.clicks >= profile.count:
+            with self._cond:
+                if self.profiles.get(profile.name) is profile:
+                    del self.profiles[profile.name]
+            profile._set_done()
+            return
+        self._schedule_next(profile, deadline)
+
+    def _schedule_next(self, profile, deadline):
+        """按配置间隔从上一个截止时间推算下一次触发时间，落后过多时重新对齐"""
+        timer = profile.timer
+        next_deadline = deadline + timer.next_interval()
+        now = time.perf_counter()
+        max_lag = self.max_lag if self.max_lag is not None else 2 * timer.mean_interval
+        if now - next_deadline > max_lag:
+            next_deadline = now
+            timer.resyncs += 1
+        with self._cond:
+            if profile.paused or self.profiles.get(profile.name) is not profile:
+                return
+            self._push(next_deadline, profile)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+位置列表模块 - 位置列表的数据模型、窗口化显示和CSV导入导出
+"""
+import csv
+import json
+
+from config import SCHEMA
+
+# 列表显示的列，与Treeview的columns一致
+COLUMNS = ('index', 'note', 'x', 'y', 'enabled', 'text', 'text_interval')
+
+# CSV的列；区域和触发条件以JSON字符串保存
+CSV_FIELDS = ('x', 'y', 'note', 'enabled', 'text', 'text_interval', 'focus_mode', 'focus_delay',
+              'template', 'region', 'threshold', 'trigger')
+_INT_FIELDS = ('x', 'y', 'text_interval', 'focus_delay')
+_JSON_FIELDS = ('region', 'trigger')
+
+
+def _parse_bool(value):
+    return value.strip().lower() not in ('0', 'false', 'no', 'n', '否', 'off')
+
+
+def read_positions_csv(path):
+    """从CSV文件读取位置列表，第一行为列名，x和y必填，其他列可省略
+    Returns:
+        位置字典列表
+    Raises:
+        ValueError: 文件格式不正确，信息中带有行号
+    """
+    positions = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or not {'x', 'y'}.issubset(reader.fieldnames):
+            raise ValueError("CSV需要包含x和y列")
+        for line, row in enumerate(reader, 2):
+            pos = {}
+            try:
+                for key, value in row.items():
+                    if key not in CSV_FIELDS or value is None:
+                        continue
+                    if not value.strip() and key not in ('note', 'text'):
+                        # 空单元格取缺省值
+                        continue
+                    if key in _INT_FIELDS:
+                        pos[key] = int(float(value))
+                    elif key == 'enabled':
+                        pos[key] = _parse_bool(value)
+                    elif key == 'threshold':
+                        pos[key] = float(value)
+                    elif key in _JSON_FIELDS:
+                        pos[key] = json.loads(value)
+                    else:
+                        pos[key] = value
+            except ValueError as e:
+                raise ValueError(f"第{line}行: {e}")
+            if 'x' not in pos or 'y' not in pos:
+                raise ValueError(f"第{line}行: 缺少x或y")
+            positions.append(pos)
+    # 与配置文件相同的校验，补全缺省字段
+    return SCHEMA['default_settings']['positions'].validate(positions)
+
+
+def write_positions_csv(path, positions):
+    """将位置列表写入CSV文件"""
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+        for pos in positions:
+            writer.writerow([
+                json.dumps(pos[key], ensure_ascii=False) if key in _JSON_FIELDS and pos.get(key) is not None
+                else _csv_value(pos.get(key))
+                for key in CSV_FIELDS
+            ])
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def row_values(index, pos):
+    """列表中一行显示的值"""
+    return (index + 1, pos.get('note', ''), pos['x'], pos['y'], '是' if pos.get('enabled', True) else '否',
+            pos.get('text', ''), pos.get('text_interval', 0))
+
+
+class PositionListModel:
+    """位置列表的数据模型
+
+    直接修改传入的列表(即设置中的positions)，每次修改后只通知受影响的下标范围，
+    显示端据此增量更新，不再整体重建。
+    """
+
+    def __init__(self, positions):
+        """
+        Args:
+            positions: 位置字典列表
+        """
+        self.positions = positions
+        self._listeners = []
+
+    def subscribe(self, listener):
+        """注册修改通知，参数为(类型, 起始下标, 数量)，类型为insert/update/delete/reset"""
+        self._listeners.append(listener)
+
+    def _notify(self, kind, start, count):
+        for listener in self._listeners:
+            listener(kind, start, count)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, index):
+        return self.positions[index]
+
+    def row(self, index):
+        return row_values(index, self.positions[index])
+
+    def insert(self, index, pos):
+        self.positions.insert(index, pos)
+        self._notify('insert', index, 1)
+
+    def append(self, pos):
+        self.insert(len(self.positions), pos)
+
+    def extend(self, positions):
+        start = len(self.positions)
+        self.positions.extend(positions)
+        if len(self.positions) > start:
+            self._notify('insert', start, len(self.positions) - start)
+
+    def update(self, index, pos=None):
+        """替换或标记第index个位置已修改"""
+        if pos is not None:
+            self.positions[index] = pos
+        self._notify('update', index, 1)
+
+    def delete(self, index, count=1):
+        del self.positions[index:index + count]
+        self._notify('delete', index, count)
+
+    def reset(self, positions=None):
+        """整体替换位置列表"""
+        if positions is not None:
+            self.positions = positions
+        self._notify('reset', 0, len(self.positions))
+
+
+class PositionListView:
+    """位置列表的窗口化显示
+
+    Treeview中只保留可见行数的条目，滚动时改写这些条目的值，
+    条目数量与位置总数无关；滚动条按位置总数换算。
+    """
+
+    def __init__(self, tree, model, scrollbar=None, rows=8):
+        """
+        Args:
+            tree: ttk.Treeview
+            model: PositionListModel
+            scrollbar: 纵向滚动条，command应指向本对象的yview
+            rows: 可见行数
+        """
+        self.tree = tree
+        self.model = model
+        self.scrollbar = scrollbar
+        self.rows = rows
+        self.offset = 0
+        # 选中位置在模型中的下标，滚动后保持
+        self.selected = None
+        self._items = []
+        model.subscribe(self._on_change)
+        self.refresh()
+
+    def _on_change(self, kind, start, count):
+        total = len(self.model)
+        if kind == 'reset':
+            self.offset = 0
+            self.selected = None
+        elif self.selected is not None:
+            # 选中项随插入和删除移动
+            if kind == 'insert' and start <= self.selected:
+                self.selected += count
+            elif kind == 'delete' and start <= self.selected:
+                self.selected = None if self.selected < start + count else self.selected - count
+        if kind == 'insert' and start >= self.offset + self.rows and len(self._items) == self.rows:
+            # 插入在可见窗口之后，只需更新滚动条
+            self._update_scrollbar()
+            return
+        if kind == 'update':
+            if self.offset <= start < self.offset + len(self._items):
+                self.tree.item(self._items[start - self.offset], values=self.model.row(start))
+            return
+        self.offset = max(0, min(self.offset, total - self.rows))
+        self.refresh(0 if kind == 'reset' else max(start - self.offset, 0))
+
+    def refresh(self, first=0):
+        """改写可见窗口中从第first行开始的条目"""
+        tree = self.tree
+        total = len(self.model)
+        needed = min(self.rows, total - self.offset)
+        while len(self._items) < needed:
+            self._items.append(tree.insert('', 'end', values=()))
+        if len(self._items) > needed:
+            tree.delete(*self._items[needed:])
+            del self._items[needed:]
+        row = self.model.row
+        for k in range(first, needed):
+            tree.item(self._items[k], values=row(self.offset + k))
+        self._sync_selection()
+        self._update_scrollbar()
+
+    def _sync_selection(self):
+        index = self.selected
+        if index is not None and self.offset <= index < self.offset + len(self._items):
+            self.tree.selection_set(self._items[index - self.offset])
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+    def _update_scrollbar(self):
+        if self.scrollbar is None:
+            return
+        total = len(self.model)
+        if total <= self.rows:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.rows) / total))
+
+    def scroll_to(self, offset):
+        """滚动到以第offset个位置开头"""
+        offset = max(0, min(int(offset), len(self.model) - self.rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+
+    def see(self, index):
+        """滚动使第index个位置可见"""
+        if index < self.offset:
+            self.scroll_to(index)
+        elif index >= self.offset + self.rows:
+            self.scroll_to(index - self.rows + 1)
+
+    def yview(self, *args):
+        """滚动条的命令：('moveto', 比例) 或 ('scroll', 数量, 'units'/'pages')"""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * len(self.model))
+        elif args[0] == 'scroll':
+            step = int(args[1]) * (self.rows if args[2] == 'pages' else 1)
+            self.scroll_to(self.offset + step)
+
+    def resize(self, rows):
+        """修改可见行数(如窗口大小变化)"""
+        rows = max(1, int(rows))
+        if rows != self.rows:
+            self.rows = rows
+            self.offset = max(0, min(self.offset, len(self.model) - rows))
+            self.refresh()
+
+    def on_select(self):
+        """Treeview的选中事件：记录选中位置在模型中的下标"""
+        selection = self.tree.selection()
+        if selection and selection[0] in self._items:
+            self.selected = self.offset + self._items.index(selection[0])
+        return self.selected
+
+    def select(self, index):
+        """选中第index个位置并滚动使其可见"""
+        if not len(self.model):
+            self.selected = None
+            return
+        self.selected = max(0, min(index, len(self.model) - 1))
+        self.see(self.selected)
+        self._sync_selection()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置档模块 - 命名点击配置的延迟加载和点击计划缓存
+"""
+import logging
+
+from click_plan import ClickPlan
+from config import PROFILE_KEYS, validate_profile
+
+logger = logging.getLogger('auto_click.profiles')
+
+
+class Profile:
+    """一个命名点击配置：合并后的设置和首次使用时编译的点击计划"""
+    __slots__ = ('name', 'settings', 'hotkey', 'source', 'uses_base', '_plan')
+
+    def __init__(self, name, settings, hotkey=None, source=None):
+        self.name = name
+        self.settings = settings
+        self.hotkey = hotkey
+        # 生成该配置的原始字典，用于判断缓存是否过期
+        self.source = source
+        # 是否有设置项取自default_settings
+        self.uses_base = source is not None and any(key not in source for key in PROFILE_KEYS)
+        self._plan = None
+
+    @property
+    def plan(self):
+        """预编译的点击计划，首次访问时编译"""
+        if self._plan is None:
+            self._plan = ClickPlan.compile(self.settings['positions'], self.settings['button'])
+        return self._plan
+
+
+class ProfileStore:
+    """命名点击配置存储
+
+    配置保存在配置文件的 profiles 中，只在首次使用时校验并与 default_settings 合并，
+    结果和点击计划按原始字典缓存，配置文件重新加载或该配置被修改后才重新生成。
+    """
+
+    def __init__(self, config):
+        """初始化配置档存储
+        Args:
+            config: Config实例
+        """
+        self.config = config
+        self._profiles = {}
+        # 缓存生成时所用的default_settings
+        self._base = None
+
+    def _raw(self):
+        config = self.config.load_config()
+        base = config['default_settings']
+        if base is not self._base:
+            # 基础设置变化后，有设置项取自基础设置的配置需要重新合并
+            self._profiles = {name: profile for name, profile in self._profiles.items() if not profile.uses_base}
+            self._base = base
+        return config['profiles']
+
+    def names(self):
+        """所有配置名称"""
+        return sorted(self._raw())
+
+    def get(self, name):
+        """获取命名配置
+        Returns:
+            Profile实例
+        Raises:
+            KeyError: 配置不存在
+        """
+        raw = self._raw()[name]
+        profile = self._profiles.get(name)
+        if profile is None or profile.source is not raw:
+            settings, errors = validate_profile(raw, self._base)
+            for error in errors:
+                logger.warning("配置%s的设置项无效，已使用默认值: %s", name, error)
+            profile = self._profiles[name] = Profile(name, settings, raw.get('hotkey') or None, raw)
+        return profile
+
+    def hotkeys(self):
+        """配置名称 -> 切换热键，只包含设置了热键的配置"""
+        return {name: raw['hotkey'] for name, raw in self._raw().items() if raw.get('hotkey')}
+
+    def save(self, name, settings, hotkey=None):
+        """保存命名配置
+        Args:
+            name: 配置名称
+            settings: 设置字典，只保存PROFILE_KEYS中的项
+            hotkey: 切换到该配置的热键
+        """
+        if not name:
+            raise ValueError("配置名称不能为空")
+        config = self.config.load_config()
+        raw = {key: settings[key] for key in PROFILE_KEYS if key in settings}
+        if hotkey:
+            raw['hotkey'] = hotkey
+        profiles = dict(config['profiles'])
+        profiles[name] = raw
+        config['profiles'] = profiles
+        self.config.save_config(config)
+
+    def delete(self, name):
+        """删除命名配置"""
+        config = self.config.load_config()
+        if name not in config['profiles']:
+            return False
+        profiles = dict(config['profiles'])
+        del profiles[name]
+        config['profiles'] = profiles
+        self.config.save_config(config)
+        self._profiles.pop(name, None)
+        return True
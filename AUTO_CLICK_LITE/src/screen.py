@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+屏幕模块 - 区域截图与基于NumPy的模板匹配
+"""
+import os
+import sys
+import time
+import logging
+
+import numpy as np
+
+from metrics import Histogram, LATENCY_BUCKETS_MS
+
+logger = logging.getLogger('auto_click.screen')
+
+# 灰度转换权重(R, G, B)
+GRAY_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+class ScreenCapture:
+    """屏幕截图基类，grab返回灰度图像的float32二维数组"""
+    name = 'base'
+
+    def size(self):
+        """屏幕尺寸(宽, 高)"""
+        raise NotImplementedError
+
+    def grab(self, left, top, width, height):
+        """截取屏幕区域，区域应已裁剪到屏幕范围内"""
+        raise NotImplementedError
+
+    def grab_rgb(self, left, top, width, height):
+        """截取屏幕区域的彩色图像，返回(高, 宽, 3)的uint8数组"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class XlibCapture(ScreenCapture):
+    """通过X11 GetImage只截取所需区域"""
+    name = 'xlib'
+
+    def __init__(self, display=None):
+        from Xlib import X, display as xdisplay
+        self._X = X
+        self._display = xdisplay.Display(display)
+        self._root = self._display.screen().root
+
+    def size(self):
+        screen = self._display.screen()
+        return screen.width_in_pixels, screen.height_in_pixels
+
+    def grab(self, left, top, width, height):
+        return self.grab_rgb(left, top, width, height) @ GRAY_WEIGHTS
+
+    def grab_rgb(self, left, top, width, height):
+        image = self._root.get_image(left, top, width, height, self._X.ZPixmap, 0xffffffff)
+        # ZPixmap为每像素4字节的BGRX
+        pixels = np.frombuffer(image.data, dtype=np.uint8).reshape(height, width, 4)
+        return pixels[:, :, 2::-1]
+
+    def close(self):
+        self._display.close()
+
+
+class PILCapture(ScreenCapture):
+    """通过Pillow的ImageGrab截图，Windows和macOS上使用"""
+    name = 'pil'
+
+    def __init__(self):
+        from PIL import ImageGrab
+        self._grab = ImageGrab.grab
+        self._size = None
+
+    def size(self):
+        if self._size is None:
+            self._size = self._grab().size
+        return self._size
+
+    def grab(self, left, top, width, height):
+        image = self._grab(bbox=(left, top, left + width, top + height))
+        return np.asarray(image.convert('L'), dtype=np.float32)
+
+    def grab_rgb(self, left, top, width, height):
+        image = self._grab(bbox=(left, top, left + width, top + height))
+        return np.asarray(image.convert('RGB'))
+
+
+class ArrayCapture(ScreenCapture):
+    """从内存中的图像截取，用于测试和基准，image可以是灰度或RGB图像"""
+    name = 'array'
+
+    def __init__(self, image):
+        self.image = np.asarray(image, dtype=np.float32)
+        self.grabs = 0
+        self.pixels = 0
+
+    def size(self):
+        height, width = self.image.shape[:2]
+        return width, height
+
+    def grab(self, left, top, width, height):
+        self.grabs += 1
+        self.pixels += width * height
+        region = self.image[top:top + height, left:left + width]
+        return region @ GRAY_WEIGHTS if region.ndim == 3 else region
+
+    def grab_rgb(self, left, top, width, height):
+        self.grabs += 1
+        self.pixels += width * height
+        region = self.image[top:top + height, left:left + width]
+        if region.ndim == 2:
+            region = np.repeat(region[:, :, None], 3, axis=2)
+        return region.astype(np.uint8)
+
+
+CAPTURES = {
+    'xlib': XlibCapture,
+    'pil': PILCapture,
+}
+
+
+def create_capture(name='auto', **kwargs):
+    """创建截图后端
+    Args:
+        name: 后端名称(auto, xlib, pil)，auto在Linux X11上优先使用xlib
+    Returns:
+        ScreenCapture实例
+    """
+    if name == 'auto':
+        if sys.platform.startswith('linux') and os.environ.get('DISPLAY'):
+            try:
+                return XlibCapture(**kwargs)
+            except Exception as e:
+                logger.warning("Xlib截图不可用，回退到Pillow: %s", e)
+        return PILCapture()
+    if name not in CAPTURES:
+        raise ValueError(f"未知的截图后端: {name}")
+    return CAPTURES[name](**kwargs)
+
+
+def clip_rect(left, top, width, height, size):
+    """将矩形裁剪到屏幕范围内
+    Returns:
+        裁剪后的(left, top, width, height)，完全在屏幕外时宽高为0
+    """
+    screen_w, screen_h = size
+    right = min(left + width, screen_w)
+    bottom = min(top + height, screen_h)
+    left = max(left, 0)
+    top = max(top, 0)
+    return left, top, max(right - left, 0), max(bottom - top, 0)
+
+
+def downscale(image, factor):
+    """按factor x factor块求均值缩小图像
+
+    用步长切片逐行、逐列累加，比reshape后求均值快一个数量级。
+    """
+    if factor == 1:
+        return image
+    height = image.shape[0] // factor * factor
+    width = image.shape[1] // factor * factor
+    rows = sum(image[k:height:factor, :width] for k in range(factor))
+    return sum(rows[:, k::factor] for k in range(factor)) / (factor * factor)
+
+
+def _window_sums(image, height, width):
+    """用积分图计算每个height x width窗口的和"""
+    integral = np.zeros((image.shape[0] + 1, image.shape[1] + 1))
+    np.cumsum(image, axis=0, out=integral[1:, 1:])
+    np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+    return integral[height:, width:] - integral[:-height, width:] - integral[height:, :-width] + integral[:-height, :-width]
+
+
+class Template:
+    """预处理后的模板：去均值后的模板、范数和不同图像尺寸下的频谱缓存"""
+    __slots__ = ('image', 'height', 'width', 'zero_mean', 'norm', '_spectra')
+
+    def __init__(self, image):
+        self.image = np.asarray(image, dtype=np.float64)
+        self.height, self.width = self.image.shape
+        self.zero_mean = self.image - self.image.mean()
+        self.norm = float(np.sqrt((self.zero_mean ** 2).sum()))
+        if self.norm < 1e-6:
+            raise ValueError("模板图像不能是纯色")
+        self._spectra = {}
+
+    def scores(self, image):
+        """计算模板在图像每个位置的归一化互相关系数(-1~1)
+        Returns:
+            (H-h+1, W-w+1)的系数矩阵，图像小于模板时返回None
+        """
+        height, width = image.shape
+        h, w = self.height, self.width
+        if height < h or width < w:
+            return None
+        image = np.asarray(image, dtype=np.float64)
+        # 互相关的分子通过FFT计算，模板频谱按图像尺寸缓存
+        spectrum = self._spectra.get((height, width))
+        if spectrum is None:
+            spectrum = self._spectra[(height, width)] = np.conj(np.fft.rfft2(self.zero_mean, s=(height, width)))
+        numerator = np.fft.irfft2(np.fft.rfft2(image) * spectrum, s=(height, width))[:height - h + 1, :width - w + 1]
+        # 分母中窗口的方差通过积分图计算
+        sums = _window_sums(image, h, w)
+        sums2 = _window_sums(image * image, h, w)
+        variance = np.maximum(sums2 - sums * sums / (h * w), 0.0)
+        denominator = np.sqrt(variance) * self.norm
+        return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 1e-6)
+
+    def best(self, image):
+        """查找最佳匹配
+        Returns:
+            (x, y, score)，图像小于模板时返回None
+        """
+        scores = self.scores(image)
+        if scores is None:
+            return None
+        y, x = np.unravel_index(np.argmax(scores), scores.shape)
+        return int(x), int(y), float(scores[y, x])
+
+
+class _TemplateEntry:
+    """模板文件的全尺寸和缩小版本"""
+    __slots__ = ('full', 'small', 'scale')
+
+    def __init__(self, image, scale):
+        self.full = Template(image)
+        # 缩小后的模板至少保留4个像素宽高，否则降低缩放倍数
+        scale = max(1, min(scale, min(self.full.height, self.full.width) // 4))
+        self.scale = scale
+        self.small = Template(downscale(self.full.image, scale)) if scale > 1 else None
+
+
+class TemplateLocator:
+    """模板定位器
+
+    每个目标先在上次命中位置附近截取一小块验证，命中则直接返回；
+    否则只截取配置的区域，在缩小的图像上粗匹配，再在候选点附近用全尺寸模板精确匹配。
+    """
+
+    def __init__(self, capture='auto', scale=4, cache_margin=4):
+        """初始化模板定位器
+        Args:
+            capture: 截图后端名称或实例
+            scale: 粗匹配时的缩小倍数
+            cache_margin: 验证上次命中位置时向四周扩展的像素数
+        """
+        self._capture = capture if not isinstance(capture, str) else None
+        self._capture_name = capture if isinstance(capture, str) else capture.name
+        self.scale = scale
+        self.cache_margin = cache_margin
+        self._templates = {}
+        # 目标(模板路径, 区域, 阈值) -> 上次命中的左上角屏幕坐标
+        self._last_hits = {}
+        self.match_time = Histogram(LATENCY_BUCKETS_MS)
+        self.reset_stats()
+
+    @property
+    def capture(self):
+        """当前截图后端"""
+        if self._capture is None:
+            self._capture = create_capture(self._capture_name)
+        return self._capture
+
+    def reset_stats(self):
+        """清空定位统计"""
+        self.lookups = 0
+        self.hits = 0
+        self.cache_hits = 0
+        self.match_time.reset()
+
+    def add_template(self, path, image):
+        """注册内存中的模板图像，path作为模板名称"""
+        self._templates[path] = _TemplateEntry(image, self.scale)
+
+    def _template(self, path):
+        entry = self._templates.get(path)
+        if entry is None:
+            from PIL import Image
+            with Image.open(path) as image:
+                entry = _TemplateEntry(np.asarray(image.convert('L'), dtype=np.float64), self.scale)
+            self._templates[path] = entry
+        return entry
+
+    def locate(self, path, region=None, threshold=0.8):
+        """定位模板
+        Args:
+            path: 模板图片路径
+            region: 搜索区域(left, top, width, height)，None表示整个屏幕
+            threshold: 最低匹配系数(0~1)
+        Returns:
+            模板中心的屏幕坐标(x, y)，未找到时返回None
+        """
+        started = time.perf_counter()
+        self.lookups += 1
+        entry = self._template(path)
+        key = (path, region, threshold)
+        hit = self._check_last_hit(key, entry.full, threshold)
+        if hit is not None:
+            self.cache_hits += 1
+        else:
+            hit = self._search(entry, region, threshold)
+            if hit is None:
+                self._last_hits.pop(key, None)
+            else:
+                self._last_hits[key] = hit
+        self.match_time.add((time.perf_counter() - started) * 1000.0)
+        if hit is None:
+            return None
+        self.hits += 1
+        return hit[0] + entry.full.width // 2, hit[1] + entry.full.height // 2
+
+    def _grab(self, left, top, width, height):
+        left, top, width, height = clip_rect(left, top, width, height, self.capture.size())
+        if not width or not height:
+            return None, left, top
+        return self.capture.grab(left, top, width, height), left, top
+
+    def _check_last_hit(self, key, template, threshold):
+        """在上次命中位置附近验证模板"""
+        last = self._last_hits.get(key)
+        if last is None:
+            return None
+        margin = self.cache_margin
+        image, left, top = self._grab(last[0] - margin, last[1] - margin,
+                                      template.width + 2 * margin, template.height + 2 * margin)
+        if image is None:
+            return None
+        match = template.best(image)
+        if match is None or match[2] < threshold:
+            return None
+        return left + match[0], top + match[1]
+
+    def _search(self, entry, region, threshold):
+        """在区域内先粗后精地搜索模板"""
+        if region is None:
+            width, height = self.capture.size()
+            region = (0, 0, width, height)
+        image, left, top = self._grab(*region)
+        if image is None:
+            return None
+        template = entry.full
+        if entry.small is not None:
+            scale = entry.scale
+            coarse = entry.small.best(downscale(image, scale))
+            if coarse is None:
+                return None
+            # 在粗匹配点附近一个缩放步长内精确匹配
+            x0 = max(coarse[0] * scale - scale, 0)
+            y0 = max(coarse[1] * scale - scale, 0)
+            image = image[y0:y0 + template.height + 2 * scale, x0:x0 + template.width + 2 * scale]
+            left += x0
+            top += y0
+        match = template.best(image)
+        if match is None or match[2] < threshold:
+            return None
+        return left + match[0], top + match[1]
+
+    def stats(self):
+        """获取定位统计"""
+        return {
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'cache_hits': self.cache_hits,
+            'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+            'cache_hit_rate': self.cache_hits / self.lookups if self.lookups else 0.0,
+            'match_ms': self.match_time.snapshot()
+        }
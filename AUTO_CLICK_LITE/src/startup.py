@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动分析模块 - 统计启动各阶段和各模块导入的耗时
+"""
+import sys
+import time
+import builtins
+import threading
+from contextlib import contextmanager
+
+# 模块导入时刻，作为启动计时的起点
+STARTED_AT = time.perf_counter()
+
+
+class StartupProfiler:
+    """启动耗时分析器
+
+    阶段耗时通过phase上下文记录；启用导入统计后替换内置的__import__，
+    记录每个首次导入的模块的总耗时和扣除子模块后的自身耗时。
+    未启用时phase不做任何记录。
+    """
+
+    def __init__(self, enabled=False, origin=STARTED_AT):
+        """初始化启动分析器
+        Args:
+            enabled: 是否启用
+            origin: 计时起点(perf_counter时刻)
+        """
+        self.enabled = enabled
+        self.origin = origin
+        # (阶段名, 开始时刻, 耗时)，时刻相对于起点(秒)
+        self.phases = []
+        # 模块名 -> [总耗时, 自身耗时](秒)
+        self.imports = {}
+        # 各线程正在进行的导入中已计入的子模块耗时
+        self._local = threading.local()
+        self._original_import = None
+
+    @classmethod
+    def from_argv(cls, argv, flag='--profile-startup'):
+        """按命令行参数创建，带有flag时启用并立即开始统计导入"""
+        profiler = cls(flag in argv)
+        if profiler.enabled:
+            profiler.install()
+        return profiler
+
+    @contextmanager
+    def phase(self, name):
+        """记录一个启动阶段的耗时"""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.phases.append((name, started - self.origin, now - started))
+
+    def mark(self, name):
+        """记录一个时间点(如窗口显示)"""
+        if self.enabled:
+            self.phases.append((name, time.perf_counter() - self.origin, 0.0))
+
+    def install(self):
+        """开始统计导入耗时，已导入的模块和相对导入不计"""
+        if self._original_import is not None:
+            return
+        self._original_import = original = builtins.__import__
+        modules = sys.modules
+        perf_counter = time.perf_counter
+        local = self._local
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in modules:
+                return original(name, globals, locals, fromlist, level)
+            stack = getattr(local, 'stack', None)
+            if stack is None:
+                stack = local.stack = []
+            stack.append(0.0)
+            started = perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                elapsed = perf_counter() - started
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                self.imports[name] = [elapsed, elapsed - children]
+
+        builtins.__import__ = timed_import
+
+    def uninstall(self):
+        """停止统计导入耗时"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def report(self, top=15):
+        """生成耗时报告
+        Args:
+            top: 列出的最慢导入数量
+        Returns:
+            报告文本
+        """
+        lines = ["启动阶段 (起点后时刻 / 耗时, 毫秒):"]
+        for name, at, elapsed in self.phases:
+            lines.append(f"  {at * 1000.0:9.1f}  {elapsed * 1000.0:9.1f}  {name}")
+        if self.imports:
+            lines.append(f"最慢的导入 (总耗时 / 自身耗时, 毫秒)，共{len(self.imports)}个模块:")
+            slowest = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)[:top]
+            for name, (total, own) in slowest:
+                lines.append(f"  {total * 1000.0:9.1f}  {own * 1000.0:9.1f}  {name}")
+        return "\n".join(lines)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量任务模块 - 批量任务的句柄：按完成顺序返回结果、进度统计和整体取消
+"""
+import time
+import logging
+from threading import Condition
+
+logger = logging.getLogger('auto_click.task_batch')
+
+
+class BatchHandle:
+    """一批任务的句柄
+
+    add_batch_task提交后立即返回本对象。每个任务完成时结果按完成顺序追加，
+    results()迭代器和on_result回调随即拿到结果，不必等整批结束；可以有多个迭代器，
+    晚开始的迭代器从第一个结果开始。串行批次由上一个任务的完成回调提交下一个任务，
+    不占用等待的线程。
+    """
+
+    def __init__(self, batch_id, task_ids, parallel=True, on_result=None):
+        """初始化批量任务句柄
+        Args:
+            batch_id: 批量ID
+            task_ids: 各任务的ID，顺序与提交的任务相同
+            parallel: 是否并行执行
+            on_result: 每个任务完成时在执行线程中调用，参数为(序号, 结果)
+        """
+        self.batch_id = batch_id
+        self.task_ids = list(task_ids)
+        self.parallel = parallel
+        self.on_result = on_result
+        self.total = len(self.task_ids)
+        self.created_at = time.time()
+        self.finished_at = None
+        self.futures = {}
+        # (序号, 结果)，按完成顺序
+        self._completed = []
+        self._results = [None] * self.total
+        self._cond = Condition()
+        self.cancelled = False
+        self.counts = {'completed': 0, 'error': 0, 'cancelled': 0}
+
+    def _submit(self, index, submit):
+        """提交第index个任务，已取消时不提交
+        Args:
+            submit: 提交任务的函数，返回Future
+        Returns:
+            Future，已取消时为None
+        """
+        with self._cond:
+            if self.cancelled:
+                return None
+            future = self.futures[index] = submit()
+        return future
+
+    def _add_result(self, index, result):
+        """记录一个任务的结果，由执行线程或取消时调用"""
+        with self._cond:
+            if self._results[index] is not None:
+                return
+            self._results[index] = result
+            self._completed.append((index, result))
+            status = result.get('status')
+            self.counts[status if status in self.counts else 'completed'] += 1
+            if len(self._completed) == self.total:
+                self.finished_at = time.time()
+            self._cond.notify_all()
+        if self.on_result:
+            try:
+                self.on_result(index, result)
+            except Exception as e:
+                logger.warning("批量任务%s的结果回调出错: %s", self.batch_id, e)
+
+    def cancel(self):
+        """取消尚未开始的任务，正在执行的任务会运行完
+        Returns:
+            取消的任务数
+        """
+        with self._cond:
+            self.cancelled = True
+            pending = [index for index in range(self.total)
+                       if self._results[index] is None and index not in self.futures]
+        count = 0
+        for index, future in list(self.futures.items()):
+            # 已排队的任务取消后由完成回调记录为cancelled
+            if future.cancel():
+                count += 1
+        for index in pending:
+            self._add_result(index, {'task_id': self.task_ids[index], 'status': 'cancelled'})
+            count += 1
+        return count
+
+    def done(self):
+        """是否所有任务都已结束(完成、出错或取消)"""
+        with self._cond:
+            return len(self._completed) == self.total
+
+    def wait(self, timeout=None):
+        """等待所有任务结束
+        Returns:
+            是否已全部结束
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: len(self._completed) == self.total, timeout)
+
+    def results(self, timeout=None):
+        """按完成顺序逐个返回(序号, 结果)，全部结束后停止
+        Args:
+            timeout: 等待下一个结果的最长时间(秒)，超时抛出TimeoutError
+        """
+        position = 0
+        while True:
+            with self._cond:
+                if not self._cond.wait_for(lambda: position < len(self._completed) or position >= self.total,
+                                           timeout):
+                    raise TimeoutError(f"等待批量任务{self.batch_id}的结果超时")
+                if position >= self.total:
+                    return
+                ready = self._completed[position:]
+            for item in ready:
+                yield item
+            position += len(ready)
+
+    def ordered_results(self):
+        """按提交顺序的结果列表，未结束的任务为None"""
+        with self._cond:
+            return list(self._results)
+
+    def progress(self):
+        """进度统计"""
+        with self._cond:
+            finished = len(self._completed)
+            progress = dict(self.counts)
+            finished_at = self.finished_at
+        progress.update({
+            'batch_id': self.batch_id,
+            'total': self.total,
+            'finished': finished,
+            'pending': self.total - finished,
+            'elapsed': (finished_at or time.time()) - self.created_at
+        })
+        return progress
+
+    def status(self):
+        """批量任务的状态，格式与get_task_status一致"""
+        progress = self.progress()
+        if progress['pending']:
+            progress['status'] = 'cancelling' if self.cancelled else 'running'
+        else:
+            progress['status'] = 'cancelled' if self.cancelled else 'completed'
+            progress['results'] = self.ordered_results()
+        return progress
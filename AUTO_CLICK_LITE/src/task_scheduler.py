@@ -6,85 +6,293 @@
 import time
 import json
 import threading
+import itertools
 from datetime import datetime, timedelta
-import schedule
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, InvalidStateError
+from concurrent.futures.process import BrokenProcessPool
+
+from data_processing import process_data, timed_process_data, process_context
+from metrics import Histogram
+from task_batch import BatchHandle
+from task_store import TaskStore
+from task_timer import TimerEngine, parse_schedule, LAG_BUCKETS_MS
+
+# 在进程池中执行的任务类型：pandas/JSON处理是CPU密集的，在线程中会持有GIL拖慢其他任务
+PROCESS_TASK_TYPES = ('data_processing',)
 
 class TaskScheduler:
-    def __init__(self, max_workers=5):
-        """初始化任务调度器"""
+    def __init__(self, max_workers=5, store=None, process_workers=0):
+        """初始化任务调度器
+        Args:
+            max_workers: 线程池大小，用于API请求、网页自动化等I/O任务
+            store: 任务配置和结果的存储(TaskStore)，None表示只在内存中保存
+            process_workers: 数据处理任务的进程池大小，0表示CPU核数，负数表示不使用进程池
+        """
         self.max_workers = max_workers
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
-        self.scheduled_tasks = []
+        self.process_workers = process_workers
+        # 进程池在首次提交数据处理任务时创建
+        self._process_pool = None
+        self._pool_lock = threading.Lock()
+        # 任务配置和结果写入存储，内存中只保留最近的结果
+        self.store = store or TaskStore()
+        # 未结束的任务，结束后移除
         self.running_tasks = {}
-        self.task_results = {}
+        # 批量ID -> BatchHandle
+        self.batches = {}
+        self._batch_seq = itertools.count(1)
         self.running = False
+        # 所有点击任务共用一个编排器，首次使用时创建
+        self.click_orchestrator = None
+        self._click_lock = threading.Lock()
+        self._click_seq = itertools.count(1)
+        # 定时任务由最小堆定时引擎调度，到期后提交到线程池
+        self.timer = TimerEngine(self._dispatch_scheduled)
+        # 计划时间到任务实际开始执行的延迟(含线程池排队)
+        self.start_lag = Histogram(LAG_BUCKETS_MS)
+        self._lag_lock = threading.Lock()
         
     def add_scheduled_task(self, task_config):
         """添加定时任务"""
-        task_id = f"task_{len(self.scheduled_tasks)}"
+        task_id = self.store.next_task_id()
         task_config['id'] = task_id
         task_config['created_at'] = datetime.now().isoformat()
-        self.scheduled_tasks.append(task_config)
+        self.store.add_task(task_config)
         
-        # 根据调度类型设置任务
-        if task_config['schedule_type'] == 'interval':
-            schedule.every(task_config['interval']).seconds.do(
-                self._execute_task, task_config
-            )
-        elif task_config['schedule_type'] == 'daily':
-            schedule.every().day.at(task_config['time']).do(
-                self._execute_task, task_config
-            )
-        elif task_config['schedule_type'] == 'weekly':
-            getattr(schedule.every(), task_config['day']).at(task_config['time']).do(
-                self._execute_task, task_config
-            )
-        elif task_config['schedule_type'] == 'once':
+        # 根据调度类型设置任务：interval、daily、weekly、cron，或带at的once
+        if task_config['schedule_type'] == 'once' and task_config.get('at') is None:
             # 一次性任务，立即执行
             self._execute_task(task_config)
+        else:
+            self.timer.add(task_id, parse_schedule(task_config), task_config)
             
         return task_id
+
+    def _dispatch_scheduled(self, entry, deadline):
+        """定时引擎的回调：将到期的任务提交到执行器"""
+        self._track(entry.key, self._submit(entry.payload, deadline))
+
+    def _run_scheduled(self, task_config, deadline):
+        """执行到期的定时任务并记录启动延迟"""
+        self._record_lag(time.time() - deadline)
+        return self._execute_task(task_config)
+
+    def _record_lag(self, seconds):
+        with self._lag_lock:
+            self.start_lag.add(seconds * 1000.0)
+
+    def _submit(self, task_config, deadline=None, run=None):
+        """按任务类型提交到进程池或线程池
+        Args:
+            task_config: 任务配置
+            deadline: 定时任务的计划时间，用于统计启动延迟
+            run: 在线程池中执行任务的函数，默认为_execute_task
+        Returns:
+            Future，结果为任务的结果记录
+        """
+        if task_config.get('type') == 'click_automation':
+            return self._submit_click(task_config, deadline)
+        if task_config.get('type') in PROCESS_TASK_TYPES and self.process_workers >= 0:
+            return self._submit_process(task_config, deadline)
+        if deadline is not None:
+            return self.executor.submit(self._run_scheduled, task_config, deadline)
+        return self.executor.submit(run or self._execute_task, task_config)
+
+    def _submit_click(self, task_config, deadline=None):
+        """点击任务交给共享编排器，在同一个计时线程上运行，不占用线程池
+
+        有次数的任务在配置完成(点完、被取消或调度器停止)时由编排器的完成回调保存结果；
+        无限点击立即保存运行中的结果，可通过编排器移除。
+        """
+        if deadline is not None:
+            self._record_lag(time.time() - deadline)
+        future = Future()
+        try:
+            orchestrator = self._get_click_orchestrator()
+            profile = orchestrator.add_profile(f"{task_config['id']}_{next(self._click_seq)}",
+                                               task_config['clicker_config'])
+        except Exception as e:
+            future.set_result(self._task_error(task_config['id'], e))
+            return future
+        if profile.count > 0:
+            # 取消任务时移除配置
+            future.add_done_callback(lambda future: future.cancelled() and orchestrator.remove_profile(profile.name))
+            profile.add_done_callback(lambda profile: self._click_task_done(task_config, profile, future))
+        else:
+            self._finish_task(task_config, {'status': 'running', 'type': 'click_automation',
+                                            'profile': profile.name}, future)
+        return future
+
+    def _click_task_done(self, task_config, profile, future):
+        """点击配置完成，在编排器的计时线程或停止它的线程中调用"""
+        status = 'completed' if profile.clicks >= profile.count else 'cancelled'
+        result = {'status': status, 'type': 'click_automation', 'clicks': profile.clicks}
+        if task_config.get('on_complete'):
+            # 完成后的操作是I/O，交给线程池，不阻塞计时线程
+            try:
+                self.executor.submit(self._finish_task, task_config, result, future)
+                return
+            except RuntimeError:
+                # 线程池已关闭
+                pass
+        self._finish_task(task_config, result, future)
+
+    def _finish_task(self, task_config, result, future):
+        """保存不在线程池中执行的任务的结果"""
+        try:
+            record = self._complete_task(task_config, result)
+        except Exception as e:
+            record = self._task_error(task_config['id'], e)
+        try:
+            future.set_result(record)
+        except InvalidStateError:
+            # 已被取消
+            pass
+
+    def _get_process_pool(self):
+        """获取数据处理任务的进程池"""
+        with self._pool_lock:
+            if self._process_pool is None:
+                # 调度器进程中有多个线程，不使用fork启动工作进程
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers or None,
+                                                         mp_context=process_context())
+            return self._process_pool
+
+    def _submit_process(self, task_config, deadline):
+        """提交数据处理任务到进程池
+
+        只有data_config跨进程传递，任务配置中的其他内容(回调、事件等)留在本进程；
+        子进程返回结果摘要，数据本身由子进程直接读写文件，不经过进程间传递。
+        """
+        outer = Future()
+        try:
+            inner = self._get_process_pool().submit(timed_process_data, task_config['data_config'])
+        except BrokenProcessPool:
+            # 工作进程异常退出后进程池不可再用，重新创建
+            with self._pool_lock:
+                broken, self._process_pool = self._process_pool, None
+            broken.shutdown(wait=False)
+            inner = self._get_process_pool().submit(timed_process_data, task_config['data_config'])
+        # 取消时一并取消排队中的进程任务
+        outer.add_done_callback(lambda outer: outer.cancelled() and inner.cancel())
+        inner.add_done_callback(lambda inner: self._process_task_done(task_config, deadline, inner, outer))
+        return outer
+
+    def _process_task_done(self, task_config, deadline, inner, outer):
+        """进程池任务结束，在进程池的管理线程中调用"""
+        if inner.cancelled():
+            outer.cancel()
+            return
+        if task_config.get('on_complete'):
+            # 完成后的操作(邮件、Webhook)是I/O，交给线程池，不阻塞进程池的管理线程
+            try:
+                self.executor.submit(self._finish_process_task, task_config, deadline, inner, outer)
+                return
+            except RuntimeError:
+                # 线程池已关闭
+                pass
+        self._finish_process_task(task_config, deadline, inner, outer)
+
+    def _finish_process_task(self, task_config, deadline, inner, outer):
+        """保存进程池任务的结果"""
+        try:
+            started_at, result = inner.result()
+            if deadline is not None:
+                self._record_lag(started_at - deadline)
+            record = self._complete_task(task_config, result)
+        except Exception as e:
+            record = self._task_error(task_config['id'], e)
+        try:
+            outer.set_result(record)
+        except InvalidStateError:
+            # 已被取消
+            pass
     
-    def add_batch_task(self, tasks, parallel=True):
-        """添加批量任务"""
-        batch_id = f"batch_{int(time.time())}"
+    def submit_task(self, task_config):
+        """提交一个立即在线程池中执行的任务，不等待完成
+        Returns:
+            任务ID，可用get_task_status查询
+        """
+        task_id = self.store.next_task_id()
+        task_config['id'] = task_id
+        task_config['created_at'] = datetime.now().isoformat()
+        self.store.add_task(task_config)
+        self._track(task_id, self._submit(task_config))
+        return task_id
+
+    def _track(self, task_id, future):
+        """记录未结束的任务，结束后从running_tasks移除，结果在存储中"""
+        self.running_tasks[task_id] = future
+        future.add_done_callback(lambda future: self._untrack(task_id, future))
+
+    def _untrack(self, task_id, future):
+        if self.running_tasks.get(task_id) is future:
+            del self.running_tasks[task_id]
+
+    def add_batch_task(self, tasks, parallel=True, on_result=None):
+        """添加批量任务，提交后立即返回，不等待任务完成
+        Args:
+            tasks: 任务配置列表，没有id的任务使用 批量ID_序号
+            parallel: True时全部提交到线程池并行执行，False时按顺序逐个执行
+            on_result: 每个任务完成时调用，参数为(序号, 结果)，在执行线程中调用
+        Returns:
+            BatchHandle，可按完成顺序迭代结果、查询进度和取消
+        """
+        batch_id = f"batch_{int(time.time())}_{next(self._batch_seq)}"
+        created_at = datetime.now().isoformat()
+        for i, task in enumerate(tasks):
+            task.setdefault('id', f"{batch_id}_{i}")
+            task.setdefault('created_at', created_at)
+            self.store.add_task(task)
+        handle = BatchHandle(batch_id, [task['id'] for task in tasks], parallel, on_result)
+        self.batches[batch_id] = handle
         
         if parallel:
             # 并行执行
-            futures = []
-            for task in tasks:
-                future = self.executor.submit(self._execute_single_task, task)
-                futures.append(future)
-                self.running_tasks[f"{batch_id}_{len(futures)}"] = future
-            
-            # 等待所有任务完成
-            results = []
-            for future in as_completed(futures):
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:
-                    results.append({'status': 'error', 'error': str(e)})
-            
-            self.task_results[batch_id] = results
-        else:
-            # 串行执行
-            results = []
-            for i, task in enumerate(tasks):
-                task_id = f"{batch_id}_{i}"
-                try:
-                    result = self._execute_single_task(task)
-                    results.append(result)
-                except Exception as e:
-                    results.append({'status': 'error', 'error': str(e)})
-            
-            self.task_results[batch_id] = results
+            for i in range(len(tasks)):
+                self._submit_batch_task(handle, tasks, i)
+        elif tasks:
+            # 串行执行：每个任务完成后再提交下一个
+            self._submit_batch_task(handle, tasks, 0)
         
-        return batch_id
+        return handle
+
+    def _submit_batch_task(self, handle, tasks, index):
+        """提交批量中的第index个任务"""
+        future = handle._submit(index, lambda: self._submit(tasks[index], run=self._execute_single_task))
+        if future is None:
+            return
+        self._track(handle.task_ids[index], future)
+        future.add_done_callback(lambda future: self._batch_task_done(handle, tasks, index, future))
+
+    def _batch_task_done(self, handle, tasks, index, future):
+        """批量中的任务结束：记录结果，串行时提交下一个"""
+        task_id = handle.task_ids[index]
+        if future.cancelled():
+            result = {'task_id': task_id, 'status': 'cancelled'}
+        elif future.exception() is not None:
+            result = {'task_id': task_id, 'status': 'error', 'error': str(future.exception())}
+        else:
+            result = future.result()
+        handle._add_result(index, result)
+        if not handle.parallel and index + 1 < len(tasks):
+            self._submit_batch_task(handle, tasks, index + 1)
+        self._finish_batch(handle)
+
+    def _finish_batch(self, handle):
+        """批次全部结束后只在存储中保留摘要，结果按任务ID读取"""
+        if handle.done() and self.batches.get(handle.batch_id) is handle:
+            summary = handle.progress()
+            summary.update(status='cancelled' if handle.cancelled else 'completed', task_ids=handle.task_ids)
+            # 先保存摘要再移除，期间查询不会落空
+            self.store.put(handle.batch_id, summary)
+            self.batches.pop(handle.batch_id, None)
     
     def _execute_task(self, task_config):
-        """执行单个任务"""
+        """执行单个任务
+        Returns:
+            结果记录，同时写入存储
+        """
         task_id = task_config['id']
         
         try:
@@ -96,13 +304,12 @@ class TaskScheduler:
                 web_auto.close_all_drivers()
                 
             elif task_config['type'] == 'click_automation':
-                from clicker import Clicker
-                clicker = Clicker(**task_config['clicker_config'])
-                clicker.start_clicking()
-                result = {'status': 'completed', 'type': 'click_automation'}
+                # 经_submit提交的点击任务不经过这里；直接调用时等待编排器保存的结果
+                return self._submit_click(task_config).result()
                 
             elif task_config['type'] == 'data_processing':
-                result = self._process_data(task_config['data_config'])
+                # 不使用进程池时在线程中处理
+                result = process_data(task_config['data_config'])
                 
             elif task_config['type'] == 'api_requests':
                 result = self._make_api_requests(task_config['api_config'])
@@ -110,65 +317,55 @@ class TaskScheduler:
             else:
                 result = {'status': 'error', 'error': f'Unknown task type: {task_config["type"]}'}
             
-            # 保存结果
-            self.task_results[task_id] = {
-                'task_id': task_id,
-                'status': 'completed',
-                'result': result,
-                'completed_at': datetime.now().isoformat()
-            }
-            
-            # 如果配置了结果处理，执行后续操作
-            if task_config.get('on_complete'):
-                self._handle_task_completion(task_config, result)
+            return self._complete_task(task_config, result)
                 
         except Exception as e:
-            self.task_results[task_id] = {
-                'task_id': task_id,
-                'status': 'error',
-                'error': str(e),
-                'completed_at': datetime.now().isoformat()
-            }
+            return self._task_error(task_id, e)
+
+    def _complete_task(self, task_config, result):
+        """保存任务结果并执行完成后的操作
+        Returns:
+            结果记录
+        """
+        task_id = task_config['id']
+        record = {
+            'task_id': task_id,
+            'status': 'completed',
+            'result': result,
+            'completed_at': datetime.now().isoformat()
+        }
+        self.store.put(task_id, record)
+        
+        # 如果配置了结果处理，执行后续操作
+        if task_config.get('on_complete'):
+            self._handle_task_completion(task_config, result)
+        
+        return record
+
+    def _task_error(self, task_id, error):
+        """保存任务的错误"""
+        record = {
+            'task_id': task_id,
+            'status': 'error',
+            'error': str(error),
+            'completed_at': datetime.now().isoformat()
+        }
+        self.store.put(task_id, record)
+        return record
+    
+    def _get_click_orchestrator(self):
+        """获取共享的点击编排器，多个任务同时首次使用时只创建一个"""
+        with self._click_lock:
+            if self.click_orchestrator is None:
+                from orchestrator import ClickOrchestrator
+                self.click_orchestrator = ClickOrchestrator()
+                self.click_orchestrator.start()
+            return self.click_orchestrator
     
     def _execute_single_task(self, task):
         """执行单个任务（用于批量任务）"""
         return self._execute_task(task)
     
-    def _process_data(self, data_config):
-        """数据处理任务"""
-        results = []
-        
-        if data_config['action'] == 'csv_processing':
-            import pandas as pd
-            df = pd.read_csv(data_config['input_file'])
-            
-            # 执行数据处理操作
-            for operation in data_config['operations']:
-                if operation['type'] == 'filter':
-                    df = df[df[operation['column']].str.contains(operation['value'])]
-                elif operation['type'] == 'transform':
-                    df[operation['column']] = df[operation['column']].apply(eval(operation['function']))
-                elif operation['type'] == 'aggregate':
-                    df = df.groupby(operation['group_by']).agg(operation['aggregations'])
-            
-            # 保存处理后的数据
-            df.to_csv(data_config['output_file'], index=False)
-            results.append({'status': 'success', 'rows_processed': len(df)})
-            
-        elif data_config['action'] == 'json_processing':
-            with open(data_config['input_file'], 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # 处理JSON数据
-            processed_data = self._process_json_data(data, data_config['operations'])
-            
-            with open(data_config['output_file'], 'w', encoding='utf-8') as f:
-                json.dump(processed_data, f, indent=2, ensure_ascii=False)
-            
-            results.append({'status': 'success', 'items_processed': len(processed_data)})
-        
-        return results
-    
     def _make_api_requests(self, api_config):
         """API请求任务"""
         import requests
@@ -206,45 +403,6 @@ class TaskScheduler:
         
         return results
     
-    def _process_json_data(self, data, operations):
-        """处理JSON数据"""
-        for operation in operations:
-            if operation['type'] == 'filter':
-                if isinstance(data, list):
-                    data = [item for item in data if self._evaluate_condition(item, operation['condition'])]
-            elif operation['type'] == 'transform':
-                if isinstance(data, list):
-                    for item in data:
-                        if operation['field'] in item:
-                            item[operation['field']] = eval(operation['function'])(item[operation['field']])
-            elif operation['type'] == 'extract':
-                if isinstance(data, list):
-                    data = [item.get(operation['field']) for item in data if operation['field'] in item]
-        
-        return data
-    
-    def _evaluate_condition(self, item, condition):
-        """评估条件"""
-        field = condition['field']
-        operator = condition['operator']
-        value = condition['value']
-        
-        if field not in item:
-            return False
-        
-        item_value = item[field]
-        
-        if operator == 'equals':
-            return item_value == value
-        elif operator == 'contains':
-            return value in str(item_value)
-        elif operator == 'greater_than':
-            return float(item_value) > float(value)
-        elif operator == 'less_than':
-            return float(item_value) < float(value)
-        
-        return False
-    
     def _handle_task_completion(self, task_config, result):
         """处理任务完成后的操作"""
         completion_config = task_config['on_complete']
@@ -296,26 +454,41 @@ class TaskScheduler:
     def start_scheduler(self):
         """启动调度器"""
         self.running = True
-        
-        def run_scheduler():
-            while self.running:
-                schedule.run_pending()
-                time.sleep(1)
-        
-        scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-        scheduler_thread.start()
+        self.timer.start()
     
     def stop_scheduler(self):
         """停止调度器"""
         self.running = False
+        self.timer.stop()
+        # 未开始的批量任务不再执行
+        for handle in list(self.batches.values()):
+            handle.cancel()
+            self._finish_batch(handle)
+        with self._click_lock:
+            orchestrator = self.click_orchestrator
+        if orchestrator:
+            # 未点完的点击任务由完成回调记录为cancelled
+            orchestrator.stop()
+        # 进程池任务的完成回调可能提交到线程池，先关闭进程池
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True)
         self.executor.shutdown(wait=True)
+        # 写入尚未提交的结果
+        self.store.close()
     
     def get_task_status(self, task_id):
-        """获取任务状态"""
-        if task_id in self.task_results:
-            return self.task_results[task_id]
-        elif task_id in self.running_tasks:
-            future = self.running_tasks[task_id]
+        """获取任务状态，批量ID返回进度，全部结束后带按提交顺序的结果"""
+        handle = self.batches.get(task_id)
+        if handle is not None:
+            return handle.status()
+        record = self.store.get(task_id)
+        if record is not None:
+            if 'task_ids' in record:
+                # 已结束的批次
+                record = dict(record, results=[self.store.get(item) for item in record['task_ids']])
+            return record
+        future = self.running_tasks.get(task_id)
+        if future is not None:
             if future.done():
                 return {'status': 'completed', 'result': future.result()}
             else:
@@ -323,19 +496,40 @@ class TaskScheduler:
         else:
             return {'status': 'not_found'}
     
-    def get_all_tasks(self):
-        """获取所有任务"""
+    def get_all_tasks(self, offset=0, limit=100, status=None):
+        """获取所有任务，结果按完成时间从新到旧分页
+        Args:
+            offset: 跳过的结果数
+            limit: 每页的结果数
+            status: 只返回该状态的结果(completed/error)，None表示全部
+        """
         return {
-            'scheduled_tasks': self.scheduled_tasks,
-            'task_results': self.task_results,
-            'running_tasks': list(self.running_tasks.keys())
+            'scheduled_tasks': [payload for _, payload, _ in self.timer.scheduled()],
+            'task_results': dict(self.store.results(offset, limit, status)),
+            'total_results': self.store.count(status),
+            'running_tasks': list(self.running_tasks),
+            'batches': {batch_id: handle.progress() for batch_id, handle in list(self.batches.items())}
         }
     
+    def get_scheduler_stats(self):
+        """获取定时统计：定时任务数、已触发次数和计划时间到实际开始的延迟"""
+        stats = self.timer.stats()
+        with self._lag_lock:
+            stats['start_lag_ms'] = self.start_lag.snapshot()
+        return stats
+
     def cancel_task(self, task_id):
-        """取消任务"""
+        """取消任务，定时任务不再运行，批量ID取消其中所有未开始的任务"""
+        handle = self.batches.get(task_id)
+        if handle is not None:
+            cancelled = handle.cancel() > 0
+            self._finish_batch(handle)
+            return cancelled
+        cancelled = self.timer.cancel(task_id)
         if task_id in self.running_tasks:
             future = self.running_tasks[task_id]
             future.cancel()
-            del self.running_tasks[task_id]
+            # 取消未开始的任务时完成回调已将其移除
+            self.running_tasks.pop(task_id, None)
             return True
-        return False
\ No newline at end of file
+        return cancelled
\ No newline at end of file
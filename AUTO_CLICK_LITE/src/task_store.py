@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务存储模块 - 任务配置和结果的SQLite存储，内存中只保留最近使用的结果
+"""
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger('auto_click.task_store')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    config TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_created ON tasks (created_at);
+CREATE TABLE IF NOT EXISTS results (
+    task_id TEXT PRIMARY KEY,
+    status TEXT,
+    updated_at REAL NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_updated ON results (updated_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER
+);
+"""
+
+
+def _dumps(value):
+    # 任务配置和结果中可能有不能序列化的对象(如回调)，按字符串保存
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+class TaskStore:
+    """任务配置和结果的存储
+
+    写入先放入内存队列，后台 task-store-writer 线程每隔flush_interval把积攒的写入
+    在一个事务中提交；文件数据库使用WAL日志。内存中只保留最近使用的cache_size个结果，
+    其他结果按需从数据库读取；超过保留时间或数量的记录由写入线程定期删除。
+    """
+
+    def __init__(self, path=None, cache_size=1000, max_age=7 * 86400, max_results=100000,
+                 flush_interval=0.2, cleanup_interval=60.0):
+        """初始化任务存储
+        Args:
+            path: 数据库文件路径，None表示只在内存中保存(不持久化)
+            cache_size: 内存中保留的结果数
+            max_age: 记录的保留时间(秒)，0表示不限
+            max_results: 最多保留的结果和任务数，0表示不限
+            flush_interval: 写入的合并时间(秒)
+            cleanup_interval: 清理过期记录的间隔(秒)
+        """
+        self.path = path
+        self.cache_size = cache_size
+        self.max_age = max_age
+        self.max_results = max_results
+        self.flush_interval = flush_interval
+        self.cleanup_interval = cleanup_interval
+        self._db_lock = threading.Lock()
+        if path:
+            # 任务配置中可能有回调地址和凭据，数据库只允许所有者读写
+            os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+            os.chmod(path, 0o600)
+        self._conn = sqlite3.connect(path or ':memory:', check_same_thread=False)
+        if path:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'task_seq'").fetchone()
+        self._task_seq = row[0] if row else 0
+        # 任务ID -> (更新时间, 结果)，按最近使用排序
+        self._cache = OrderedDict()
+        # 已排队未提交的结果，从缓存淘汰后仍可读到
+        self._unwritten = {}
+        self._queue = []
+        self._lock = threading.Condition()
+        self._flushing = False
+        self._writing = False
+        self._closed = False
+        self._writer = None
+        self._last_cleanup = 0.0
+        # 写入失败后下一次重试的时间
+        self._retry_at = 0.0
+        # 提交的事务数和写入的记录数
+        self.commits = 0
+        self.rows_written = 0
+        self.cleanup()
+
+    def next_task_id(self):
+        """分配任务ID，编号持久化，重启后不会重复"""
+        with self._lock:
+            task_id = f"task_{self._task_seq}"
+            self._task_seq += 1
+            self._enqueue(('seq', self._task_seq))
+        return task_id
+
+    def add_task(self, task_config):
+        """保存任务配置"""
+        with self._lock:
+            self._enqueue(('task', task_config['id'], time.time(), _dumps(task_config)))
+
+    def put(self, task_id, record):
+        """保存任务结果，同一任务只保留最新的结果"""
+        updated_at = time.time()
+        data = _dumps(record)
+        with self._lock:
+            self._cache_put(task_id, updated_at, record)
+            self._unwritten[task_id] = record
+            self._enqueue(('result', task_id, record.get('status'), updated_at, data, record))
+
+    def get(self, task_id):
+        """获取任务结果
+        Returns:
+            结果字典，不存在或已过期时为None
+        """
+        with self._lock:
+            cached = self._cache.get(task_id)
+            if cached is not None:
+                if self._expired(cached[0]):
+                    del self._cache[task_id]
+                    return None
+                self._cache.move_to_end(task_id)
+                return cached[1]
+            record = self._unwritten.get(task_id)
+            if record is not None:
+                return record
+        with self._db_lock:
+            row = self._conn.execute('SELECT updated_at, record FROM results WHERE task_id = ?',
+                                     (task_id,)).fetchone()
+        if row is None or self._expired(row[0]):
+            return None
+        record = json.loads(row[1])
+        with self._lock:
+            if task_id not in self._unwritten:
+                self._cache_put(task_id, row[0], record)
+        return record
+
+    def __contains__(self, task_id):
+        return self.get(task_id) is not None
+
+    def results(self, offset=0, limit=100, status=None):
+        """按更新时间从新到旧分页获取结果
+        Args:
+            offset: 跳过的记录数
+            limit: 每页记录数
+            status: 只返回该状态的结果，None表示全部
+        Returns:
+            (任务ID, 结果) 列表
+        """
+        self.flush()
+        sql = 'SELECT task_id, record FROM results'
+        params = []
+        if status is not None:
+            sql += ' WHERE status = ?'
+            params.append(status)
+        sql += ' ORDER BY updated_at DESC LIMIT ? OFFSET ?'
+        params += [limit, offset]
+        with self._db_lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(task_id, json.loads(record)) for task_id, record in rows]
+
+    def count(self, status=None):
+        """结果数量"""
+        self.flush()
+        with self._db_lock:
+            if status is None:
+                return self._conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+            return self._conn.execute('SELECT COUNT(*) FROM results WHERE status = ?', (status,)).fetchone()[0]
+
+    def tasks(self, offset=0, limit=100):
+        """按创建时间从新到旧分页获取任务配置"""
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute('SELECT config FROM tasks ORDER BY created_at DESC LIMIT ? OFFSET ?',
+                                      (limit, offset)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _expired(self, updated_at):
+        return self.max_age and updated_at < time.time() - self.max_age
+
+    def _cache_put(self, task_id, updated_at, record):
+        cache = self._cache
+        cache[task_id] = (updated_at, record)
+        cache.move_to_end(task_id)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def _enqueue(self, op):
+        """加入写入队列，调用方持有self._lock"""
+        self._queue.append(op)
+        if self._writer is None and not self._closed:
+            self._writer = threading.Thread(target=self._write_loop, name='task-store-writer', daemon=True)
+            self._writer.start()
+        if len(self._queue) == 1:
+            self._lock.notify_all()
+
+    def flush(self, timeout=5.0):
+        """立即提交排队的写入并等待完成
+        Returns:
+            是否已全部写入
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._queue or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._writer is None:
+                    return False
+                self._flushing = True
+                self._lock.notify_all()
+                self._lock.wait(remaining)
+        return True
+
+    def close(self):
+        """写入排队的记录并停止后台线程"""
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        if self._writer:
+            self._writer.join(timeout=1.0)
+            self._writer = None
+
+    def _write_loop(self):
+        """后台写入线程：积攒flush_interval内的写入后在一个事务中提交"""
+        with self._lock:
+            while not self._closed:
+                if not self._queue:
+                    self._flushing = False
+                    self._lock.notify_all()
+                    self._lock.wait(self.cleanup_interval)
+                    if not self._queue and time.monotonic() - self._last_cleanup >= self.cleanup_interval:
+                        self._lock.release()
+                        try:
+                            self.cleanup()
+                        finally:
+                            self._lock.acquire()
+                    continue
+                delay = self._retry_at - time.monotonic()
+                if delay > 0:
+                    self._lock.wait(delay)
+                    continue
+                if not self._flushing:
+                    self._lock.wait(self.flush_interval)
+                ops, self._queue = self._queue, []
+                self._writing = True
+                self._lock.release()
+                written = False
+                try:
+                    written = self._write(ops)
+                finally:
+                    self._lock.acquire()
+                    self._writing = False
+                if not written:
+                    # 写入失败(如数据库被锁定)时放回队列头部，稍后重试，结果仍可从未写入表中读到
+                    self._queue[:0] = ops
+                    self._retry_at = time.monotonic() + max(self.flush_interval, 0.1)
+                    self._lock.notify_all()
+                    continue
+                for op in ops:
+                    # 提交后才从未写入表中移除，期间读取不会落空
+                    if op[0] == 'result' and self._unwritten.get(op[1]) is op[5]:
+                        del self._unwritten[op[1]]
+                self._lock.notify_all()
+            self._flushing = False
+            self._lock.notify_all()
+
+    def _write(self, ops):
+        """在一个事务中写入一批记录
+        Returns:
+            是否写入成功
+        """
+        tasks = [op[1:] for op in ops if op[0] == 'task']
+        results = [op[1:5] for op in ops if op[0] == 'result']
+        seqs = [op[1] for op in ops if op[0] == 'seq']
+        try:
+            with self._db_lock, self._conn:
+                if tasks:
+                    self._conn.executemany('INSERT OR REPLACE INTO tasks VALUES (?, ?, ?)', tasks)
+                if results:
+                    self._conn.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)', results)
+                if seqs:
+                    self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('task_seq', ?)", (max(seqs),))
+            self.commits += 1
+            self.rows_written += len(tasks) + len(results)
+            return True
+        except sqlite3.Error as e:
+            logger.warning("写入任务存储出错，稍后重试: %s", e)
+            return False
+
+    def cleanup(self):
+        """删除超过保留时间和数量的记录
+        Returns:
+            删除的记录数
+        """
+        self._last_cleanup = time.monotonic()
+        deleted = 0
+        try:
+            with self._db_lock, self._conn:
+                for table, column in (('results', 'updated_at'), ('tasks', 'created_at')):
+                    if self.max_age:
+                        deleted += self._conn.execute(f'DELETE FROM {table} WHERE {column} < ?',
+                                                      (time.time() - self.max_age,)).rowcount
+                    if self.max_results:
+                        deleted += self._conn.execute(
+                            f'DELETE FROM {table} WHERE {column} < '
+                            f'(SELECT {column} FROM {table} ORDER BY {column} DESC LIMIT 1 OFFSET ?)',
+                            (self.max_results - 1,)).rowcount
+        except sqlite3.Error as e:
+            logger.warning("清理任务存储出错: %s", e)
+        if deleted:
+            logger.info("已清理%d条过期的任务记录", deleted)
+        return deleted
+
+    def stats(self):
+        """存储统计"""
+        with self._lock:
+            cached = len(self._cache)
+            queued = len(self._queue)
+        return {'cached': cached, 'queued': queued, 'commits': self.commits, 'rows_written': self.rows_written}
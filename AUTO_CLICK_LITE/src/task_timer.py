@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+定时器模块 - 任务调度器的最小堆定时引擎和调度规则(间隔、每天、每周、一次、cron)
+"""
+import time
+import heapq
+import logging
+import itertools
+from datetime import datetime, timedelta
+from threading import Thread, Condition
+
+from metrics import Histogram, LATENCY_BUCKETS_MS
+
+logger = logging.getLogger('auto_click.task_timer')
+
+# 启动延迟直方图的桶上界(毫秒)
+LAG_BUCKETS_MS = LATENCY_BUCKETS_MS + (1000, 5000)
+
+# 有墙上时钟任务时最长的等待(秒)，等待期间系统时间被调整时最迟在此之后重新计算
+WALL_RECHECK = 60.0
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+
+def _parse_time(text):
+    """解析 HH:MM 或 HH:MM:SS"""
+    parts = [int(part) for part in text.split(':')]
+    if len(parts) not in (2, 3) or not 0 <= parts[0] < 24 or not all(0 <= part < 60 for part in parts[1:]):
+        raise ValueError(f"无效的时间: {text!r}")
+    return parts[0], parts[1], parts[2] if len(parts) == 3 else 0
+
+
+def _parse_weekday(day):
+    """解析星期名称(monday或mon)，返回0(周一)~6(周日)"""
+    name = str(day).strip().lower()
+    for i, weekday in enumerate(WEEKDAYS):
+        if name == weekday or name == weekday[:3]:
+            return i
+    raise ValueError(f"无效的星期: {day!r}")
+
+
+class IntervalSchedule:
+    """每隔固定秒数运行，下一次时间从上一次的计划时间累加，不随执行耗时漂移
+
+    时间使用单调时钟，系统时间被调整(NTP、手动修改)时间隔不受影响。
+    """
+    monotonic = True
+
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ValueError("间隔必须大于0")
+        self.seconds = float(seconds)
+
+    def first(self, now):
+        return now + self.seconds
+
+    def next(self, previous):
+        return previous + self.seconds
+
+
+class DailySchedule:
+    """每天在指定时间运行"""
+    monotonic = False
+
+    def __init__(self, at):
+        self.hour, self.minute, self.second = _parse_time(at)
+
+    def _at(self, day):
+        return day.replace(hour=self.hour, minute=self.minute, second=self.second, microsecond=0)
+
+    def first(self, now):
+        return self.next(now)
+
+    def next(self, previous):
+        after = datetime.fromtimestamp(previous)
+        candidate = self._at(after)
+        if candidate <= after:
+            candidate = self._at(after + timedelta(days=1))
+        return candidate.timestamp()
+
+
+class WeeklySchedule(DailySchedule):
+    """每周的指定星期在指定时间运行"""
+
+    def __init__(self, day, at):
+        super().__init__(at)
+        self.weekday = _parse_weekday(day)
+
+    def next(self, previous):
+        after = datetime.fromtimestamp(previous)
+        days = (self.weekday - after.weekday()) % 7
+        candidate = self._at(after + timedelta(days=days))
+        if candidate <= after:
+            candidate = self._at(after + timedelta(days=days + 7))
+        return candidate.timestamp()
+
+
+class OnceSchedule:
+    """在指定时刻(时间戳)运行一次，未指定时立即运行"""
+    monotonic = False
+
+    def __init__(self, at=None):
+        self.at = at
+
+    def first(self, now):
+        return now if self.at is None else self.at
+
+    def next(self, previous):
+        return None
+
+
+class CronSchedule:
+    """cron表达式：分 时 日 月 星期，支持 *、数字、a-b、*/n、a-b/n 和逗号列表
+
+    星期中0和7都表示周日；日和星期都受限时满足其一即可(与cron相同)。
+    """
+    monotonic = False
+    # (最小值, 最大值)
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron表达式应有5个字段: {expression!r}")
+        self.expression = expression
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # cron的星期0为周日，转换为datetime.weekday()的0为周一
+        self.weekdays = frozenset((day - 1) % 7 for day in weekdays)
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(','):
+            part, _, step = part.partition('/')
+            step = int(step) if step else 1
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(v) for v in part.split('-', 1))
+            else:
+                start = end = int(part)
+                if step != 1:
+                    end = high
+            if not low <= start <= end <= high or step < 1:
+                raise ValueError(f"cron字段超出范围: {field!r}")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, moment):
+        in_days = moment.day in self.days
+        in_weekdays = moment.weekday() in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def first(self, now):
+        return self.next(now)
+
+    def next(self, previous):
+        """按月、日、时、分逐级跳过不匹配的范围，稀疏的表达式也只需少量迭代"""
+        moment = datetime.fromtimestamp(previous).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment.year + 5
+        while moment.year <= limit:
+            if moment.month not in self.months:
+                year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+                continue
+            if moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+                continue
+            return moment.timestamp()
+        raise ValueError(f"cron表达式没有可运行的时间: {self.expression!r}")
+
+
+def parse_schedule(task_config):
+    """由任务配置创建调度规则
+    Args:
+        task_config: 带schedule_type的任务配置，interval需要interval(秒)，daily需要time，
+            weekly需要day和time，cron需要cron，once可带at(时间戳或ISO时间)
+    Returns:
+        调度规则实例
+    """
+    schedule_type = task_config['schedule_type']
+    if schedule_type == 'interval':
+        return IntervalSchedule(task_config['interval'])
+    if schedule_type == 'daily':
+        return DailySchedule(task_config['time'])
+    if schedule_type == 'weekly':
+        return WeeklySchedule(task_config['day'], task_config['time'])
+    if schedule_type == 'cron':
+        return CronSchedule(task_config['cron'])
+    if schedule_type == 'once':
+        at = task_config.get('at')
+        if isinstance(at, str):
+            at = datetime.fromisoformat(at).timestamp()
+        return OnceSchedule(at)
+    raise ValueError(f"未知的调度类型: {schedule_type}")
+
+
+class TimerEntry:
+    """一个定时任务的调度状态，next_run使用调度规则的时钟(单调时钟或时间戳)"""
+    __slots__ = ('key', 'schedule', 'payload', 'next_run', 'runs', '_generation')
+
+    def __init__(self, key, schedule, payload):
+        self.key = key
+        self.schedule = schedule
+        self.payload = payload
+        self.next_run = None
+        self.runs = 0
+        self._generation = 0
+
+
+class TimerEngine:
+    """定时引擎
+
+    所有任务的下一次运行时间保存在最小堆中，线程在条件变量上等待到最早的截止时间，
+    到期后把任务交给dispatch(通常是提交到线程池)，然后按调度规则计算下一次时间放回堆中。
+    取消和重新调度只增加任务的代数，堆中的过期条目在弹出时丢弃。
+    间隔任务按单调时钟调度，每天、每周、一次和cron任务按墙上时钟调度，两者各用一个堆。
+    """
+
+    def __init__(self, dispatch, clock=time.time, monotonic=time.monotonic):
+        """初始化定时引擎
+        Args:
+            dispatch: 到期时调用的函数，参数为(TimerEntry, 计划时间的时间戳)，应尽快返回
+            clock: 墙上时钟函数，返回时间戳(秒)
+            monotonic: 单调时钟函数(秒)
+        """
+        self.dispatch = dispatch
+        self._clock = clock
+        self._monotonic = monotonic
+        self.entries = {}
+        # 单调时钟任务的堆和墙上时钟任务的堆
+        self._heap = []
+        self._wall_heap = []
+        self._seq = itertools.count()
+        self._cond = Condition()
+        self._thread = None
+        self._running = False
+        # 计划时间到交给dispatch的延迟
+        self.lag = Histogram(LAG_BUCKETS_MS)
+        self.fired = 0
+        self.wakeups = 0
+
+    def add(self, key, schedule, payload=None):
+        """添加定时任务，同名任务被替换
+        Returns:
+            TimerEntry实例
+        """
+        entry = TimerEntry(key, schedule, payload)
+        with self._cond:
+            old = self.entries.get(key)
+            if old is not None:
+                old._generation += 1
+            self.entries[key] = entry
+            self._push(entry, schedule.first(self._now(entry)))
+        return entry
+
+    def cancel(self, key):
+        """取消定时任务"""
+        with self._cond:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return False
+            entry._generation += 1
+            entry.next_run = None
+        return True
+
+    def _now(self, entry):
+        """任务所用时钟的当前时间"""
+        return self._monotonic() if entry.schedule.monotonic else self._clock()
+
+    def _timestamp(self, entry, deadline):
+        """把任务时钟的时间换算为时间戳"""
+        if deadline is None or not entry.schedule.monotonic:
+            return deadline
+        return self._clock() + (deadline - self._monotonic())
+
+    def _push(self, entry, deadline):
+        entry.next_run = deadline
+        if deadline is None:
+            # 一次性任务运行后移除
+            if self.entries.get(entry.key) is entry:
+                del self.entries[entry.key]
+            return
+        heap = self._heap if entry.schedule.monotonic else self._wall_heap
+        first = not heap or deadline < heap[0][0]
+        heapq.heappush(heap, (deadline, next(self._seq), entry._generation, entry))
+        if first:
+            # 新的最早截止时间，唤醒线程重新计算等待时间
+            self._cond.notify()
+
+    def start(self):
+        """启动定时线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = Thread(target=self._run, name='task-timer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """停止定时线程，任务保留，再次start后继续调度"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _timeout(self):
+        """距最早截止时间的秒数，没有任务时为None
+
+        墙上时钟的等待不超过WALL_RECHECK，系统时间被调整后可以重新计算。
+        """
+        timeout = None
+        if self._heap:
+            timeout = self._heap[0][0] - self._monotonic()
+        if self._wall_heap:
+            wait = min(self._wall_heap[0][0] - self._clock(), WALL_RECHECK)
+            timeout = wait if timeout is None else min(timeout, wait)
+        return timeout
+
+    def _run(self):
+        """定时线程主循环"""
+        heaps = ((self._heap, self._monotonic), (self._wall_heap, self._clock))
+        while True:
+            with self._cond:
+                while self._running:
+                    timeout = self._timeout()
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                    self.wakeups += 1
+                if not self._running:
+                    return
+                due = []
+                for heap, clock in heaps:
+                    now = clock()
+                    while heap and heap[0][0] <= now:
+                        deadline, _, generation, entry = heapq.heappop(heap)
+                        if generation != entry._generation:
+                            continue
+                        due.append((entry, deadline))
+                        # 落后超过一个周期时合并错过的运行
+                        next_run = entry.schedule.next(deadline)
+                        if next_run is not None and next_run <= now:
+                            next_run = entry.schedule.next(now)
+                        self._push(entry, next_run)
+            for entry, deadline in due:
+                lag = self._now(entry) - deadline
+                self.lag.add(lag * 1000.0)
+                # dispatch收到的计划时间统一为时间戳
+                deadline = self._clock() - lag
+                self.fired += 1
+                entry.runs += 1
+                try:
+                    self.dispatch(entry, deadline)
+                except Exception as e:
+                    logger.warning("定时任务%s分发出错: %s", entry.key, e)
+
+    def scheduled(self):
+        """当前的定时任务
+        Returns:
+            (键, 附带数据, 下一次运行时间的时间戳) 列表
+        """
+        with self._cond:
+            return [(entry.key, entry.payload, self._timestamp(entry, entry.next_run))
+                    for entry in self.entries.values()]
+
+    def stats(self):
+        """获取定时统计"""
+        with self._cond:
+            heads = [self._timestamp(heap[0][3], heap[0][0]) for heap in (self._heap, self._wall_heap) if heap]
+            upcoming = min(heads) if heads else None
+            scheduled = len(self.entries)
+        return {
+            'scheduled': scheduled,
+            'fired': self.fired,
+            'wakeups': self.wakeups,
+            'next_run': upcoming,
+            'dispatch_lag_ms': self.lag.snapshot()
+        }
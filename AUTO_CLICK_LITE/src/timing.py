@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+计时模块 - 基于单调时钟截止时间的点击节拍器
+"""
+import time
+import random
+from array import array
+
+
+class ClickTimer:
+    def __init__(self, interval=100, randomize=False, min_interval=80, max_interval=120,
+                 max_lag=None, spin_margin=0.001, jitter_batch=256,
+                 clock=time.perf_counter, sleep=time.sleep):
+        """初始化节拍器
+        Args:
+            interval: 点击间隔(毫秒)
+            randomize: 是否启用随机间隔
+            min_interval: 最小随机间隔(毫秒)
+            max_interval: 最大随机间隔(毫秒)
+            max_lag: 允许追赶的最大落后时间(秒)，超过后重新对齐，None表示两个间隔
+            spin_margin: 截止时间前改为让出CPU精确等待的余量(秒)
+            jitter_batch: 随机间隔批量预生成的数量，0表示每次单独抽取
+            clock: 单调时钟函数
+            sleep: 休眠函数，返回真值表示等待被中断
+        """
+        self.max_lag = max_lag
+        self.spin_margin = spin_margin
+        self.jitter_batch = jitter_batch
+        self._jitter = array('d')
+        self._jitter_pos = 0
+        self._clock = clock
+        self._sleep = sleep
+        self.configure(interval, randomize, min_interval, max_interval)
+        self.start()
+
+    def configure(self, interval=None, randomize=None, min_interval=None, max_interval=None):
+        """更新间隔设置，运行中调用时从下一个截止时间开始生效"""
+        if interval is not None:
+            self.interval = interval / 1000.0
+        if randomize is not None:
+            self.randomize = randomize
+        if min_interval is not None:
+            self.min_interval = min_interval / 1000.0
+        if max_interval is not None:
+            self.max_interval = max_interval / 1000.0
+        # 丢弃按旧设置预生成的随机间隔
+        self._jitter_pos = len(self._jitter)
+
+    @property
+    def mean_interval(self):
+        """当前设置下的平均间隔(秒)"""
+        if self.randomize:
+            return (self.min_interval + self.max_interval) / 2.0
+        return self.interval
+
+    @property
+    def target_cps(self):
+        """目标每秒点击数"""
+        mean = self.mean_interval
+        return 1.0 / mean if mean > 0 else 0.0
+
+    def next_interval(self):
+        """抽取下一个间隔(秒)"""
+        if not self.randomize:
+            return self.interval
+        if not self.jitter_batch:
+            return random.uniform(self.min_interval, self.max_interval)
+        if self._jitter_pos >= len(self._jitter):
+            self._refill_jitter()
+        value = self._jitter[self._jitter_pos]
+        self._jitter_pos += 1
+        return value
+
+    def _refill_jitter(self):
+        """批量预生成随机间隔序列"""
+        low, high = self.min_interval, self.max_interval
+        uniform = random.uniform
+        self._jitter = array('d', [uniform(low, high) for _ in range(self.jitter_batch)])
+        self._jitter_pos = 0
+
+    def start(self):
+        """以当前时间为起点重置节拍器和统计"""
+        now = self._clock()
+        self._deadline = now
+        self.clicks = 0
+        self.first_click_at = None
+        self.last_click_at = None
+        self.late_total = 0.0
+        self.max_late = 0.0
+        self.resyncs = 0
+
+    def resync(self):
+        """丢弃累计的落后时间，以当前时间为下一个截止时间(如暂停恢复后)"""
+        self._deadline = self._clock()
+        self.resyncs += 1
+
+    def defer(self, seconds):
+        """将下一个截止时间推后指定秒数(如文本输入后的额外间隔)，期间的耗时会从中扣除"""
+        self._deadline += seconds
+
+    def tick(self):
+        """记录一次点击"""
+        now = self._clock()
+        if self.first_click_at is None:
+            self.first_click_at = now
+        self.last_click_at = now
+        self.clicks += 1
+        return now
+
+    def wait_next(self):
+        """推进到下一个截止时间并等待
+
+        截止时间按抽取的间隔累加，而不是从点击结束时刻起算，
+        因此点击本身和异常处理的耗时会从下一次等待中扣除，长期速率保持准确。
+        落后超过 max_lag 时重新对齐，避免暂停或长时间卡顿后突发连点。
+        Returns:
+            本次截止时间的落后量(秒)，0表示准时或等待被中断
+        """
+        self._deadline += self.next_interval()
+        now = self._clock()
+        late = now - self._deadline
+        if late > 0:
+            max_lag = self.max_lag if self.max_lag is not None else 2 * self.mean_interval
+            self.late_total += late
+            self.max_late = max(self.max_late, late)
+            if late > max_lag:
+                self._deadline = now
+                self.resyncs += 1
+            return late
+        self.wait_until(self._deadline)
+        return 0.0
+
+    def wait_until(self, deadline):
+        """等待到指定截止时间：先粗粒度休眠，最后一小段让出CPU精确等待
+        Returns:
+            是否到达截止时间，休眠被中断时返回False
+        """
+        while True:
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                return True
+            if remaining > self.spin_margin:
+                if self._sleep(remaining - self.spin_margin):
+                    return False
+            else:
+                time.sleep(0)
+
+    def stats(self):
+        """获取节拍统计
+        Returns:
+            包含目标/实际每秒点击数和落后情况的字典
+        """
+        achieved = 0.0
+        if self.clicks > 1 and self.last_click_at > self.first_click_at:
+            achieved = (self.clicks - 1) / (self.last_click_at - self.first_click_at)
+        target = self.target_cps
+        return {
+            'clicks': self.clicks,
+            'target_cps': target,
+            'achieved_cps': achieved,
+            'rate_ratio': achieved / target if target else 0.0,
+            'avg_late_ms': self.late_total / self.clicks * 1000.0 if self.clicks else 0.0,
+            'max_late_ms': self.max_late * 1000.0,
+            'resyncs': self.resyncs
+        }
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+触发模块 - 高频截取小区域，在区域变化、颜色或哈希匹配时触发点击
+"""
+import time
+import hashlib
+
+import numpy as np
+
+from metrics import Histogram, LATENCY_BUCKETS_MS
+from screen import clip_rect
+
+# 每次采样耗时的直方图桶上界(毫秒)
+POLL_BUCKETS_MS = LATENCY_BUCKETS_MS
+
+
+def region_digest(pixels):
+    """计算区域的哈希，灰度量化到16级以容忍轻微的渲染噪声"""
+    quantized = (np.asarray(pixels, dtype=np.float32) // 16).astype(np.uint8)
+    return hashlib.blake2b(quantized.tobytes(), digest_size=8).hexdigest()
+
+
+class TriggerMonitor:
+    """区域触发监视器
+
+    每次采样只截取触发区域，与缓存的基准(变化模式)、目标颜色或目标哈希比较。
+    等待由调用方提供的可中断等待函数完成，停止或暂停时立即返回。
+    """
+
+    def __init__(self, capture):
+        """初始化触发监视器
+        Args:
+            capture: ScreenCapture实例
+        """
+        self.capture = capture
+        self.poll_time = Histogram(POLL_BUCKETS_MS)
+        self.latency = Histogram(LATENCY_BUCKETS_MS)
+        self.reset_stats()
+
+    def reset_stats(self):
+        """清空触发统计"""
+        self.polls = 0
+        self.fires = 0
+        self.timeouts = 0
+        self.fired_at = None
+        self.poll_time.reset()
+        self.latency.reset()
+
+    def _grab(self, region, rgb=False):
+        left, top, width, height = clip_rect(*region, self.capture.size())
+        if not width or not height:
+            raise ValueError(f"触发区域不在屏幕内: {region}")
+        if rgb:
+            return self.capture.grab_rgb(left, top, width, height)
+        return self.capture.grab(left, top, width, height)
+
+    def digest(self, region):
+        """计算区域当前的哈希，用于配置哈希触发"""
+        return region_digest(self._grab(region))
+
+    def wait(self, trigger, wait):
+        """等待触发条件满足
+        Args:
+            trigger: compile_trigger返回的元组
+            wait: 可中断的等待函数，参数为秒数，被中断时返回True
+        Returns:
+            True表示已触发，False表示被中断或超时
+        """
+        mode, region, color, digest, tolerance, ratio, poll_interval, timeout = trigger
+        perf_counter = time.perf_counter
+        started = perf_counter()
+        if mode == 'change':
+            # 到达该位置时的画面作为基准
+            baseline = self._grab(region).copy()
+            limit = ratio * baseline.size
+        elif mode == 'color':
+            target = np.array(color, dtype=np.float32)
+        while True:
+            poll_started = perf_counter()
+            if mode == 'change':
+                changed = np.count_nonzero(np.abs(self._grab(region) - baseline) > tolerance)
+                fired = changed > limit
+            elif mode == 'color':
+                mean = self._grab(region, rgb=True).reshape(-1, 3).mean(axis=0)
+                fired = float(np.abs(mean - target).max()) <= tolerance
+            else:
+                fired = region_digest(self._grab(region)) == digest
+            now = perf_counter()
+            self.polls += 1
+            self.poll_time.add((now - poll_started) * 1000.0)
+            if fired:
+                self.fires += 1
+                self.fired_at = poll_started
+                return True
+            if timeout and now - started >= timeout:
+                self.timeouts += 1
+                return False
+            if wait(poll_interval):
+                return False
+
+    def record_click(self, now):
+        """记录从检测到触发到点击完成的延迟"""
+        if self.fired_at is not None:
+            self.latency.add((now - self.fired_at) * 1000.0)
+            self.fired_at = None
+
+    def stats(self):
+        """获取触发统计"""
+        return {
+            'polls': self.polls,
+            'fires': self.fires,
+            'timeouts': self.timeouts,
+            'polls_per_fire': self.polls / self.fires if self.fires else 0.0,
+            'poll_ms': self.poll_time.snapshot(),
+            'trigger_to_click_ms': self.latency.snapshot()
+        }
@@ -7,20 +7,17 @@ import time
 import json
 import random
 import threading
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import requests
-import pyautogui
+from input_backend import create_backend
+
+# selenium只在创建浏览器和查找元素时导入，导入本模块不加载浏览器驱动相关的库
 
 class WebAutomation:
-    def __init__(self):
-        """初始化网页自动化"""
+    def __init__(self, input_backend='auto'):
+        """初始化网页自动化
+        Args:
+            input_backend: 系统级输入后端名称或实例，用于浏览器无法处理的原生对话框等
+        """
+        self._input_backend = input_backend
         self.drivers = []  # 多浏览器实例
         self.tasks = []    # 任务队列
         self.running = False
@@ -30,6 +27,8 @@ class WebAutomation:
         
     def create_driver(self, headless=False, user_agent=None, proxy=None):
         """创建浏览器驱动"""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
         options = Options()
         if headless:
             options.add_argument('--headless')
@@ -64,6 +63,9 @@ class WebAutomation:
     
     def batch_fill_forms(self, driver, form_data_list):
         """批量填写表单"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
         results = []
         
         for tab_index, form_data in enumerate(form_data_list):
@@ -108,6 +110,7 @@ class WebAutomation:
     
     def batch_scrape_data(self, driver, scrape_configs):
         """批量抓取数据"""
+        from selenium.webdriver.common.by import By
         results = []
         
         for tab_index, config in enumerate(scrape_configs):
@@ -261,8 +264,48 @@ class WebAutomation:
                 
         return results
     
+    @property
+    def input_backend(self):
+        """系统级输入后端，首次使用时创建"""
+        if isinstance(self._input_backend, str):
+            self._input_backend = create_backend(self._input_backend)
+        return self._input_backend
+
+    def batch_native_input(self, actions):
+        """通过系统级输入后端批量执行鼠标键盘操作（文件选择框、浏览器原生弹窗等）"""
+        results = []
+        backend = self.input_backend
+
+        with backend.batch():
+            for action in actions:
+                try:
+                    if action['type'] == 'move':
+                        backend.move_to(action['x'], action['y'])
+                    elif action['type'] == 'click':
+                        if 'x' in action:
+                            backend.move_to(action['x'], action['y'])
+                        backend.click(action.get('button', 'left'))
+                    elif action['type'] == 'press':
+                        backend.press(action['key'])
+                    elif action['type'] == 'hotkey':
+                        backend.hotkey(*action['keys'])
+                    elif action['type'] == 'write':
+                        backend.write(action['text'], interval=action.get('interval', 0.0))
+                    elif action['type'] == 'wait':
+                        backend.flush()
+                        time.sleep(action['seconds'])
+                    results.append({'action': action['type'], 'status': 'success'})
+                except Exception as e:
+                    results.append({'action': action['type'], 'status': 'error', 'error': str(e)})
+
+        return results
+
     def _find_element(self, driver, selector, by='css'):
         """查找元素"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
         try:
             by_mapping = {
                 'css': By.CSS_SELECTOR,
@@ -337,6 +380,10 @@ class WebAutomation:
                     driver = self.drivers[task['driver_id']]
                     result = self.batch_account_operations(driver, task['account_configs'])
                     results.append({'task': task['name'], 'status': 'success', 'results': result})
+
+                elif task['type'] == 'native_input':
+                    result = self.batch_native_input(task['actions'])
+                    results.append({'task': task['name'], 'status': 'success', 'results': result})
                 
                 # 任务间随机延迟
                 time.sleep(random.uniform(task.get('delay_min', 1), task.get('delay_max', 3)))
@@ -372,4 +419,4 @@ class WebAutomation:
     def save_results_to_file(self, results, filename):
         """保存结果到文件"""
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
\ No newline at end of file
+            json.dump(results, f, indent=2, ensure_ascii=False)
\ No newline at end of file
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""点击计划测试"""
+import unittest
+from src.click_plan import ClickPlan, FLAG_TEXT
+
+
+class TestClickPlan(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.positions = [
+            {'x': 100, 'y': 200, 'note': '位置1', 'enabled': True, 'text': '继续', 'text_interval': 500},
+            {'x': 300, 'y': 400, 'note': '位置2', 'enabled': False, 'text': '', 'text_interval': 1000},
+            {'x': 500, 'y': 600, 'note': '位置3', 'enabled': True, 'text': '', 'text_interval': 1000,
+             'button': 'right'},
+            {'x': 700, 'y': 800, 'note': '位置4', 'enabled': True, 'text': '继续', 'text_interval': 0},
+        ]
+
+    def test_disabled_positions_dropped(self):
+        """测试编译时去掉禁用位置"""
+        plan = ClickPlan.compile(self.positions)
+        self.assertEqual(len(plan), 3)
+        self.assertEqual(list(plan.xs), [100, 500, 700])
+        self.assertEqual(list(plan.source_index), [0, 2, 3])
+
+    def test_buttons_and_text(self):
+        """测试按钮、文本标志和文本去重"""
+        plan = ClickPlan.compile(self.positions, button='middle')
+        self.assertEqual([plan.button(i) for i in range(len(plan))], ['middle', 'right', 'middle'])
+        self.assertEqual([plan.flags[i] & FLAG_TEXT for i in range(len(plan))], [FLAG_TEXT, 0, FLAG_TEXT])
+        self.assertEqual(plan.texts, ('继续',))
+        self.assertEqual(plan.text(1), '')
+        self.assertEqual(plan.text_intervals[0], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
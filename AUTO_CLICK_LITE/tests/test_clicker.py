@@ -3,12 +3,16 @@
 """点击模块测试"""
 import unittest
 import time
+import threading
 from src.clicker import Clicker
+from src.input_backend import RecordingBackend
 
 class TestClicker(unittest.TestCase):
     def setUp(self):
         """测试前设置"""
-        self.clicker = Clicker(interval=100, count=5, button='left', randomize=False)
+        self.backend = RecordingBackend()
+        self.clicker = Clicker(interval=100, count=5, button='left', randomize=False,
+                               backend=self.backend)
 
     def test_update_settings(self):
         """测试更新设置"""
@@ -27,6 +31,8 @@ class TestClicker(unittest.TestCase):
         self.clicker.stop_clicking()
         # 确保点击已停止
         self.assertTrue(self.clicker._stop_event.is_set())
+        # 验证点击次数
+        self.assertEqual(len(self.backend.of_kind('click')), 5)
 
     def test_pause_resume_clicking(self):
         """测试暂停和恢复点击"""
@@ -45,6 +51,38 @@ class TestClicker(unittest.TestCase):
         # 停止点击
         self.clicker.stop_clicking()
 
+    def test_stop_interrupts_long_interval(self):
+        """测试停止可以立即打断很长的点击间隔"""
+        clicker = Clicker(interval=60000, count=-1, randomize=False, backend=self.backend)
+        thread = threading.Thread(target=clicker.start_clicking, daemon=True)
+        thread.start()
+        time.sleep(0.05)
+        started = time.perf_counter()
+        clicker.stop_clicking()
+        thread.join(timeout=1.0)
+        self.assertFalse(thread.is_alive())
+        self.assertLess(time.perf_counter() - started, 0.1)
+        self.assertEqual(len(self.backend.of_kind('click')), 1)
+
+    def test_pause_does_not_wake(self):
+        """测试暂停期间点击线程没有任何唤醒"""
+        clicker = Clicker(interval=10, count=-1, randomize=False, backend=self.backend)
+        thread = threading.Thread(target=clicker.start_clicking, daemon=True)
+        thread.start()
+        time.sleep(0.05)
+        clicker.pause_clicking()
+        time.sleep(0.02)
+        wakeups, clicks = clicker.wakeups, len(self.backend.of_kind('click'))
+        time.sleep(0.2)
+        self.assertEqual(clicker.wakeups, wakeups)
+        self.assertEqual(len(self.backend.of_kind('click')), clicks)
+        clicker.resume_clicking()
+        time.sleep(0.05)
+        self.assertGreater(len(self.backend.of_kind('click')), clicks)
+        clicker.stop_clicking()
+        thread.join(timeout=1.0)
+        self.assertFalse(thread.is_alive())
+
     def test_multi_position_mode(self):
         """测试多位置模式"""
         # 初始化多位置模式
@@ -94,5 +132,61 @@ class TestClicker(unittest.TestCase):
         self.assertEqual(self.clicker.positions[0]['text'], '测试文本')
         self.assertEqual(self.clicker.positions[0]['text_interval'], 500)
 
+    def test_text_focus_modes(self):
+        """测试文本输入的聚焦方式"""
+        positions = [
+            {'x': 100, 'y': 200, 'note': '全选', 'enabled': True, 'text': '文本', 'text_interval': 0,
+             'focus_delay': 0},
+            {'x': 300, 'y': 400, 'note': 'Tab', 'enabled': True, 'text': '文本', 'text_interval': 0,
+             'focus_mode': 'tab', 'focus_delay': 0},
+        ]
+        backend = RecordingBackend()
+        clicker = Clicker(interval=1, count=2, randomize=False, multi_position=True,
+                          positions=positions, backend=backend)
+        clicker.start_clicking()
+        kinds = [(event[1],) + event[2] for event in backend.events]
+        self.assertEqual(kinds, [
+            ('move', 100, 200), ('click', 'left', 100, 200), ('hotkey', 'ctrl', 'a'), ('clipboard', '文本'),
+            ('hotkey', 'ctrl', 'v'),
+            ('move', 300, 400), ('click', 'left', 300, 400), ('press', 'tab'), ('clipboard', '文本'),
+            ('hotkey', 'ctrl', 'v'),
+        ])
+        self.assertEqual(clicker.get_stats()['text_entries'], 2)
+
+    def test_settings_snapshot(self):
+        """测试设置快照不可变，更新时整体替换且不受调用方后续修改影响"""
+        positions = [{'x': 1, 'y': 2, 'note': '', 'enabled': True, 'text': '', 'text_interval': 0}]
+        self.clicker.update_settings(multi_position=True, positions=positions)
+        snapshot = self.clicker.settings
+        with self.assertRaises(AttributeError):
+            snapshot.count = 1
+        positions[0]['x'] = 99
+        self.assertEqual(self.clicker.positions[0]['x'], 1)
+        self.clicker.update_settings(interval=50)
+        self.assertIsNot(self.clicker.settings, snapshot)
+        self.assertEqual(snapshot.interval, 0.1)
+        # 位置和按钮未变化时沿用已编译的计划
+        self.assertIs(self.clicker.plan, snapshot.plan)
+        self.assertAlmostEqual(self.clicker.timer.mean_interval, 0.05)
+
+    def test_live_update_while_clicking(self):
+        """测试高频点击中并发更新设置，每次点击只使用同一份设置"""
+        backend = RecordingBackend()
+        clicker = Clicker(interval=0, count=-1, randomize=False, position_type='fixed',
+                          fixed_position={'x': 0, 'y': 0}, backend=backend)
+        thread = threading.Thread(target=clicker.start_clicking)
+        thread.start()
+        for i in range(2000):
+            clicker.update_settings(fixed_position={'x': i, 'y': i}, button=('left', 'right')[i % 2])
+        clicker.update_settings(count=1)
+        thread.join(1.0)
+        self.assertFalse(thread.is_alive())
+        clicks = backend.of_kind('click')
+        self.assertGreater(len(clicks), 1)
+        for _, _, (button, x, y) in clicks:
+            self.assertEqual(x, y)
+            self.assertEqual(button, ('left', 'right')[x % 2])
+        self.assertEqual(clicker.metrics.snapshot()['errors'], 0)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""配置存储测试"""
+import os
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from src.click_plan import ClickPlan
+from src.config import Config, default_config, validate_config
+
+
+class TestConfig(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'config.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _write(self, data):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def test_defaults_and_validation(self):
+        """测试缺失项补默认值、非法项替换、未知项保留"""
+        self._write({'default_settings': {'interval': -5, 'button': 'right', 'randomize': 'yes',
+                                          'positions': [{'x': 1, 'y': 2}]},
+                     'app_settings': {'log_level': 'debug'}, 'extra': 1})
+        config = Config(self.path).load_config()
+        settings = config['default_settings']
+        self.assertEqual(settings['interval'], 100)
+        self.assertEqual(settings['button'], 'right')
+        self.assertIs(settings['randomize'], True)
+        self.assertEqual(settings['positions'][0]['text_interval'], 1000)
+        self.assertEqual(settings['hotkeys'], {'start': 'f6', 'stop': 'f7', 'pause': 'f8'})
+        self.assertEqual(config['app_settings']['log_level'], 'DEBUG')
+        self.assertEqual(config['extra'], 1)
+        _, errors = validate_config(default_config())
+        self.assertEqual(errors, [])
+
+    def test_cache_and_external_change(self):
+        """测试文件未变化时不重新解析，外部修改后重新加载"""
+        store = Config(self.path)
+        first = store.load_config()
+        self.assertIs(store.load_config(), first)
+        self.assertEqual(store.reads, 1)
+        data = default_config()
+        data['default_settings']['interval'] = 250
+        self._write(data)
+        os.utime(self.path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+        self.assertEqual(store.load_config()['default_settings']['interval'], 250)
+        self.assertEqual(store.reads, 2)
+
+    def test_debounced_atomic_save(self):
+        """测试连续保存合并为一次原子写入，不留临时文件"""
+        store = Config(self.path, debounce=0.05)
+        writes = store.writes
+        config = store.load_config()
+        started = time.perf_counter()
+        for interval in range(10, 20):
+            config['default_settings']['interval'] = interval
+            store.save_config(config)
+        self.assertLess(time.perf_counter() - started, 0.05)
+        self.assertTrue(store.flush())
+        self.assertEqual(store.writes - writes, 1)
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['default_settings']['interval'], 19)
+        self.assertEqual(os.listdir(self.dir), ['config.json'])
+        # 自己写入的文件不会触发重新解析
+        reads = store.reads
+        store.load_config()
+        self.assertEqual(store.reads, reads)
+        store.close()
+
+    def test_invalid_positions_kept_partially(self):
+        """测试只去掉或修正不合法的位置，其余位置保留"""
+        config = default_config()
+        config['default_settings']['positions'] = [{'x': 1, 'y': 2, 'note': 'a'}, {'x': 'left', 'y': 3},
+                                                   {'x': '5', 'y': 6.0}, 'bad']
+        result, errors = validate_config(config)
+        positions = result['default_settings']['positions']
+        self.assertEqual([(pos['x'], pos['y']) for pos in positions], [(1, 2), (5, 6)])
+        self.assertEqual(positions[0]['note'], 'a')
+        self.assertEqual(len(errors), 3)
+        self.assertTrue(all(error.startswith('default_settings.positions') for error in errors))
+
+    def test_invalid_position_fields(self):
+        """测试位置中不合法的可选字段恢复缺省值，不影响编译点击计划"""
+        config = default_config()
+        config['default_settings']['positions'] = [
+            {'x': 1, 'y': 2, 'focus_mode': 'bogus'},
+            {'x': 3, 'y': 4, 'button': 'side', 'text': 'hi', 'focus_mode': 'tab'},
+            {'x': 5, 'y': 6, 'trigger': {'mode': 'color', 'region': [0, 0, 2, 2]}},
+            {'x': 7, 'y': 8, 'trigger': {'region': [0, 0, 2, 2]}, 'threshold': 0.9}]
+        result, errors = validate_config(config)
+        positions = result['default_settings']['positions']
+        self.assertEqual(len(positions), 4)
+        self.assertEqual(len(errors), 3)
+        self.assertNotIn('focus_mode', positions[0])
+        self.assertNotIn('button', positions[1])
+        self.assertEqual(positions[1]['focus_mode'], 'tab')
+        self.assertNotIn('trigger', positions[2])
+        self.assertEqual(positions[3]['trigger'], {'region': [0, 0, 2, 2]})
+        self.assertEqual(len(ClickPlan.compile(positions)), 4)
+
+    def test_failed_write_retried(self):
+        """测试写入失败时保留数据并重试，成功前flush返回False"""
+        store = Config(self.path, debounce=0)
+        config = store.load_config()
+        config['default_settings']['interval'] = 250
+        with mock.patch('os.replace', side_effect=OSError('disk full')):
+            self.assertFalse(store.save_config(config, wait=True))
+            self.assertFalse(store.flush())
+        self.assertTrue(store.flush())
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['default_settings']['interval'], 250)
+        store.close()
+
+    def test_failed_write_keeps_newer_save(self):
+        """测试写入失败时不丢弃写入期间的新保存"""
+        store = Config(self.path, debounce=0)
+        config = store.load_config()
+        write = store._write
+        calls = []
+
+        def failing_write(data):
+            calls.append(data)
+            if len(calls) == 1:
+                config['default_settings']['interval'] = 300
+                store.save_config(config)
+                return False
+            return write(data)
+        store._write = failing_write
+        config['default_settings']['interval'] = 200
+        store.save_config(config)
+        self.assertTrue(store.flush())
+        self.assertEqual(len(calls), 2)
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['default_settings']['interval'], 300)
+        store.close()
+
+    def test_corrupt_file(self):
+        """测试损坏的配置文件被备份并使用默认配置"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"default_settings": ')
+        config = Config(self.path).load_config()
+        self.assertEqual(config, default_config())
+        self.assertTrue(os.path.exists(self.path + '.bak'))
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), default_config())
+
+
+if __name__ == '__main__':
+    unittest.main()
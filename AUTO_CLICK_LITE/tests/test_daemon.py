@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""守护进程和JSON-RPC客户端测试"""
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from src.daemon import ClickDaemon, DaemonClient, RPCError, METHOD_NOT_FOUND, APP_ERROR
+from src.input_backend import RecordingBackend
+
+
+class TestClickDaemon(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.dir, 'daemon.sock')
+        self.backend = RecordingBackend()
+        self.daemon = ClickDaemon(os.path.join(self.dir, 'config.json'), self.socket_path,
+                                  hotkeys=False, backend=self.backend)
+        self.daemon.profiles.save('快速', {'interval': 1, 'randomize': False, 'count': 5, 'position_type': 'fixed',
+                                         'fixed_position': {'x': 7, 'y': 8}, 'multi_position': False})
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+        deadline = time.monotonic() + 2.0
+        while self.daemon.server is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.client = DaemonClient(self.socket_path)
+
+    def tearDown(self):
+        try:
+            self.client.call('shutdown')
+        finally:
+            self.client.close()
+        self.thread.join(2.0)
+        shutil.rmtree(self.dir)
+
+    def test_control_and_profile(self):
+        """测试启动、暂停、恢复、停止和切换配置"""
+        # 套接字只允许所有者连接
+        self.assertEqual(os.stat(self.socket_path).st_mode & 0o777, 0o600)
+        self.client.call('load_profile', name='快速')
+        self.assertEqual(self.client.call('profiles'), ['快速'])
+        status = self.client.call('start')
+        self.assertTrue(status['running'])
+        self.assertEqual(status['active_profile'], '快速')
+        self.daemon.click_thread.join(1.0)
+        self.assertFalse(self.client.call('status')['running'])
+        self.assertEqual([event[2][1:] for event in self.backend.of_kind('click')], [(7, 8)] * 5)
+
+        self.client.call('update_settings', count=-1, interval=10)
+        self.client.call('start')
+        self.assertTrue(self.client.call('pause')['paused'])
+        self.assertFalse(self.client.call('resume')['paused'])
+        self.assertFalse(self.client.call('stop')['running'])
+
+    def test_errors(self):
+        """测试未知方法、不存在的配置和无效的参数"""
+        with self.assertRaises(RPCError) as context:
+            self.client.call('reboot')
+        self.assertEqual(context.exception.code, METHOD_NOT_FOUND)
+        with self.assertRaises(RPCError) as context:
+            self.client.call('load_profile', name='不存在')
+        self.assertEqual(context.exception.code, APP_ERROR)
+        with self.assertRaises(RPCError):
+            self.client.call('update_settings', speed=3)
+        # 出错后连接仍可继续使用
+        self.assertFalse(self.client.call('status')['running'])
+
+    def test_submit_task(self):
+        """测试提交任务并查询结果"""
+        input_file = os.path.join(self.dir, 'input.json')
+        output_file = os.path.join(self.dir, 'output.json')
+        with open(input_file, 'w', encoding='utf-8') as f:
+            json.dump([{'name': 'a', 'value': 1}, {'name': 'b', 'value': 5}], f)
+        task_id = self.client.call('submit_task', task={
+            'type': 'data_processing',
+            'data_config': {'action': 'json_processing', 'input_file': input_file, 'output_file': output_file,
+                            'operations': [{'type': 'filter', 'condition': {'field': 'value', 'operator': 'greater_than',
+                                                                            'value': 2}}]}})
+        deadline = time.monotonic() + 2.0
+        status = self.client.call('task_status', task_id=task_id)
+        while status['status'] == 'running' and time.monotonic() < deadline:
+            time.sleep(0.01)
+            status = self.client.call('task_status', task_id=task_id)
+        self.assertEqual(status['status'], 'completed')
+        with open(output_file, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f), [{'name': 'b', 'value': 5}])
+
+    def test_stream_metrics(self):
+        """测试订阅统计按间隔推送"""
+        stream = DaemonClient(self.socket_path)
+        snapshots = list(stream.stream_metrics(interval=0.01, count=3))
+        self.assertEqual(len(snapshots), 3)
+        self.assertIn('timing', snapshots[0])
+        self.assertFalse(snapshots[0]['running'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""数据处理任务测试"""
+import os
+import csv
+import shutil
+import tempfile
+import unittest
+from src import data_processing
+from src.data_processing import process_csv, process_data
+
+
+class TestCSVProcessing(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.dir = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.dir, 'input.csv')
+        self.output_file = os.path.join(self.dir, 'output.csv')
+        with open(self.input_file, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['name', 'city', 'amount', 'note'])
+            for i in range(10000):
+                writer.writerow([f'user{i}', ('北京', '上海', '广州')[i % 3], i, '' if i % 7 else 'vip'])
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read_output(self):
+        with open(self.output_file, 'r', encoding='utf-8', newline='') as f:
+            return list(csv.reader(f))
+
+    def config(self, operations, **options):
+        config = {'action': 'csv_processing', 'input_file': self.input_file, 'output_file': self.output_file,
+                  'operations': operations}
+        config.update(options)
+        return config
+
+    def test_streaming_matches_full_read(self):
+        """测试分块处理与整体处理结果相同，列名只写一次"""
+        operations = [{'type': 'filter', 'column': 'city', 'value': '上海'},
+                      {'type': 'transform', 'column': 'amount', 'function': 'lambda x: x * 2'},
+                      {'type': 'filter', 'column': 'amount', 'value': '0$'}]
+        summary = process_csv(self.config(operations, chunksize=1000))
+        self.assertEqual(summary['chunks'], 10)
+        self.assertEqual(summary['rows_read'], 10000)
+        self.assertGreater(summary['rows_per_sec'], 0)
+        streamed = self.read_output()
+        process_csv(self.config(operations, chunksize=10 ** 6))
+        self.assertEqual(self.read_output(), streamed)
+        self.assertEqual(streamed[0], ['name', 'city', 'amount', 'note'])
+        self.assertEqual(len(streamed) - 1, summary['rows_processed'])
+        # 上海为 i%3==1，金额乘2后以0结尾即 i%5==0
+        self.assertEqual(summary['rows_processed'], len([i for i in range(10000) if i % 3 == 1 and i % 5 == 0]))
+        self.assertEqual(streamed[1], ['user10', '上海', '20', ''])
+
+    def test_usecols_dtype_and_empty_result(self):
+        """测试只读取部分列并指定类型，过滤后为空时仍写入列名"""
+        summary = process_csv(self.config([{'type': 'filter', 'column': 'name', 'value': 'nobody'}],
+                                          usecols=['name', 'amount'], dtype={'amount': 'float64'}, chunksize=3000))
+        self.assertEqual(summary['rows_processed'], 0)
+        self.assertEqual(summary['chunks'], 4)
+        self.assertEqual(self.read_output(), [['name', 'amount']])
+
+        process_csv(self.config([], usecols=['amount'], dtype={'amount': 'float64'}))
+        self.assertEqual(self.read_output()[1], ['0.0'])
+
+    def test_header_only_input(self):
+        """测试只有列名的输入仍写入列名"""
+        with open(self.input_file, 'w', encoding='utf-8', newline='') as f:
+            f.write('name,city,amount,note\n')
+        operations = [{'type': 'filter', 'column': 'city', 'value': '上海'},
+                      {'type': 'transform', 'column': 'amount', 'function': 'lambda x: x * 2'}]
+        summary = process_csv(self.config(operations, chunksize=100))
+        self.assertEqual(summary['rows_processed'], 0)
+        self.assertEqual(self.read_output(), [['name', 'city', 'amount', 'note']])
+        process_csv(self.config([], usecols=['name', 'amount']))
+        self.assertEqual(self.read_output(), [['name', 'amount']])
+
+    def test_aggregate(self):
+        """测试带聚合的操作链，分组列写入输出"""
+        results = process_data(self.config([{'type': 'filter', 'column': 'note', 'value': 'vip'},
+                                            {'type': 'aggregate', 'group_by': 'city',
+                                             'aggregations': {'amount': 'count'}}]))
+        self.assertEqual(results[0]['rows_processed'], 3)
+        rows = self.read_output()
+        self.assertEqual(rows[0], ['city', 'amount'])
+        self.assertEqual(sum(int(row[1]) for row in rows[1:]), len(range(0, 10000, 7)))
+
+    def test_partitioned_aggregate_matches_pandas(self):
+        """测试分区并行聚合与pandas整体groupby的结果相同"""
+        import pandas as pd
+        aggregations = {'amount': ['sum', 'count', 'mean'], 'name': ['min', 'max']}
+        operations = [{'type': 'filter', 'column': 'city', 'value': '北京|广州'},
+                      {'type': 'aggregate', 'group_by': ['city', 'note'], 'aggregations': aggregations}]
+        df = pd.read_csv(self.input_file)
+        expected = df[df['city'].str.contains('北京|广州')].groupby(['city', 'note']).agg(aggregations).reset_index()
+        original = data_processing.MIN_PARTITION_BYTES
+        data_processing.MIN_PARTITION_BYTES = 1
+        try:
+            for workers in (1, 3):
+                summary = process_csv(self.config(operations, workers=workers, chunksize=700))
+                self.assertEqual(summary['partitions'], workers)
+                self.assertEqual(summary['rows_read'], 10000)
+                result = pd.read_csv(self.output_file, header=[0, 1])
+                result.columns = expected.columns
+                pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+        finally:
+            data_processing.MIN_PARTITION_BYTES = original
+
+        # 不能分区合并的函数读入整个文件计算
+        summary = process_csv(self.config([{'type': 'aggregate', 'group_by': 'city',
+                                            'aggregations': {'amount': 'median'}}]))
+        self.assertEqual(summary['partitions'], 1)
+        self.assertEqual(self.read_output()[1], ['上海', '4999.0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
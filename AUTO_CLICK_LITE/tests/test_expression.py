@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""表达式语言测试"""
+import os
+import time
+import unittest
+from src.expression import Expression, ExpressionError, compile_expression
+from src.data_processing import process_json_data
+
+BENCHMARK = bool(os.environ.get('AUTO_CLICK_BENCHMARK'))
+
+
+class TestExpression(unittest.TestCase):
+    def test_scalar(self):
+        """测试算术、字符串、条件和其他字段"""
+        self.assertEqual(Expression('x * 2 + 1')(3), 7)
+        self.assertEqual(Expression('lambda v: v // 2')(7), 3)
+        self.assertEqual(Expression('upper(strip(x)) + "!"')(' ab '), 'AB!')
+        self.assertEqual(Expression('x.replace("-", "")')('a-b-c'), 'abc')
+        self.assertEqual(Expression('"big" if x > 10 else "small"')(11), 'big')
+        self.assertTrue(Expression('x in [1, 2] and not isnull(x)')(2))
+        self.assertEqual(Expression('round(value * price, 1)')(3, {'price': 1.25}), 3.8)
+        self.assertIs(compile_expression('x + 1'), compile_expression('x + 1'))
+
+    def test_rejects_unsafe(self):
+        """测试拒绝任意代码"""
+        for text in ('__import__("os").system("echo")', 'x.__class__', 'open("f")', 'x[0]', 'x.upper',
+                     '(lambda: 1)()', '[c for c in x]', '_get("x")', 'getattr(x, "upper")', 'x +'):
+            with self.assertRaises(ExpressionError, msg=text):
+                Expression(text)('abc')
+        with self.assertRaises(ExpressionError):
+            Expression('"a" * 10 ** 9')(0)
+        for text in ('2 ** 10 ** 10', '((9 ** 1024) ** 1024) ** 64', 'len(replace("a" * 10000, "", "a" * 10000))'):
+            with self.assertRaises(ExpressionError, msg=text):
+                Expression(text)(0)
+        import pandas as pd
+        df = pd.DataFrame({'name': ['ab', 'c']})
+        for text in ('x * 3000000', 'replace(x, "", "a" * 1000000)'):
+            with self.assertRaises(ExpressionError, msg=text):
+                Expression(text).evaluate_frame(df, 'name')
+
+    def test_vectorized_matches_scalar(self):
+        """测试按列执行与逐行执行结果相同"""
+        import pandas as pd
+        df = pd.DataFrame({'amount': [0, 5, 12, 30], 'price': [0.5, 1.5, 2.0, 4.0],
+                           'name': [' a ', '', 'c-d', 'Ee']})
+        cases = [('amount', 'x * price - 1'), ('amount', 'x if x > 10 else 0'), ('amount', 'min(x, 10) % 3'),
+                 ('amount', 'x in [5, 30] or price > 1.9'), ('name', 'lower(strip(x)) + "!"'),
+                 ('name', 'x.replace("-", "_")'), ('name', 'len(x)'), ('name', '"c" in x'),
+                 ('amount', 'x or 100'), ('amount', 'x and price'), ('name', 'x or "default"'),
+                 ('name', 'x and len(x)'), ('amount', 'x ** 70'), ('amount', 'round(x / 4)'),
+                 ('price', 'round(x * 3)'), ('name', 'x * 2')]
+        for column, text in cases:
+            expression = Expression(text)
+            expected = expression.evaluate_rows(df, column).tolist()
+            self.assertEqual(expression.evaluate_frame(df, column).tolist(), expected, text)
+
+    @unittest.skipUnless(BENCHMARK, "基准测试，设置AUTO_CLICK_BENCHMARK=1运行")
+    def test_vectorized_speed(self):
+        """测试按列执行明显快于逐行执行"""
+        import pandas as pd
+        df = pd.DataFrame({'amount': range(200000)})
+        expression = Expression('x * 2 if x % 3 == 0 else x + 1')
+        start = time.perf_counter()
+        vectorized = expression.evaluate_frame(df, 'amount')
+        vectorized_time = time.perf_counter() - start
+        start = time.perf_counter()
+        rows = expression.evaluate_rows(df, 'amount')
+        rows_time = time.perf_counter() - start
+        self.assertTrue(vectorized.equals(rows))
+        self.assertLess(vectorized_time * 10, rows_time)
+
+    def test_json_transform(self):
+        """测试JSON的transform使用表达式"""
+        data = [{'name': 'a', 'amount': 2, 'rate': 1.5}, {'name': 'b', 'amount': 4, 'rate': 0.5}]
+        result = process_json_data(data, [{'type': 'transform', 'field': 'amount', 'expression': 'x * rate'},
+                                          {'type': 'transform', 'field': 'name', 'function': 'lambda s: s.upper()'}])
+        self.assertEqual([(item['name'], item['amount']) for item in result], [('A', 3.0), ('B', 2.0)])
+        with self.assertRaises(ValueError):
+            process_json_data(data, [{'type': 'transform', 'field': 'amount', 'function': '__import__("os")'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""热键监听测试"""
+import time
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from src import hotkey
+from src.hotkey import HotkeyListener, parse_hotkey, key_name
+
+
+def char(c):
+    return SimpleNamespace(char=c, name=None)
+
+
+def special(name):
+    return SimpleNamespace(char=None, name=name)
+
+
+class FailingListener:
+    """模拟启动后立即异常退出的监听器"""
+
+    def __init__(self, fail, run=0.0):
+        self.fail = fail
+        self.run = run
+        self.stopped = threading.Event()
+
+    def start(self):
+        pass
+
+    def join(self, timeout=None):
+        if self.fail:
+            time.sleep(self.run)
+            raise RuntimeError("X连接断开")
+        self.stopped.wait(timeout)
+
+    def stop(self):
+        self.stopped.set()
+
+
+class TestHotkeyListener(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.calls = []
+        self.done = threading.Event()
+
+        def on_start():
+            # 回调阻塞也不影响按键处理
+            time.sleep(0.05)
+            self.calls.append('start')
+
+        def on_stop():
+            self.calls.append('stop')
+            self.done.set()
+
+        self.listener = HotkeyListener('ctrl+shift+F6', 'f7', 'Pause', on_start=on_start, on_stop=on_stop)
+
+    def tearDown(self):
+        self.listener.stop_listening()
+
+    def test_parse_and_normalize(self):
+        """测试热键解析和按键规范化"""
+        self.assertEqual(parse_hotkey('Control + Shift + F6'), (frozenset({'ctrl', 'shift'}), 'f6'))
+        self.assertEqual(parse_hotkey('cmd+a'), (frozenset({'win'}), 'a'))
+        self.assertEqual(key_name(special('ctrl_r')), 'ctrl')
+        self.assertEqual(key_name(char('\x01')), 'a')
+        self.assertEqual(key_name(char('\t')), 'tab')
+        self.assertEqual(key_name(char('\r')), 'enter')
+        with self.assertRaises(ValueError):
+            parse_hotkey('f6+f7')
+
+    def test_chord_dispatch_does_not_block(self):
+        """测试组合键命中后入队，按键回调立即返回并统计延迟"""
+        self.listener._create_listener = lambda: FailingListener(False)
+        self.listener.start_listening()
+        started = time.perf_counter()
+        self.listener._on_press(special('f6'))
+        self.listener._on_release(special('f6'))
+        self.listener._on_press(special('ctrl_l'))
+        self.listener._on_press(special('shift'))
+        self.listener._on_press(special('f6'))
+        # 自动重复不重复触发
+        self.listener._on_press(special('f6'))
+        self.listener._on_release(special('f6'))
+        self.listener._on_release(special('shift'))
+        self.listener._on_release(special('ctrl_l'))
+        self.listener._on_press(special('f7'))
+        self.assertLess(time.perf_counter() - started, 0.01)
+        self.assertTrue(self.done.wait(1.0))
+        self.assertEqual(self.calls, ['start', 'stop'])
+        stats = self.listener.stats()
+        self.assertEqual(stats['dispatched'], 2)
+        self.assertEqual(stats['press_to_action_ms']['count'], 2)
+        self.assertGreaterEqual(stats['press_to_action_ms']['max'], 40)
+
+    def test_restart_on_failure(self):
+        """测试监听器异常退出后自动重新创建"""
+        created = []
+
+        def create():
+            created.append(FailingListener(len(created) == 0))
+            return created[-1]
+
+        self.listener._create_listener = create
+        self.listener.start_listening()
+        deadline = time.perf_counter() + 1.0
+        while len(created) < 2 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(created), 2)
+        self.assertEqual(self.listener.restarts, 1)
+        self.listener.stop_listening()
+        self.assertTrue(created[-1].stopped.is_set())
+
+    def test_backoff_resets_after_stable_run(self):
+        """测试监听器稳定运行一段时间后退出，重新从最短的等待时间开始"""
+        created = []
+
+        def create():
+            # 前三个立即退出，第四个运行一段时间后退出，之后正常运行
+            count = len(created)
+            created.append(FailingListener(count < 4, run=0.1 if count == 3 else 0.0))
+            return created[-1]
+
+        self.listener._create_listener = create
+        with mock.patch.object(hotkey, 'RESTART_DELAYS', (0.01, 0.02, 0.03, 5.0)), \
+                mock.patch.object(hotkey, 'STABLE_RUN', 0.05):
+            self.listener.start_listening()
+            deadline = time.perf_counter() + 1.0
+            while len(created) < 5 and time.perf_counter() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(len(created), 5)
+        self.assertEqual(self.listener.restarts, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
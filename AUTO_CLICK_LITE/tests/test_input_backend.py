@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""输入后端测试"""
+import os
+import shutil
+import subprocess
+import time
+import unittest
+from src.input_backend import create_backend
+
+
+class TestCreateBackend(unittest.TestCase):
+    def test_unknown_backend(self):
+        """测试未知后端名称"""
+        with self.assertRaises(ValueError):
+            create_backend('unknown')
+
+
+@unittest.skipUnless(shutil.which('Xvfb'), "需要Xvfb")
+class TestXTestBackend(unittest.TestCase):
+    """在Xvfb虚拟显示上验证XTest后端"""
+    DISPLAY = ':97'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.xvfb = subprocess.Popen(['Xvfb', cls.DISPLAY, '-screen', '0', '1280x1024x24'],
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + 5
+        while not os.path.exists(f'/tmp/.X11-unix/X{cls.DISPLAY[1:]}') and time.time() < deadline:
+            time.sleep(0.05)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.xvfb.terminate()
+        cls.xvfb.wait()
+
+    def setUp(self):
+        """测试前设置"""
+        self.backend = create_backend('xtest', display=self.DISPLAY)
+
+    def tearDown(self):
+        self.backend.close()
+
+    def test_move_and_click(self):
+        """测试移动和点击"""
+        self.backend.move_to(123, 456)
+        self.backend.click('left')
+        self.assertEqual(self.backend.position(), (123, 456))
+
+    def test_batched_flush(self):
+        """测试批量注入在退出时刷新"""
+        with self.backend.batch():
+            for i in range(100):
+                self.backend.move_to(i, i)
+        self.assertEqual(self.backend.position(), (99, 99))
+
+    def test_keys(self):
+        """测试按键映射"""
+        self.backend.press('tab')
+        self.backend.hotkey('ctrl', 'a')
+        self.backend.write('Hello, World')
+        with self.assertRaises(ValueError):
+            self.backend.write('继续')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""宏录制与回放测试"""
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from src.macro import (MacroRecorder, encode, decode, save_macro, load_macro, move_event, click_event,
+                       key_event, events_to_positions, MOVE)
+from src.clicker import Clicker
+from src.input_backend import RecordingBackend
+
+
+class TestMacroFormat(unittest.TestCase):
+    def test_round_trip(self):
+        """测试编码后解码得到相同的事件"""
+        events = [
+            move_event(0.0, 100, 200),
+            move_event(0.016, 97, 205),
+            click_event(0.5, 97, 205, 'right'),
+            key_event(0.75, 'a'),
+            key_event(0.9, 'v', ('ctrl', 'shift')),
+            key_event(1.2, 'enter'),
+            click_event(70.0, 0, 0),
+        ]
+        self.assertEqual(decode(encode(events)), events)
+
+    def test_compact(self):
+        """测试连续小幅移动每个事件只占几个字节"""
+        events = [move_event(i * 0.01, 500 + i, 300 - i) for i in range(1000)]
+        self.assertLess(len(encode(events)), 5 * len(events))
+
+    def test_file_and_positions(self):
+        """测试保存、加载以及转换为多位置列表"""
+        events = [click_event(0.1, 10, 20), key_event(0.2, 'h'), key_event(0.3, 'i'),
+                  key_event(0.4, 'a', ('ctrl',)), click_event(0.5, 30, 40, 'right')]
+        path = os.path.join(tempfile.mkdtemp(), 'test.acm')
+        save_macro(path, events)
+        self.assertEqual(load_macro(path), events)
+        positions = events_to_positions(events)
+        self.assertEqual([(p['x'], p['y'], p['text'], p['button']) for p in positions],
+                         [(10, 20, 'hi', 'left'), (30, 40, '', 'right')])
+        with self.assertRaises(ValueError):
+            decode(b'junk')
+
+
+class TestMacroRecorder(unittest.TestCase):
+    def test_move_decimation(self):
+        """测试短时间内的小幅移动被抽稀"""
+        recorder = MacroRecorder(move_interval=10.0, move_distance=5)
+        recorder.recording = True
+        recorder._started_at = time.perf_counter()
+        for i in range(100):
+            recorder._on_move(100 + i % 2, 100)
+        recorder._on_move(120, 100)
+        moves = [event for event in recorder.events if event.kind == MOVE]
+        self.assertEqual([(event.x, event.y) for event in moves], [(100, 100), (120, 100)])
+
+    def test_key_names(self):
+        """测试pynput的按键名和控制字符转换为回放使用的按键名"""
+        def key(char=None, name=None):
+            return SimpleNamespace(char=char, name=name)
+        cases = [(key('\t'), 'tab'), (key('\n'), 'enter'), (key('\r'), 'enter'), (key('\x01'), 'a'),
+                 (key('x'), 'x'), (key(name='page_up'), 'pageup'), (key(name='page_down'), 'pagedown'),
+                 (key(name='caps_lock'), 'capslock'), (key(name='ctrl_r'), 'ctrl'), (key(name='cmd'), 'win'),
+                 (key(name='f5'), 'f5')]
+        for pressed, expected in cases:
+            self.assertEqual(MacroRecorder._key_name(pressed), expected, pressed)
+
+    def test_hotkeys_not_recorded(self):
+        """测试启动/停止热键按与热键模块相同的规则匹配，不录入宏"""
+        def key(char=None, name=None):
+            return SimpleNamespace(char=char, name=name)
+        recorder = MacroRecorder(ignore_keys=['F6', 'Page_Up', 'Return'])
+        recorder.recording = True
+        recorder._started_at = time.perf_counter()
+        for pressed in (key(name='f6'), key(name='page_up'), key('\r'), key('X'), key(name='page_down')):
+            recorder._on_press(pressed)
+        self.assertEqual([event.key for event in recorder.events], ['x', 'pagedown'])
+
+
+class TestMacroPlayback(unittest.TestCase):
+    def _events(self):
+        return [click_event(0.05 * i, i, i) for i in range(1, 11)]
+
+    def test_replay_timing(self):
+        """测试1倍和4倍速度回放的点击时间与录制时间一致"""
+        for speed in (1.0, 4.0):
+            backend = RecordingBackend()
+            clicker = Clicker(backend=backend)
+            started = time.perf_counter()
+            stats = clicker.play_macro(self._events(), speed=speed, loops=2)
+            times = backend.click_times()
+            self.assertEqual(len(times), 20)
+            self.assertEqual(stats['loops'], 2)
+            # 第二轮紧接第一轮开始，整体不漂移
+            for i, t in enumerate(times):
+                expected = started + (0.05 * (i % 10 + 1) + (i // 10) * 0.5) / speed
+                self.assertAlmostEqual(t, expected, delta=0.01)
+
+    def test_stop_during_replay(self):
+        """测试回放中停止立即返回"""
+        backend = RecordingBackend()
+        clicker = Clicker(backend=backend)
+        threading.Timer(0.12, clicker.stop_clicking).start()
+        started = time.perf_counter()
+        stats = clicker.play_macro(self._events(), loops=-1)
+        self.assertLess(time.perf_counter() - started, 0.2)
+        self.assertEqual(stats['events'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
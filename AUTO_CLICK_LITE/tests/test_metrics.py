@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""统计模块测试"""
+import json
+import unittest
+from src.metrics import Histogram, ClickMetrics
+from src.clicker import Clicker
+from src.input_backend import RecordingBackend
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_buckets(self):
+        """测试直方图分桶和分位数估算"""
+        histogram = Histogram((1, 10, 100))
+        for value in (0.5, 5, 5, 5, 50, 500):
+            histogram.add(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(list(snapshot['buckets'].values()), [1, 3, 1, 1])
+        self.assertEqual(snapshot['p50'], 10)
+        self.assertEqual(snapshot['p99'], 500)
+
+    def test_click_metrics_json(self):
+        """测试点击统计导出JSON"""
+        metrics = ClickMetrics()
+        metrics.record_click(1.0, 0.0001)
+        metrics.record_click(1.02, 0.0001)
+        metrics.record_error(RuntimeError('boom'))
+        data = json.loads(metrics.to_json({'backend': 'recording'}))
+        self.assertEqual(data['clicks'], 2)
+        self.assertEqual(data['errors'], 1)
+        self.assertEqual(data['interval_ms']['count'], 1)
+        self.assertEqual(data['backend'], 'recording')
+
+    def test_clicker_metrics(self):
+        """测试点击器记录间隔和后端耗时"""
+        clicker = Clicker(interval=5, count=20, randomize=False, backend=RecordingBackend())
+        clicker.start_clicking()
+        metrics = clicker.get_metrics()
+        self.assertEqual(metrics['clicks'], 20)
+        self.assertEqual(metrics['interval_ms']['count'], 19)
+        self.assertIn(metrics['interval_ms']['p50'], (5, 10))
+        self.assertEqual(metrics['errors'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""点击编排器测试"""
+import time
+import threading
+import unittest
+from src.orchestrator import ClickOrchestrator, ClickProfile
+from src.input_backend import RecordingBackend
+
+
+class TestClickOrchestrator(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.backend = RecordingBackend()
+        self.orchestrator = ClickOrchestrator(backend=self.backend)
+
+    def tearDown(self):
+        self.orchestrator.stop()
+
+    def test_many_profiles_one_thread(self):
+        """测试20个配置只占用一个计时线程，且各自按间隔完成"""
+        threads = threading.active_count()
+        self.orchestrator.start()
+        for i in range(20):
+            self.orchestrator.add_profile(ClickProfile(f'p{i}', interval=10 + i, count=10, randomize=False,
+                                                       position_type='fixed', fixed_position={'x': i, 'y': i}))
+        self.assertEqual(threading.active_count(), threads + 1)
+        for i in range(20):
+            self.assertTrue(self.orchestrator.wait_profile(f'p{i}', timeout=2.0))
+        clicks = self.backend.of_kind('click')
+        self.assertEqual(len(clicks), 200)
+        for i in range(20):
+            times = [event[0] for event in clicks if event[2][1] == i]
+            self.assertEqual(len(times), 10)
+            # 9个间隔的总时长接近设置值
+            self.assertAlmostEqual(times[-1] - times[0], 9 * (10 + i) / 1000.0, delta=0.02)
+
+    def test_idle_does_not_wake(self):
+        """测试没有配置或配置暂停时线程不被唤醒"""
+        self.orchestrator.start()
+        self.orchestrator.add_profile('p', {'interval': 10, 'count': -1})
+        time.sleep(0.05)
+        self.orchestrator.pause_profile('p')
+        time.sleep(0.02)
+        wakeups = self.orchestrator.wakeups
+        time.sleep(0.2)
+        self.assertLessEqual(self.orchestrator.wakeups - wakeups, 1)
+        clicks = len(self.backend.of_kind('click'))
+        self.orchestrator.resume_profile('p')
+        time.sleep(0.05)
+        self.assertGreater(len(self.backend.of_kind('click')), clicks)
+        self.assertTrue(self.orchestrator.remove_profile('p'))
+        self.assertEqual(self.orchestrator.get_status()['profiles'], [])
+
+    def test_text_positions(self):
+        """测试文本位置作为独立步骤输入"""
+        positions = [
+            {'x': 1, 'y': 2, 'note': '文本', 'enabled': True, 'text': '继续', 'text_interval': 0, 'focus_delay': 5},
+        ]
+        self.orchestrator.start()
+        self.orchestrator.add_profile('text', {'interval': 5, 'count': 2, 'multi_position': True,
+                                               'positions': positions})
+        self.assertTrue(self.orchestrator.wait_profile('text', timeout=1.0))
+        kinds = [event[1] for event in self.backend.events]
+        self.assertEqual(kinds, ['move', 'click', 'hotkey', 'clipboard', 'hotkey',
+                                 'move', 'click', 'hotkey', 'clipboard', 'hotkey'])
+
+    def test_failed_text_entry_advances(self):
+        """测试文本输入出错时跳到下一个位置，不反复重试"""
+        class FailingBackend(RecordingBackend):
+            def hotkey(self, *keys):
+                raise RuntimeError('hotkey failed')
+
+        self.orchestrator = ClickOrchestrator(backend=FailingBackend())
+        positions = [
+            {'x': 1, 'y': 1, 'enabled': True, 'text': '文本', 'focus_mode': 'click_select_all', 'focus_delay': 1},
+            {'x': 2, 'y': 2, 'enabled': True},
+        ]
+        self.orchestrator.start()
+        profile = self.orchestrator.add_profile('text', {'interval': 5, 'count': 4, 'randomize': False,
+                                                         'multi_position': True, 'positions': positions})
+        self.assertTrue(self.orchestrator.wait_profile('text', timeout=1.0))
+        xs = [event[2][0] for event in self.orchestrator.backend.of_kind('move')]
+        self.assertEqual(xs, [1, 2, 1, 2])
+        self.assertEqual(profile.metrics.errors, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""位置列表模型、窗口化显示和CSV导入导出测试"""
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from src.position_list import PositionListModel, PositionListView, read_positions_csv, write_positions_csv
+
+
+class FakeTree:
+    """记录调用次数的Treeview替身"""
+
+    def __init__(self):
+        self.rows = {}
+        self.order = []
+        self.selected = ()
+        self.writes = 0
+        self._ids = 0
+
+    def insert(self, parent, index, values=()):
+        self._ids += 1
+        iid = f'I{self._ids}'
+        self.rows[iid] = values
+        self.order.append(iid)
+        self.writes += 1
+        return iid
+
+    def item(self, iid, values):
+        self.rows[iid] = values
+        self.writes += 1
+
+    def delete(self, *iids):
+        for iid in iids:
+            del self.rows[iid]
+            self.order.remove(iid)
+
+    def selection(self):
+        return self.selected
+
+    def selection_set(self, iid):
+        self.selected = (iid,)
+
+    def selection_remove(self, *iids):
+        self.selected = ()
+
+    def values(self):
+        return [self.rows[iid] for iid in self.order]
+
+
+class FakeScrollbar:
+    def set(self, first, last):
+        self.range = (first, last)
+
+
+def make_positions(count):
+    return [{'x': i, 'y': i * 2, 'note': f'位置{i + 1}', 'enabled': True, 'text': '', 'text_interval': 0}
+            for i in range(count)]
+
+
+class TestPositionListView(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.tree = FakeTree()
+        self.scrollbar = FakeScrollbar()
+        self.model = PositionListModel(make_positions(10000))
+        started = time.perf_counter()
+        self.view = PositionListView(self.tree, self.model, self.scrollbar, rows=10)
+        self.load_time = time.perf_counter() - started
+
+    def test_only_visible_rows_rendered(self):
+        """测试1万个位置只渲染可见行"""
+        self.assertEqual(len(self.tree.order), 10)
+        self.assertLess(self.load_time, 0.05)
+        self.assertEqual(self.tree.values()[0][:4], (1, '位置1', 0, 0))
+        self.view.yview('moveto', 0.5)
+        self.assertEqual(self.view.offset, 5000)
+        self.assertEqual(self.tree.values()[0][0], 5001)
+        self.assertEqual(self.scrollbar.range, (0.5, 0.501))
+        self.view.yview('scroll', 1, 'pages')
+        self.assertEqual(self.tree.values()[0][0], 5011)
+        self.view.yview('moveto', 1.0)
+        self.assertEqual(self.tree.values()[-1][0], 10000)
+        self.assertEqual(len(self.tree.order), 10)
+
+    def test_incremental_changes(self):
+        """测试插入、修改和删除只改写受影响的可见行"""
+        self.tree.writes = 0
+        # 窗口之后的插入不改写任何行
+        self.model.extend(make_positions(5000))
+        self.assertEqual(self.tree.writes, 0)
+        self.assertEqual(len(self.model), 15000)
+        # 修改窗口外的行不改写，窗口内只改写一行
+        self.model[20]['note'] = '已修改'
+        self.model.update(20)
+        self.model[3]['note'] = '已修改'
+        self.model.update(3)
+        self.assertEqual(self.tree.writes, 1)
+        self.assertEqual(self.tree.values()[3][1], '已修改')
+        # 删除窗口内的行，只改写其后的行
+        self.tree.writes = 0
+        self.model.delete(7)
+        self.assertEqual(self.tree.writes, 3)
+        self.assertEqual(self.tree.values()[7][1], '位置9')
+        self.assertEqual([row[0] for row in self.tree.values()], list(range(1, 11)))
+
+    def test_selection_follows_scroll_and_changes(self):
+        """测试选中项在滚动、插入和删除后保持指向同一位置"""
+        self.tree.selection_set(self.tree.order[2])
+        self.assertEqual(self.view.on_select(), 2)
+        self.view.scroll_to(100)
+        self.assertEqual(self.tree.selection(), ())
+        self.view.scroll_to(0)
+        self.assertEqual(self.tree.selection(), (self.tree.order[2],))
+        self.model.insert(0, {'x': -1, 'y': -1})
+        self.assertEqual(self.view.selected, 3)
+        self.model.delete(3)
+        self.assertIsNone(self.view.selected)
+        self.view.select(9999)
+        self.assertEqual(self.view.offset, 9990)
+        self.assertEqual(self.tree.values()[-1][0], 10000)
+
+    def test_shrink_and_reset(self):
+        """测试列表变短和整体替换"""
+        self.view.scroll_to(9990)
+        self.model.delete(5, 9993)
+        self.assertEqual(len(self.model), 7)
+        self.assertEqual(len(self.tree.order), 7)
+        self.assertEqual(self.view.offset, 0)
+        self.model.reset(make_positions(3))
+        self.assertEqual([row[0] for row in self.tree.values()], [1, 2, 3])
+        self.assertEqual(self.scrollbar.range, (0.0, 1.0))
+
+
+class TestPositionsCSV(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'positions.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_round_trip(self):
+        """测试导出后导入得到相同的位置"""
+        positions = make_positions(10000)
+        positions[0].update(enabled=False, text='你好, "世界"', template='a.png', region=[0, 0, 10, 10],
+                            threshold=0.9, trigger={'mode': 'change', 'region': [1, 2, 3, 4]})
+        started = time.perf_counter()
+        write_positions_csv(self.path, positions)
+        loaded = read_positions_csv(self.path)
+        self.assertLess(time.perf_counter() - started, 2.0)
+        self.assertEqual(len(loaded), 10000)
+        self.assertEqual(loaded[0]['text'], '你好, "世界"')
+        self.assertFalse(loaded[0]['enabled'])
+        self.assertEqual(loaded[0]['region'], [0, 0, 10, 10])
+        self.assertEqual(loaded[0]['trigger'], {'mode': 'change', 'region': [1, 2, 3, 4]})
+        self.assertEqual(loaded[0]['threshold'], 0.9)
+        self.assertEqual(loaded[9999], positions[9999])
+
+    def test_minimal_and_invalid(self):
+        """测试只有坐标列时补全缺省字段，非法数值报告行号"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("x,y\n10,20\n30,40\n")
+        loaded = read_positions_csv(self.path)
+        self.assertEqual(loaded[1], {'x': 30, 'y': 40, 'note': '', 'enabled': True, 'text': '', 'text_interval': 1000})
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("x,y\n10,20\nabc,40\n")
+        with self.assertRaisesRegex(ValueError, "第3行"):
+            read_positions_csv(self.path)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("note\n备注\n")
+        with self.assertRaises(ValueError):
+            read_positions_csv(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
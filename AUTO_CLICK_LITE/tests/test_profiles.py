@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""命名点击配置测试"""
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from src.config import Config
+from src.profiles import ProfileStore
+from src.clicker import Clicker
+from src.input_backend import RecordingBackend
+
+
+def fixed(x, y, interval=100):
+    return {'interval': interval, 'randomize': False, 'position_type': 'fixed',
+            'fixed_position': {'x': x, 'y': y}, 'multi_position': False}
+
+
+class TestProfileStore(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.dir = tempfile.mkdtemp()
+        self.config = Config(os.path.join(self.dir, 'config.json'), debounce=0.01)
+        self.store = ProfileStore(self.config)
+
+    def tearDown(self):
+        self.config.close()
+        shutil.rmtree(self.dir)
+
+    def test_lazy_merge_and_plan_cache(self):
+        """测试配置首次使用时与默认设置合并，计划编译后缓存"""
+        positions = [{'x': i, 'y': i, 'note': '', 'enabled': True, 'text': '', 'text_interval': 0} for i in range(5)]
+        self.store.save('批量', {'multi_position': True, 'positions': positions, 'interval': 'fast'})
+        # 从完整设置保存的配置不依赖默认设置
+        full = dict(self.config.load_config()['default_settings'], button='right', count=10, **fixed(1, 2))
+        self.store.save('单点', full, hotkey='ctrl+1')
+        self.assertEqual(self.store.names(), ['单点', '批量'])
+        self.assertEqual(self.store.hotkeys(), {'单点': 'ctrl+1'})
+        batch = self.store.get('批量')
+        # 非法的间隔回退到默认设置
+        self.assertEqual(batch.settings['interval'], 100)
+        self.assertEqual(batch.settings['button'], 'left')
+        plan = batch.plan
+        self.assertEqual(len(plan), 5)
+        self.assertIs(self.store.get('批量').plan, plan)
+        single = self.store.get('单点')
+        single_plan = single.plan
+        # 修改默认设置只使依赖默认值的配置失效
+        settings = self.config.load_config()
+        settings['default_settings']['button'] = 'middle'
+        self.config.save_config(settings)
+        self.assertEqual(self.store.get('批量').settings['button'], 'middle')
+        self.assertIs(self.store.get('单点').plan, single_plan)
+        self.assertTrue(self.store.delete('单点'))
+        with self.assertRaises(KeyError):
+            self.store.get('单点')
+
+
+class TestProfileSwitch(unittest.TestCase):
+    def test_switch_running_clicker(self):
+        """测试运行中切换配置在下一次点击前生效，且不重启点击线程"""
+        backend = RecordingBackend()
+        clicker = Clicker(backend=backend, **fixed(10, 10, interval=1000))
+        thread = threading.Thread(target=clicker.start_clicking)
+        thread.start()
+        time.sleep(0.05)
+        switched_at = time.perf_counter()
+        clicker.switch_profile(dict(fixed(20, 30, interval=10), count=5))
+        thread.join(1.0)
+        self.assertFalse(thread.is_alive())
+        clicks = backend.of_kind('click')
+        self.assertEqual([event[2][1:] for event in clicks], [(10, 10)] + [(20, 30)] * 5)
+        # 不等待原来1秒的间隔
+        self.assertLess(clicks[1][0] - switched_at, 0.05)
+
+    def test_switch_idle_clicker(self):
+        """测试未运行时立即应用"""
+        clicker = Clicker(backend=RecordingBackend(), **fixed(0, 0))
+        clicker.switch_profile(fixed(5, 6, interval=40))
+        self.assertEqual(clicker.fixed_position, {'x': 5, 'y': 6})
+        self.assertAlmostEqual(clicker.timer.mean_interval, 0.04)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""模板定位测试"""
+import unittest
+import numpy as np
+from src.screen import ArrayCapture, TemplateLocator, downscale, clip_rect
+from src.clicker import Clicker
+from src.input_backend import RecordingBackend
+
+
+def make_screen(seed=0):
+    """生成带色块和噪声的合成屏幕"""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, (150, 200)).astype(np.float32)
+    return np.kron(blocks, np.ones((4, 4), dtype=np.float32)) + rng.normal(0, 3, (600, 800)).astype(np.float32)
+
+
+class TestTemplateLocator(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.image = make_screen()
+        self.template = self.image[203:243, 401:461].copy()
+        self.capture = ArrayCapture(self.image)
+        self.locator = TemplateLocator(self.capture)
+        self.locator.add_template('button', self.template)
+
+    def test_locate_and_cache(self):
+        """测试粗精两级匹配找到模板中心，第二次只截取命中位置附近"""
+        self.assertEqual(self.locator.locate('button'), (431, 223))
+        pixels = self.capture.pixels
+        self.assertEqual(self.locator.locate('button'), (431, 223))
+        self.assertLess(self.capture.pixels - pixels, 70 * 50)
+        stats = self.locator.stats()
+        self.assertEqual((stats['lookups'], stats['hits'], stats['cache_hits']), (2, 2, 1))
+
+    def test_region_and_miss(self):
+        """测试只在配置区域内搜索，区域外的目标找不到"""
+        self.assertEqual(self.locator.locate('button', region=(350, 150, 200, 150)), (431, 223))
+        self.assertIsNone(self.locator.locate('button', region=(0, 0, 300, 150)))
+        self.assertEqual(self.locator.stats()['hit_rate'], 0.5)
+
+    def test_moved_target(self):
+        """测试目标移动后缓存失效并重新搜索"""
+        self.locator.locate('button')
+        moved = make_screen(1)
+        moved[100:140, 600:660] = self.template
+        self.capture.image = moved
+        self.assertEqual(self.locator.locate('button'), (630, 120))
+
+    def test_helpers(self):
+        """测试缩小和矩形裁剪"""
+        image = np.arange(16, dtype=np.float32).reshape(4, 4)
+        np.testing.assert_allclose(downscale(image, 2), [[2.5, 4.5], [10.5, 12.5]])
+        self.assertEqual(clip_rect(-5, 10, 20, 100, (800, 60)), (0, 10, 15, 50))
+
+
+class TestTemplateClicks(unittest.TestCase):
+    def test_clicker_uses_located_position(self):
+        """测试模板位置点击匹配到的中心，找不到时跳过点击"""
+        image = make_screen()
+        capture = ArrayCapture(image)
+        positions = [
+            {'x': 0, 'y': 0, 'note': '模板', 'enabled': True, 'text': '', 'text_interval': 0,
+             'template': 'button', 'region': [300, 100, 300, 250]},
+            {'x': 0, 'y': 0, 'note': '缺失', 'enabled': True, 'text': '', 'text_interval': 0,
+             'template': 'missing', 'region': [0, 0, 200, 100], 'threshold': 0.9},
+        ]
+        backend = RecordingBackend()
+        clicker = Clicker(interval=1, count=3, randomize=False, multi_position=True, positions=positions,
+                          backend=backend, capture=capture)
+        clicker.locator.add_template('button', image[203:243, 401:461])
+        clicker.locator.add_template('missing', make_screen(2)[:40, :60])
+        clicker.start_clicking()
+        self.assertEqual([event[2][1:] for event in backend.of_kind('click')], [(431, 223)] * 3)
+        self.assertEqual(clicker.get_metrics()['locate']['hits'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""启动分析和延迟导入测试"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+from src.startup import StartupProfiler
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+class TestStartupProfiler(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.dir = tempfile.mkdtemp()
+        with open(os.path.join(self.dir, 'startup_child.py'), 'w') as f:
+            f.write("import time\ntime.sleep(0.02)\n")
+        with open(os.path.join(self.dir, 'startup_parent.py'), 'w') as f:
+            f.write("import time\nimport startup_child\ntime.sleep(0.01)\n")
+        sys.path.insert(0, self.dir)
+
+    def tearDown(self):
+        sys.path.remove(self.dir)
+        for name in ('startup_child', 'startup_parent'):
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.dir)
+
+    def test_phases_and_imports(self):
+        """测试阶段耗时和导入的总耗时、自身耗时"""
+        profiler = StartupProfiler.from_argv(['main.py', '--profile-startup'])
+        try:
+            with profiler.phase("导入"):
+                import startup_parent  # noqa: F401
+        finally:
+            profiler.uninstall()
+        profiler.mark("窗口显示")
+        self.assertEqual([phase[0] for phase in profiler.phases], ["导入", "窗口显示"])
+        self.assertGreaterEqual(profiler.phases[0][2], 0.03)
+        parent_total, parent_own = profiler.imports['startup_parent']
+        child_total, _ = profiler.imports['startup_child']
+        self.assertGreaterEqual(child_total, 0.02)
+        self.assertGreaterEqual(parent_total, parent_own + child_total - 0.001)
+        self.assertLess(parent_own, child_total)
+        self.assertIn('startup_child', profiler.report())
+
+    def test_disabled(self):
+        """测试未启用时不记录"""
+        profiler = StartupProfiler.from_argv(['main.py'])
+        with profiler.phase("导入"):
+            import startup_parent  # noqa: F401
+        profiler.mark("窗口显示")
+        self.assertEqual(profiler.phases, [])
+        self.assertEqual(profiler.imports, {})
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_heavy_modules_not_imported(self):
+        """测试导入主程序和任务模块时不加载输入、截图、浏览器和数据处理库"""
+        code = ("import sys\n"
+                "import main, task_scheduler, web_automation\n"
+                "heavy = ('pyautogui', 'pynput', 'numpy', 'Xlib', 'selenium', 'schedule', 'pandas', 'requests')\n"
+                "print(','.join(name for name in heavy if name in sys.modules))\n")
+        try:
+            import tkinter  # noqa: F401
+        except ImportError:
+            self.skipTest("tkinter不可用")
+        output = subprocess.run([sys.executable, '-c', code], cwd=SRC, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
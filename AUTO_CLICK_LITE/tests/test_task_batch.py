@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""批量任务提交和结果流测试"""
+import time
+import threading
+import unittest
+from src.task_scheduler import TaskScheduler
+
+
+class GatedScheduler(TaskScheduler):
+    """任务按配置中的gate事件放行的调度器"""
+
+    def _execute_single_task(self, task):
+        task['gate'].wait(2.0)
+        return super()._execute_single_task(task)
+
+
+def make_tasks(count):
+    return [{'type': 'unknown', 'gate': threading.Event()} for _ in range(count)]
+
+
+class TestBatchTasks(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.scheduler = GatedScheduler(max_workers=4)
+
+    def tearDown(self):
+        self.scheduler.stop_scheduler()
+
+    def test_returns_immediately_and_streams(self):
+        """测试提交立即返回，结果按完成顺序逐个返回"""
+        tasks = make_tasks(4)
+        seen = []
+        started = time.perf_counter()
+        handle = self.scheduler.add_batch_task(tasks, on_result=lambda index, result: seen.append(index))
+        self.assertLess(time.perf_counter() - started, 0.1)
+        self.assertEqual(handle.progress()['pending'], 4)
+        self.assertEqual(self.scheduler.get_task_status(handle.batch_id)['status'], 'running')
+
+        results = handle.results(timeout=2.0)
+        for index in (2, 0, 3, 1):
+            tasks[index]['gate'].set()
+            got, result = next(results)
+            self.assertEqual(got, index)
+            self.assertEqual(result['task_id'], f'{handle.batch_id}_{index}')
+        self.assertEqual(list(results), [])
+        self.assertEqual(seen, [2, 0, 3, 1])
+        status = self.scheduler.get_task_status(handle.batch_id)
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['finished'], 4)
+        self.assertEqual([result['task_id'] for result in status['results']], handle.task_ids)
+
+    def test_unique_ids(self):
+        """测试同一秒内的批量ID不重复"""
+        handles = [self.scheduler.add_batch_task([]) for _ in range(3)]
+        self.assertEqual(len({handle.batch_id for handle in handles}), 3)
+        self.assertTrue(all(handle.done() for handle in handles))
+
+    def test_serial_cancel(self):
+        """测试串行批次取消后剩余任务不再执行"""
+        tasks = make_tasks(5)
+        handle = self.scheduler.add_batch_task(tasks, parallel=False)
+        tasks[0]['gate'].set()
+        results = handle.results(timeout=2.0)
+        self.assertEqual(next(results)[0], 0)
+        # 第二个任务正在执行，其余三个未提交
+        self.assertTrue(self.scheduler.cancel_task(handle.batch_id))
+        tasks[1]['gate'].set()
+        self.assertTrue(handle.wait(2.0))
+        progress = handle.progress()
+        self.assertEqual((progress['completed'], progress['cancelled']), (2, 3))
+        self.assertEqual(self.scheduler.get_task_status(handle.batch_id)['status'], 'cancelled')
+        self.assertEqual(handle.ordered_results()[4]['status'], 'cancelled')
+        self.assertIsNone(self.scheduler.store.get(handle.task_ids[4]))
+
+    def test_parallel_cancel_queued(self):
+        """测试并行批次取消排队中的任务"""
+        tasks = make_tasks(10)
+        handle = self.scheduler.add_batch_task(tasks)
+        # 4个线程各执行一个任务，其余6个在队列中
+        self.assertEqual(handle.cancel(), 6)
+        for task in tasks:
+            task['gate'].set()
+        self.assertTrue(handle.wait(2.0))
+        progress = handle.progress()
+        self.assertEqual((progress['completed'], progress['cancelled']), (4, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
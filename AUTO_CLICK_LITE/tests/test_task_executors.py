@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""任务按类型分配执行器的测试"""
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from src.task_scheduler import TaskScheduler
+from src.orchestrator import ClickOrchestrator
+from src.input_backend import RecordingBackend
+
+
+class TestTaskExecutors(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.dir = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.dir, 'input.json')
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            json.dump([{'name': str(i), 'value': i} for i in range(100)], f)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def data_task(self, name):
+        return {'type': 'data_processing', 'callback': lambda: None,
+                'data_config': {'action': 'json_processing', 'input_file': self.input_file,
+                                'output_file': os.path.join(self.dir, f'{name}.json'),
+                                'operations': [{'type': 'filter', 'condition': {'field': 'value',
+                                                                                'operator': 'less_than',
+                                                                                'value': 10}}]}}
+
+    def wait_for(self, scheduler, task_id):
+        deadline = time.monotonic() + 10.0
+        status = scheduler.get_task_status(task_id)
+        while status['status'] in ('running', 'not_found') and time.monotonic() < deadline:
+            time.sleep(0.01)
+            status = scheduler.get_task_status(task_id)
+        return status
+
+    def test_routing(self):
+        """测试数据处理任务在进程池中执行，其他任务在线程池中执行"""
+        scheduler = TaskScheduler(max_workers=2, process_workers=2)
+        try:
+            other = scheduler.submit_task({'type': 'unknown'})
+            self.assertEqual(self.wait_for(scheduler, other)['status'], 'completed')
+            self.assertIsNone(scheduler._process_pool)
+
+            # 任务配置中不能序列化的回调不传给子进程
+            task_ids = [scheduler.submit_task(self.data_task(f'out{i}')) for i in range(4)]
+            handle = scheduler.add_batch_task([self.data_task('batch')])
+            for task_id in task_ids:
+                status = self.wait_for(scheduler, task_id)
+                self.assertEqual(status['status'], 'completed')
+                self.assertEqual(status['result'], [{'status': 'success', 'items_processed': 10}])
+            self.assertTrue(handle.wait(10.0))
+            self.assertIsNotNone(scheduler._process_pool)
+            with open(os.path.join(self.dir, 'out3.json'), 'r', encoding='utf-8') as f:
+                self.assertEqual(len(json.load(f)), 10)
+        finally:
+            scheduler.stop_scheduler()
+
+    def test_scheduled_and_errors(self):
+        """测试定时的数据处理任务统计启动延迟，子进程中的错误保存为任务错误"""
+        scheduler = TaskScheduler(process_workers=1)
+        scheduler.start_scheduler()
+        try:
+            task = self.data_task('scheduled')
+            task.update(schedule_type='once', at=time.time() + 0.05)
+            task_id = scheduler.add_scheduled_task(task)
+            self.assertEqual(self.wait_for(scheduler, task_id)['status'], 'completed')
+            self.assertEqual(scheduler.get_scheduler_stats()['start_lag_ms']['count'], 1)
+
+            broken = self.data_task('broken')
+            broken['data_config']['input_file'] = os.path.join(self.dir, 'missing.json')
+            status = self.wait_for(scheduler, scheduler.submit_task(broken))
+            self.assertEqual(status['status'], 'error')
+            self.assertIn('missing.json', status['error'])
+        finally:
+            scheduler.stop_scheduler()
+
+    def test_threads_only(self):
+        """测试负数的进程池大小时在线程中处理数据"""
+        scheduler = TaskScheduler(process_workers=-1)
+        try:
+            status = self.wait_for(scheduler, scheduler.submit_task(self.data_task('thread')))
+            self.assertEqual(status['result'], [{'status': 'success', 'items_processed': 10}])
+            self.assertIsNone(scheduler._process_pool)
+        finally:
+            scheduler.stop_scheduler()
+
+    def test_stop_during_click_task(self):
+        """测试点击任务执行中停止调度器不会阻塞"""
+        scheduler = TaskScheduler(max_workers=2)
+        backend = RecordingBackend()
+        scheduler.click_orchestrator = ClickOrchestrator(backend=backend)
+        scheduler.click_orchestrator.start()
+        task_id = scheduler.submit_task({'type': 'click_automation',
+                                         'clicker_config': {'interval': 10, 'count': 100000}})
+        deadline = time.monotonic() + 2.0
+        while not backend.of_kind('click') and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stopper = threading.Thread(target=scheduler.stop_scheduler)
+        stopper.start()
+        stopper.join(5.0)
+        self.assertFalse(stopper.is_alive())
+        self.assertEqual(scheduler.get_task_status(task_id)['result']['status'], 'cancelled')
+
+    def test_click_tasks_do_not_hold_workers(self):
+        """测试点击任务不占用线程池，完成时由编排器回调保存结果"""
+        scheduler = TaskScheduler(max_workers=1)
+        backend = RecordingBackend()
+        scheduler.click_orchestrator = ClickOrchestrator(backend=backend)
+        scheduler.click_orchestrator.start()
+        try:
+            long_ids = [scheduler.submit_task({'type': 'click_automation',
+                                               'clicker_config': {'interval': 10, 'count': 100000}})
+                        for _ in range(2)]
+            # 唯一的工作线程仍可执行其他任务
+            self.assertEqual(self.wait_for(scheduler, scheduler.submit_task({'type': 'unknown'}))['status'],
+                             'completed')
+            short = scheduler.submit_task({'type': 'click_automation',
+                                           'clicker_config': {'interval': 1, 'count': 3, 'randomize': False}})
+            status = self.wait_for(scheduler, short)
+            self.assertEqual(status['result'], {'status': 'completed', 'type': 'click_automation', 'clicks': 3})
+            # 取消任务时移除点击配置
+            self.assertTrue(scheduler.cancel_task(long_ids[0]))
+            self.assertEqual(len(scheduler.click_orchestrator.profiles), 1)
+        finally:
+            scheduler.stop_scheduler()
+        self.assertEqual(scheduler.get_task_status(long_ids[1])['result']['status'], 'cancelled')
+
+    def test_one_orchestrator(self):
+        """测试多个线程同时首次使用时只创建一个编排器"""
+        scheduler = TaskScheduler()
+        barrier = threading.Barrier(4)
+        created = []
+
+        def get():
+            barrier.wait()
+            created.append(scheduler._get_click_orchestrator())
+
+        threads = [threading.Thread(target=get) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(2.0)
+        try:
+            self.assertEqual(len(created), 4)
+            self.assertTrue(all(orchestrator is created[0] for orchestrator in created))
+        finally:
+            scheduler.stop_scheduler()
+
+
+if __name__ == '__main__':
+    unittest.main()
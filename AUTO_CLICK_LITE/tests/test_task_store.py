@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""任务结果存储测试"""
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from src.task_store import TaskStore
+from src.task_scheduler import TaskScheduler
+
+
+class TestTaskStore(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'tasks.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_bounded_cache_and_batched_writes(self):
+        """测试内存只保留最近的结果，写入合并为少量事务"""
+        store = TaskStore(self.path, cache_size=10)
+        for i in range(1000):
+            store.put(f'task_{i}', {'task_id': f'task_{i}', 'status': 'completed', 'result': i})
+        self.assertLessEqual(store.stats()['cached'], 10)
+        # 已淘汰但可能未提交的结果仍可读到
+        self.assertEqual(store.get('task_0')['result'], 0)
+        self.assertTrue(store.flush())
+        self.assertEqual(store.stats()['rows_written'], 1000)
+        self.assertLess(store.commits, 20)
+        self.assertEqual(store.get('task_500')['result'], 500)
+        self.assertIsNone(store.get('task_missing'))
+        store.close()
+
+    def test_failed_write_is_retried(self):
+        """测试写入失败的结果保留在队列中，数据库恢复后写入"""
+        store = TaskStore(self.path, cache_size=0, flush_interval=0.01)
+        with store._db_lock:
+            store._conn.execute('ALTER TABLE results RENAME TO results_offline')
+        store.put('task_0', {'task_id': 'task_0', 'status': 'completed', 'result': 0})
+        self.assertFalse(store.flush(timeout=0.3))
+        self.assertEqual(store.get('task_0')['result'], 0)
+        with store._db_lock:
+            store._conn.execute('ALTER TABLE results_offline RENAME TO results')
+        self.assertTrue(store.flush())
+        store.close()
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        store = TaskStore(self.path)
+        self.assertEqual(store.get('task_0')['result'], 0)
+        store.close()
+
+    def test_persistence(self):
+        """测试重启后结果和任务编号保留"""
+        store = TaskStore(self.path)
+        task_id = store.next_task_id()
+        store.add_task({'id': task_id, 'type': 'api_requests', 'callback': print})
+        store.put(task_id, {'task_id': task_id, 'status': 'error', 'error': '超时'})
+        store.close()
+
+        store = TaskStore(self.path)
+        self.assertEqual(store.get(task_id)['error'], '超时')
+        self.assertNotEqual(store.next_task_id(), task_id)
+        self.assertEqual(store.tasks()[0]['type'], 'api_requests')
+        store.close()
+
+    def test_paging_and_retention(self):
+        """测试分页、按状态查询和按数量、时间清理"""
+        store = TaskStore(self.path, max_results=50)
+        for i in range(60):
+            store.put(f'task_{i}', {'status': 'error' if i % 3 == 0 else 'completed', 'n': i})
+        self.assertEqual(store.count(), 60)
+        page = store.results(offset=5, limit=5)
+        self.assertEqual([record['n'] for _, record in page], [54, 53, 52, 51, 50])
+        self.assertEqual(store.count('error'), 20)
+        self.assertEqual(store.cleanup(), 10)
+        self.assertEqual(store.count(), 50)
+        self.assertEqual(store.results(limit=1000)[-1][1]['n'], 10)
+
+        store.max_age = 0.05
+        time.sleep(0.1)
+        store.put('task_new', {'status': 'completed'})
+        store.cleanup()
+        self.assertEqual(store.count(), 1)
+        self.assertIsNone(store.get('task_59'))
+        store.close()
+
+
+class TestSchedulerStore(unittest.TestCase):
+    def test_memory_stays_flat(self):
+        """测试任务结束后不再留在内存中，结果分页查询"""
+        scheduler = TaskScheduler(store=TaskStore(cache_size=20))
+        task_ids = [scheduler.submit_task({'type': 'unknown'}) for _ in range(300)]
+        handle = scheduler.add_batch_task([{'type': 'unknown'} for _ in range(10)])
+        self.assertTrue(handle.wait(2.0))
+        deadline = time.monotonic() + 2.0
+        while scheduler.running_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(scheduler.running_tasks, {})
+        self.assertEqual(scheduler.batches, {})
+        self.assertLessEqual(scheduler.store.stats()['cached'], 20)
+
+        tasks = scheduler.get_all_tasks(limit=10)
+        self.assertEqual(len(tasks['task_results']), 10)
+        # 每个任务和批次摘要各一条
+        self.assertEqual(tasks['total_results'], 311)
+        self.assertEqual(scheduler.get_task_status(task_ids[0])['status'], 'completed')
+        status = scheduler.get_task_status(handle.batch_id)
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual([result['task_id'] for result in status['results']], handle.task_ids)
+        scheduler.stop_scheduler()
+
+
+if __name__ == '__main__':
+    unittest.main()
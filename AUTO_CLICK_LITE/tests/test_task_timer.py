@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""任务定时引擎测试
+
+启动延迟的绝对阈值依赖机器负载，只在设置 AUTO_CLICK_BENCHMARK=1 时检查。
+"""
+import os
+import time
+import threading
+import unittest
+from datetime import datetime
+from src.task_timer import (TimerEngine, CronSchedule, DailySchedule, WeeklySchedule, IntervalSchedule,
+                            OnceSchedule, parse_schedule)
+from src.task_scheduler import TaskScheduler
+
+BENCHMARK = bool(os.environ.get('AUTO_CLICK_BENCHMARK'))
+
+
+def ts(*args):
+    return datetime(*args).timestamp()
+
+
+class TestSchedules(unittest.TestCase):
+    def test_daily_weekly(self):
+        """测试每天和每周的下一次运行时间"""
+        daily = DailySchedule('09:30')
+        self.assertEqual(daily.next(ts(2024, 5, 1, 8, 0)), ts(2024, 5, 1, 9, 30))
+        self.assertEqual(daily.next(ts(2024, 5, 1, 9, 30)), ts(2024, 5, 2, 9, 30))
+        # 2024-05-01是周三
+        weekly = WeeklySchedule('monday', '10:00:15')
+        self.assertEqual(weekly.next(ts(2024, 5, 1, 12, 0)), ts(2024, 5, 6, 10, 0, 15))
+        self.assertEqual(WeeklySchedule('wed', '13:00').next(ts(2024, 5, 1, 12, 0)), ts(2024, 5, 1, 13, 0))
+        with self.assertRaises(ValueError):
+            DailySchedule('25:00')
+        with self.assertRaises(ValueError):
+            WeeklySchedule('someday', '10:00')
+
+    def test_cron(self):
+        """测试cron表达式"""
+        every_15 = CronSchedule('*/15 * * * *')
+        self.assertEqual(every_15.next(ts(2024, 5, 1, 8, 7)), ts(2024, 5, 1, 8, 15))
+        self.assertEqual(every_15.next(ts(2024, 5, 1, 8, 45)), ts(2024, 5, 1, 9, 0))
+        weekdays = CronSchedule('30 9 * * 1-5')
+        # 周五之后是下周一
+        self.assertEqual(weekdays.next(ts(2024, 5, 3, 10, 0)), ts(2024, 5, 6, 9, 30))
+        # 日和星期都受限时满足其一即可：每月13日或每周五
+        either = CronSchedule('0 0 13 * 5')
+        self.assertEqual(either.next(ts(2024, 5, 1)), ts(2024, 5, 3))
+        self.assertEqual(either.next(ts(2024, 5, 11)), ts(2024, 5, 13))
+        # 稀疏的表达式：2月29日
+        leap = CronSchedule('0 12 29 2 *')
+        self.assertEqual(leap.next(ts(2024, 3, 1)), ts(2028, 2, 29, 12, 0))
+        self.assertEqual(CronSchedule('0 0 * * 7').next(ts(2024, 5, 1)), ts(2024, 5, 5))
+        with self.assertRaises(ValueError):
+            CronSchedule('60 * * * *')
+        with self.assertRaises(ValueError):
+            CronSchedule('* * *')
+
+    def test_parse_schedule(self):
+        """测试由任务配置创建调度规则"""
+        self.assertIsInstance(parse_schedule({'schedule_type': 'interval', 'interval': 5}), IntervalSchedule)
+        self.assertIsInstance(parse_schedule({'schedule_type': 'cron', 'cron': '0 * * * *'}), CronSchedule)
+        once = parse_schedule({'schedule_type': 'once', 'at': '2024-05-01T08:00:00'})
+        self.assertEqual(once.first(0), ts(2024, 5, 1, 8, 0))
+        with self.assertRaises(ValueError):
+            parse_schedule({'schedule_type': 'monthly'})
+
+
+class TestTimerEngine(unittest.TestCase):
+    def test_ten_thousand_tasks(self):
+        """测试1万个定时任务按时触发"""
+        fired = []
+        done = threading.Event()
+
+        def dispatch(entry, deadline):
+            fired.append(time.time() - deadline)
+            if len(fired) == 10000:
+                done.set()
+
+        engine = TimerEngine(dispatch)
+        start = time.time() + 0.1
+        for i in range(10000):
+            engine.add(i, OnceSchedule(start + (i % 500) / 1000.0))
+        engine.start()
+        try:
+            self.assertTrue(done.wait(3.0))
+        finally:
+            engine.stop()
+        self.assertEqual(len(fired), 10000)
+        stats = engine.stats()
+        self.assertEqual(stats['scheduled'], 0)
+        self.assertEqual(stats['fired'], 10000)
+        # 等待由截止时间驱动，而不是固定频率轮询
+        self.assertLess(stats['wakeups'], 2000)
+        if BENCHMARK:
+            self.assertLess(max(fired), 0.05)
+            self.assertLess(stats['dispatch_lag_ms']['p50'], 5)
+
+    def test_interval_cancel_and_idle(self):
+        """测试间隔任务重复触发、取消后停止，空闲时不唤醒"""
+        runs = []
+        engine = TimerEngine(lambda entry, deadline: runs.append(deadline))
+        engine.start()
+        try:
+            engine.add('tick', IntervalSchedule(0.02))
+            time.sleep(0.15)
+            self.assertTrue(engine.cancel('tick'))
+            count = len(runs)
+            self.assertGreaterEqual(count, 5)
+            # 计划时间按间隔累加，不漂移
+            self.assertAlmostEqual(runs[-1] - runs[0], 0.02 * (count - 1), delta=0.001)
+            wakeups = engine.wakeups
+            time.sleep(0.1)
+            self.assertEqual(len(runs), count)
+            self.assertLessEqual(engine.wakeups - wakeups, 1)
+        finally:
+            engine.stop()
+
+    def test_interval_ignores_wall_clock_change(self):
+        """测试系统时间调整不影响间隔任务，墙上时钟任务按调整后的时间运行"""
+        offset = [0.0]
+        runs = []
+        engine = TimerEngine(lambda entry, deadline: runs.append((entry.key, deadline)),
+                             clock=lambda: time.time() + offset[0])
+        engine.start()
+        try:
+            engine.add('tick', IntervalSchedule(0.02))
+            engine.add('later', OnceSchedule(time.time() + 1800))
+            time.sleep(0.05)
+            # 时间回拨一小时，间隔任务继续运行
+            offset[0] = -3600.0
+            count = len(runs)
+            time.sleep(0.1)
+            self.assertGreaterEqual(len(runs) - count, 3)
+            # 计划时间按调整后的时钟报告
+            self.assertLess(abs(runs[-1][1] - (time.time() - 3600.0)), 1.0)
+            # 时间前拨到一次性任务之后，线程下次醒来时按新的时间运行到期的任务
+            offset[0] = 3600.0
+            engine.add('now', OnceSchedule(time.time() + 3600.0))
+            time.sleep(0.05)
+            self.assertIn('later', [key for key, _ in runs])
+        finally:
+            engine.stop()
+
+
+class TestSchedulerTimer(unittest.TestCase):
+    def test_scheduled_task_runs_and_reports_lag(self):
+        """测试定时任务经线程池执行并统计启动延迟"""
+        scheduler = TaskScheduler()
+        scheduler.start_scheduler()
+        try:
+            task_id = scheduler.add_scheduled_task({'schedule_type': 'interval', 'interval': 0.05,
+                                                    'type': 'unknown'})
+            time.sleep(0.28)
+            self.assertTrue(scheduler.cancel_task(task_id))
+            stats = scheduler.get_scheduler_stats()
+            self.assertGreaterEqual(stats['fired'], 4)
+            self.assertEqual(stats['start_lag_ms']['count'], stats['fired'])
+            if BENCHMARK:
+                self.assertLess(stats['start_lag_ms']['max'], 50)
+            self.assertEqual(scheduler.get_task_status(task_id)['status'], 'completed')
+        finally:
+            scheduler.stop_scheduler()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""节拍器测试"""
+import unittest
+from src.timing import ClickTimer
+
+
+class FakeClock:
+    """可控的假时钟，sleep直接推进时间"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestClickTimer(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.clock = FakeClock()
+        self.timer = ClickTimer(interval=20, randomize=False, spin_margin=0,
+                                clock=self.clock, sleep=self.clock.sleep)
+
+    def test_overrun_is_absorbed(self):
+        """测试点击耗时从下一次等待中扣除，长期速率不漂移"""
+        for _ in range(101):
+            self.timer.tick()
+            self.clock.now += 0.005  # 每次点击耗时5毫秒
+            self.timer.wait_next()
+        stats = self.timer.stats()
+        self.assertAlmostEqual(self.clock.now, 101 * 0.02, places=6)
+        self.assertAlmostEqual(stats['achieved_cps'], 50.0, places=6)
+        self.assertEqual(stats['resyncs'], 0)
+
+    def test_long_stall_resyncs(self):
+        """测试长时间卡顿后重新对齐而不是突发连点"""
+        self.timer.tick()
+        self.clock.now += 1.0
+        late = self.timer.wait_next()
+        self.assertGreater(late, 0)
+        self.assertEqual(self.timer.resyncs, 1)
+        before = self.clock.now
+        self.timer.wait_next()
+        self.assertAlmostEqual(self.clock.now - before, 0.02, places=6)
+
+    def test_randomized_intervals_within_bounds(self):
+        """测试随机间隔围绕截止时间抖动且平均速率符合设置"""
+        self.timer.configure(randomize=True, min_interval=10, max_interval=30)
+        self.assertAlmostEqual(self.timer.target_cps, 50.0)
+        last = self.clock.now
+        for _ in range(200):
+            self.timer.wait_next()
+            gap = self.clock.now - last
+            last = self.clock.now
+            self.assertGreaterEqual(gap, 0.01 - 1e-9)
+            self.assertLessEqual(gap, 0.03 + 1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
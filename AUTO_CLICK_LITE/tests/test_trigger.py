@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""区域触发测试"""
+import threading
+import time
+import unittest
+import numpy as np
+from src.screen import ArrayCapture
+from src.trigger import TriggerMonitor, region_digest
+from src.click_plan import compile_trigger
+from src.clicker import Clicker
+from src.input_backend import RecordingBackend
+
+
+def trigger_position(trigger):
+    return {'x': 50, 'y': 60, 'note': '触发', 'enabled': True, 'text': '', 'text_interval': 0, 'trigger': trigger}
+
+
+class TestTriggerMonitor(unittest.TestCase):
+    def setUp(self):
+        """测试前设置"""
+        self.image = np.zeros((200, 300, 3), dtype=np.float32)
+        self.image[:, :] = (30, 60, 90)
+        self.capture = ArrayCapture(self.image)
+        self.monitor = TriggerMonitor(self.capture)
+
+    def test_color_and_hash(self):
+        """测试颜色和哈希条件满足时立即触发"""
+        color = compile_trigger({'mode': 'color', 'region': [10, 10, 8, 8], 'color': [32, 58, 90]})
+        self.assertTrue(self.monitor.wait(color, lambda timeout: False))
+        digest = self.monitor.digest((10, 10, 8, 8))
+        self.assertEqual(digest, region_digest(self.capture.grab(10, 10, 8, 8)))
+        same = compile_trigger({'mode': 'hash', 'region': [10, 10, 8, 8], 'hash': digest})
+        self.assertTrue(self.monitor.wait(same, lambda timeout: False))
+        self.assertEqual(self.monitor.stats()['fires'], 2)
+
+    def test_timeout_and_interrupt(self):
+        """测试超时和等待被中断时返回False"""
+        never = compile_trigger({'mode': 'color', 'region': [0, 0, 4, 4], 'color': [255, 0, 0],
+                                 'poll_interval': 1, 'timeout': 30})
+        started = time.perf_counter()
+        self.assertFalse(self.monitor.wait(never, lambda timeout: time.sleep(timeout)))
+        self.assertAlmostEqual(time.perf_counter() - started, 0.03, delta=0.02)
+        self.assertEqual(self.monitor.timeouts, 1)
+        self.assertGreater(self.monitor.polls, 5)
+        forever = compile_trigger({'mode': 'change', 'region': [0, 0, 4, 4]})
+        self.assertFalse(self.monitor.wait(forever, lambda timeout: True))
+        with self.assertRaises(ValueError):
+            compile_trigger({'mode': 'sound', 'region': [0, 0, 1, 1]})
+
+
+class TestTriggerClicks(unittest.TestCase):
+    def test_click_after_region_change(self):
+        """测试区域变化后立即点击，并记录触发到点击的延迟"""
+        image = np.full((100, 100), 40.0, dtype=np.float32)
+        backend = RecordingBackend()
+        clicker = Clicker(interval=1000, count=1, randomize=False, multi_position=True,
+                          positions=[trigger_position({'mode': 'change', 'region': [20, 20, 10, 10], 'poll_interval': 2})],
+                          backend=backend, capture=ArrayCapture(image))
+        thread = threading.Thread(target=clicker.start_clicking)
+        thread.start()
+        time.sleep(0.05)
+        self.assertEqual(backend.of_kind('click'), [])
+        changed_at = time.perf_counter()
+        image[20:30, 20:30] = 200.0
+        thread.join(1.0)
+        clicks = backend.click_times()
+        self.assertEqual(len(clicks), 1)
+        self.assertLess(clicks[0] - changed_at, 0.02)
+        stats = clicker.get_metrics()['trigger']
+        self.assertEqual(stats['fires'], 1)
+        self.assertGreater(stats['polls'], 5)
+        self.assertEqual(stats['trigger_to_click_ms']['count'], 1)
+
+    def test_stop_while_waiting(self):
+        """测试等待触发时停止立即返回"""
+        clicker = Clicker(multi_position=True, backend=RecordingBackend(),
+                          positions=[trigger_position({'mode': 'change', 'region': [0, 0, 10, 10]})],
+                          capture=ArrayCapture(np.zeros((20, 20), dtype=np.float32)))
+        threading.Timer(0.05, clicker.stop_clicking).start()
+        started = time.perf_counter()
+        clicker.start_clicking()
+        self.assertLess(time.perf_counter() - started, 0.15)
+
+
+if __name__ == '__main__':
+    unittest.main()